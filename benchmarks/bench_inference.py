@@ -0,0 +1,81 @@
+# bench_inference.py
+# Compares prediction latency of the tuned search object and the fused NumPy engine.
+# Run by following command: python benchmarks/bench_inference.py --model_path ./results/models/tuned_model.pickle
+
+import os
+import pickle
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import click
+import numpy as np
+import pandas as pd
+from src.fused_inference import compile_model
+from src.read_data import read_data
+
+
+def best_time(func, repeats):
+    """Returns the shortest wall time of repeats calls to func."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@click.command()
+@click.option('--model_path', default='./results/models/tuned_model.pickle', type=click.Path(exists=True, dir_okay=False),
+              help='Pickled search object from model_and_results.py')
+@click.option('--test_path', default='./data/processed/test_set.csv', type=click.Path(exists=True, dir_okay=False),
+              help='Rows to predict')
+@click.option('--n_rows', default=200, type=int, help='Single-row predictions timed per engine')
+@click.option('--batch_size', default=10000, type=int, help='Rows in the batch benchmark')
+@click.option('--repeats', default=5, type=int, help='Timed runs per measurement (best is reported)')
+@click.option('--output_path', default=None, type=str, help='Optional CSV file for the results table')
+def bench_inference(model_path, test_path, n_rows, batch_size, repeats, output_path):
+    """Report per-row and per-batch prediction latency of random_search.predict and the fused engine."""
+    with open(model_path, 'rb') as f:
+        random_search = pickle.load(f)
+    fused = compile_model(random_search)
+
+    X_test = read_data(test_path).drop(columns='quality')[list(random_search.feature_names_in_)]
+    X_batch = X_test.sample(batch_size, replace=True, random_state=522).reset_index(drop=True)
+    rows = [X_test[i:i + 1] for i in range(min(n_rows, len(X_test)))]
+    arrays = [row.to_numpy()[0] for row in rows]
+    X_batch_array = X_batch.to_numpy()
+    # The same batch already split into a float matrix and the category columns, as a caller
+    # holding typed arrays would pass it to score_arrays
+    numeric = X_batch_array[:, fused.numeric_idx].astype(np.float64)
+    categories = [X_batch_array[:, position].astype(str) for position, _, _ in fused.categorical]
+
+    if not np.array_equal(fused.predict(X_batch_array), random_search.predict(X_batch)):
+        raise RuntimeError('Fused engine predictions differ from random_search.predict')
+
+    timings = {
+        ('random_search.predict', 'row'): best_time(lambda: [random_search.predict(row) for row in rows], repeats) / len(rows),
+        ('fused', 'row'): best_time(lambda: [fused.predict(row) for row in arrays], repeats) / len(arrays),
+        ('random_search.predict', 'batch'): best_time(lambda: random_search.predict(X_batch), repeats),
+        ('fused', 'batch'): best_time(lambda: fused.predict(X_batch_array), repeats),
+        ('fused.score_arrays', 'batch'): best_time(
+            lambda: fused.classes_from_logits(fused.score_arrays(numeric, *categories)), repeats),
+    }
+
+    results = []
+    for (engine, mode), seconds in timings.items():
+        rows_in_call = 1 if mode == 'row' else batch_size
+        results.append({'engine': engine, 'mode': mode, 'rows': rows_in_call, 'latency_ms': seconds * 1000})
+        print(f"{engine:<22} {mode:<5} ({rows_in_call:>6} rows): {seconds * 1000:.3f} ms")
+    for engine, mode in timings:
+        if engine != 'random_search.predict':
+            speedup = timings[('random_search.predict', mode)] / timings[(engine, mode)]
+            print(f"{engine} speedup per {mode}: {speedup:.1f}x")
+
+    if output_path:
+        pd.DataFrame(results).to_csv(output_path, index=False)
+        print(f"Results saved to {output_path}")
+
+
+if __name__ == '__main__':
+    bench_inference()
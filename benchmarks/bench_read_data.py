@@ -0,0 +1,57 @@
+# bench_read_data.py
+# Compares inferred and schema-typed loading in read_data.
+# Run by following command: python benchmarks/bench_read_data.py --sizes 100000,1000000
+
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import click
+import pandas as pd
+from bench_validation import scale_data
+from src.data_validation import define_schema
+from src.read_data import CSV_ENGINE, read_data
+
+MODES = {
+    'inferred': {},
+    'typed': {'schema': define_schema()},
+    'typed_float32': {'schema': define_schema(), 'float32': True},
+}
+
+
+@click.command()
+@click.option('--input_path', default='./data/raw/wine_quality.csv', type=click.Path(exists=True, dir_okay=False),
+              help='Raw wine data to scale up')
+@click.option('--sizes', default='100000,1000000', type=str, help='Comma-separated row counts to benchmark')
+@click.option('--repeats', default=3, type=int, help='Timed loads per mode and size (best is reported)')
+@click.option('--output_path', default=None, type=str, help='Optional CSV file for the results table')
+def bench_read_data(input_path, sizes, repeats, output_path):
+    """Report load time and in-memory size of read_data with and without schema dtypes."""
+    raw_data = read_data(input_path)
+    print(f"Typed modes parse with the '{CSV_ENGINE}' engine")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in [int(size) for size in sizes.split(',')]:
+            csv_path = os.path.join(tmp_dir, f'wine_{n_rows}.csv')
+            scale_data(raw_data, n_rows).to_csv(csv_path, index=False)
+
+            for mode, kwargs in MODES.items():
+                best = float('inf')
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    data = read_data(csv_path, **kwargs)
+                    best = min(best, time.perf_counter() - start)
+                memory_mb = data.memory_usage(deep=True).sum() / 2**20
+                results.append({'rows': n_rows, 'mode': mode, 'load_s': best, 'memory_mb': memory_mb})
+                print(f"{n_rows:>10} rows, {mode:<14}: {best:.3f}s, {memory_mb:.1f} MB")
+
+    if output_path:
+        pd.DataFrame(results).to_csv(output_path, index=False)
+        print(f"Results saved to {output_path}")
+
+
+if __name__ == '__main__':
+    bench_read_data()
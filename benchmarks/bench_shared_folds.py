@@ -0,0 +1,88 @@
+# bench_shared_folds.py
+# Measures the peak memory of the path search with its folds in memory or memory-mapped, for 1 and N workers.
+# Run by following command: python benchmarks/bench_shared_folds.py run --rows 600000 --workers 1,3
+
+import os
+import subprocess
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import click
+import psutil
+import scipy.stats as stats
+from bench_suite import make_model
+from bench_validation import scale_data
+from src.data_validation import define_schema, validate_and_clean_data
+from src.find_best_model import find_best_model
+from src.read_data import read_data
+
+
+def tree_memory(process):
+    """Returns the summed PSS and the largest RSS, in MB, of a process and its children.
+
+    PSS splits each shared page between the processes mapping it, so the sum counts shared folds once."""
+    pss, max_rss = 0, 0
+    for proc in [process] + process.children(recursive=True):
+        try:
+            info = proc.memory_full_info()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        pss += info.pss
+        max_rss = max(max_rss, info.rss)
+    return pss / 2**20, max_rss / 2**20
+
+
+@click.group()
+def cli():
+    """Peak memory of the path search with in-memory and memory-mapped folds."""
+
+
+@cli.command()
+@click.option('--input_path', default='./data/raw/wine_quality.csv', type=click.Path(exists=True, dir_okay=False),
+              help='Raw wine data to scale up')
+@click.option('--rows', default=600_000, type=int, help='Rows of scaled-up wine data to search on')
+@click.option('--n_jobs', default=1, type=int, help='Worker processes')
+@click.option('--storage', default='memory', type=click.Choice(['memory', 'memmap']), help='Where the folds are kept')
+@click.option('--n_iter', default=4, type=int, help='Values of C on the path')
+def fit(input_path, rows, n_jobs, storage, n_iter):
+    """Run one path search (started by run, which measures it)."""
+    cleaned = validate_and_clean_data(scale_data(read_data(input_path), rows), define_schema(), engine='numpy')
+    X, y = cleaned.drop(columns='quality'), cleaned['quality']
+    del cleaned
+    print('ready', flush=True)
+    start = time.perf_counter()
+    find_best_model(X, y, make_model(X), stats.uniform(0.001, 100), 3, n_iter, 'accuracy', 42,
+                    n_jobs=n_jobs, search='path', shared_folds=storage == 'memmap')
+    print(f'{time.perf_counter() - start:.1f}', flush=True)
+
+
+@cli.command()
+@click.option('--rows', default=600_000, type=int, help='Rows of scaled-up wine data to search on')
+@click.option('--workers', default='1,3', type=str, help='Comma-separated worker counts (the path search uses one per fold)')
+@click.option('--n_iter', default=4, type=int, help='Values of C on the path')
+@click.option('--interval', default=0.2, type=float, help='Seconds between memory samples')
+def run(rows, workers, n_iter, interval):
+    """Sample the memory of a path search for each worker count and fold storage."""
+    print(f"{'workers':>7} {'storage':>8} {'time (s)':>9} {'peak PSS (MB)':>14} {'largest RSS (MB)':>17}")
+    for n_jobs in [int(n) for n in workers.split(',')]:
+        for storage in ['memory', 'memmap']:
+            child = subprocess.Popen([sys.executable, __file__, 'fit', '--rows', str(rows), '--n_jobs', str(n_jobs),
+                                      '--storage', storage, '--n_iter', str(n_iter)],
+                                     stdout=subprocess.PIPE, text=True)
+            process = psutil.Process(child.pid)
+            # Only the search is measured, from the data being ready
+            child.stdout.readline()
+            baseline, _ = tree_memory(process)
+            peak_pss = peak_rss = 0
+            while child.poll() is None:
+                pss, rss = tree_memory(process)
+                peak_pss, peak_rss = max(peak_pss, pss), max(peak_rss, rss)
+                time.sleep(interval)
+            seconds = float(child.stdout.read().split()[-1])
+            print(f"{n_jobs:>7} {storage:>8} {seconds:>9.1f} {peak_pss:>14.0f} {peak_rss:>17.0f}"
+                  f"  (data loaded: {baseline:.0f} MB)")
+
+
+if __name__ == '__main__':
+    cli()
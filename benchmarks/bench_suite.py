@@ -0,0 +1,291 @@
+# bench_suite.py
+# Times and memory-profiles the hot paths of the analysis at multiples of the wine data size, and compares runs.
+# Run by following command: python benchmarks/bench_suite.py run --output_path bench_results/$(git rev-parse --short HEAD).json
+# Compare two runs with: python benchmarks/bench_suite.py compare bench_results/old.json bench_results/new.json
+
+import datetime
+import gc
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import altair as alt
+import click
+import scipy.stats as stats
+from bench_validation import scale_data
+from sklearn.compose import make_column_transformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from src import eda_utils
+from src.data_validation import define_schema, validate_and_clean_data
+from src.find_best_model import find_best_model
+from src.fused_inference import compile_model
+from src.read_data import read_data
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+CHART_BUILDERS = {
+    'eda_quality_distribution_plot': eda_utils.create_quality_distribution_plot,
+    'eda_wine_quality_proportion_plot': eda_utils.create_wine_quality_proportion_plot,
+    'eda_sulfur_dioxide_scatter': eda_utils.create_sulfur_dioxide_scatter,
+    'eda_sulfur_dioxide_density': lambda df: eda_utils.create_sulfur_dioxide_scatter(df, mode='density'),
+    'eda_correlation_matrix': eda_utils.create_correlation_matrix,
+    'eda_boxplots_by_color': eda_utils.create_boxplots_by_color,
+    'eda_quality_distribution_bar': eda_utils.create_quality_distribution_bar,
+}
+
+BENCHMARKS = (['read_data', 'validate_pandera', 'validate_numpy', 'split'] + list(CHART_BUILDERS)
+              + ['find_best_model', 'predict', 'predict_fused'])
+
+
+def load_split_script():
+    """Imports scripts/read_data.py, whose name clashes with src/read_data.py."""
+    spec = importlib.util.spec_from_file_location('split_script', os.path.join(ROOT, 'scripts', 'read_data.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.read_split_data.callback
+
+
+def chart_spec(chart):
+    """Builds the chart's Vega-Lite spec with its data inlined, which is where altair does its work."""
+    with alt.data_transformers.enable('default', max_rows=None):
+        return chart.to_dict()
+
+
+def measure(func, repeats, time_budget=30.0):
+    """Returns the best wall time of repeats calls to func and the peak traced memory of one more call.
+
+    Calls taking longer than time_budget seconds are not repeated."""
+    best = float('inf')
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+        if best > time_budget:
+            break
+    # Traced separately: tracemalloc slows allocation-heavy code down
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2**20
+
+
+def git_commit():
+    """Returns the current commit hash, marked '-dirty' when the tree has uncommitted changes, or None."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+
+def make_model(X_train):
+    """The analysis pipeline from model_and_results.py."""
+    numeric_features = X_train.select_dtypes(include='number').columns.tolist()
+    return make_pipeline(
+        make_column_transformer(
+            (OneHotEncoder(drop='if_binary'), ['color']),
+            (StandardScaler(), numeric_features)
+        ),
+        LogisticRegression(multi_class='multinomial', solver='lbfgs', max_iter=2000)
+    )
+
+
+_fitted = {}
+
+
+def fitted_model(raw_data, n_iter, cache=_fitted):
+    """A search fitted once on the original data, for the prediction benchmarks at every scale."""
+    if 'model' not in cache:
+        cleaned = validate_and_clean_data(raw_data, define_schema(), engine='numpy')
+        X, y = cleaned.drop(columns='quality'), cleaned['quality']
+        cache['model'] = find_best_model(X, y, make_model(X), stats.uniform(0.001, 100), 3, n_iter, 'accuracy', 42)
+    return cache['model']
+
+
+def scale_benchmarks(raw_data, scale, tmp_dir, n_iter, max_fit_scale, selected):
+    """Yields (name, function) for the selected benchmarks on the data scaled up scale times.
+
+    The inputs (scaled and cleaned data, their CSV files, the split and the fitted model) are built the first
+    time a selected benchmark needs them, so running a few benchmarks does not pay for the others' setup."""
+    inputs = {}
+
+    def need(name, build):
+        if name not in inputs:
+            inputs[name] = build()
+        return inputs[name]
+
+    def write_csv(data, path):
+        data.to_csv(path, index=False)
+        return path
+
+    schema = define_schema()
+    split = load_split_script()
+    split_dir = os.path.join(tmp_dir, f'split_{scale}')
+    data = lambda: need('data', lambda: scale_data(raw_data, len(raw_data) * scale))
+    raw_path = lambda: need('raw_path', lambda: write_csv(data(), os.path.join(tmp_dir, f'raw_{scale}.csv')))
+    cleaned_path = lambda: need('cleaned_path', lambda: write_csv(
+        validate_and_clean_data(data(), schema, engine='numpy'), os.path.join(tmp_dir, f'cleaned_{scale}.csv')))
+
+    def split_sets():
+        if not os.path.exists(os.path.join(split_dir, 'training_set.csv')):
+            split(cleaned_path(), split_dir, 522, 0.2)
+        return (read_data(os.path.join(split_dir, 'training_set.csv')),
+                read_data(os.path.join(split_dir, 'test_set.csv')))
+    train_df = lambda: need('split_sets', split_sets)[0]
+    test_df = lambda: need('split_sets', split_sets)[1]
+
+    if 'read_data' in selected:
+        path = raw_path()
+        yield 'read_data', lambda: read_data(path)
+    for engine in ['pandera', 'numpy']:
+        if f'validate_{engine}' in selected:
+            scaled = data()
+            yield f'validate_{engine}', lambda engine=engine: validate_and_clean_data(scaled, schema, engine=engine)
+    if 'split' in selected:
+        path = cleaned_path()
+        yield 'split', lambda: split(path, split_dir, 522, 0.2)
+
+    for name, builder in CHART_BUILDERS.items():
+        if name in selected:
+            train = train_df()
+            yield name, lambda builder=builder: chart_spec(builder(train))
+
+    if 'find_best_model' in selected and scale <= max_fit_scale:
+        X_train, y_train = train_df().drop(columns='quality'), train_df()['quality']
+        yield 'find_best_model', lambda: find_best_model(X_train, y_train, make_model(X_train),
+                                                         stats.uniform(0.001, 100), 3, n_iter, 'accuracy', 42)
+
+    if 'predict' in selected or 'predict_fused' in selected:
+        model = fitted_model(raw_data, n_iter)
+        fused = compile_model(model)
+        X_test = test_df().drop(columns='quality')
+        X_array = X_test[list(fused.feature_names_in_)].to_numpy()
+        yield 'predict', lambda: model.predict(X_test)
+        yield 'predict_fused', lambda: fused.predict(X_array)
+
+
+@click.group()
+def cli():
+    """Benchmark suite for the wine quality analysis."""
+
+
+@cli.command()
+@click.option('--input_path', default='./data/raw/wine_quality.csv', type=click.Path(exists=True, dir_okay=False),
+              help='Raw wine data to scale up')
+@click.option('--scales', default='1,10,100', type=str, help='Comma-separated multiples of the wine data size')
+@click.option('--benchmarks', 'names', default=','.join(BENCHMARKS), type=str,
+              help='Comma-separated benchmarks to run (all by default)')
+@click.option('--repeats', default=3, type=int, help='Timed runs per benchmark and scale (best is reported)')
+@click.option('--n_iter', default=5, type=int, help='Candidates tried by the find_best_model benchmark')
+@click.option('--max_fit_scale', default=10, type=int,
+              help='Largest scale find_best_model is run at (it takes tens of minutes at 100x on one CPU)')
+@click.option('--output_path', default=None, type=str, help='JSON file for the results')
+def run(input_path, scales, names, repeats, n_iter, max_fit_scale, output_path):
+    """Time and memory-profile each benchmark at each data scale."""
+    selected = names.split(',')
+    unknown = sorted(set(selected) - set(BENCHMARKS))
+    if unknown:
+        raise click.BadParameter(f"Unknown benchmarks {unknown}; choose from {BENCHMARKS}", param_hint='--benchmarks')
+    raw_data = read_data(input_path)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for scale in [int(scale) for scale in scales.split(',')]:
+            for name, func in scale_benchmarks(raw_data, scale, tmp_dir, n_iter, max_fit_scale, selected):
+                if name not in selected:
+                    continue
+                seconds, peak_mb = measure(func, repeats)
+                results.append({'benchmark': name, 'scale': scale, 'rows': len(raw_data) * scale,
+                                'seconds': seconds, 'peak_memory_mb': peak_mb})
+                print(f"{name:<34} {scale:>4}x: {seconds:8.3f}s, peak {peak_mb:8.1f} MB")
+
+    report = {
+        'commit': git_commit(),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'repeats': repeats,
+        'n_iter': n_iter,
+        'max_fit_scale': max_fit_scale,
+        'results': results,
+    }
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {output_path}")
+
+
+def compare_results(baseline, current, threshold, min_time):
+    """Pairs up the results of two runs and flags those slower or larger than threshold times the baseline.
+
+    Slowdowns of less than min_time seconds are not flagged, since timings of a few milliseconds are noisy.
+    Results only in the current run have nothing to compare to and are left out; those only in the baseline
+    are listed as missing, with no ratios."""
+    before = {(r['benchmark'], r['scale']): r for r in baseline['results']}
+    ran = {(r['benchmark'], r['scale']) for r in current['results']}
+    rows = []
+    for result in current['results']:
+        old = before.get((result['benchmark'], result['scale']))
+        if old is None:
+            continue
+        time_ratio = result['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        memory_ratio = result['peak_memory_mb'] / old['peak_memory_mb'] if old['peak_memory_mb'] else 1.0
+        rows.append({'benchmark': result['benchmark'], 'scale': result['scale'],
+                     'time_ratio': time_ratio, 'memory_ratio': memory_ratio,
+                     'missing': False,
+                     'regression': (time_ratio > threshold and result['seconds'] - old['seconds'] > min_time)
+                                   or memory_ratio > threshold})
+    for benchmark, scale in before:
+        if (benchmark, scale) not in ran:
+            rows.append({'benchmark': benchmark, 'scale': scale, 'time_ratio': None, 'memory_ratio': None,
+                         'missing': True, 'regression': False})
+    return rows
+
+
+@cli.command()
+@click.argument('baseline_path', type=click.Path(exists=True, dir_okay=False))
+@click.argument('current_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--threshold', default=1.25, type=float,
+              help='Ratio to the baseline time or peak memory above which a benchmark counts as a regression')
+@click.option('--min_time', default=0.05, type=float,
+              help='Smallest slowdown in seconds that counts as a regression')
+def compare(baseline_path, current_path, threshold, min_time):
+    """Compare two JSON results files; exits with status 1 if any benchmark regressed."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+    print(f"Baseline {baseline.get('commit')} vs current {current.get('commit')}")
+    rows = compare_results(baseline, current, threshold, min_time)
+    for row in rows:
+        if row['missing']:
+            print(f"{row['benchmark']:<34} {row['scale']:>4}x: missing from the current run")
+            continue
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['benchmark']:<34} {row['scale']:>4}x: time {row['time_ratio']:5.2f}x, "
+              f"memory {row['memory_ratio']:5.2f}x{flag}")
+    if any(row['regression'] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    cli()
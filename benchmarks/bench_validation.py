@@ -0,0 +1,65 @@
+# bench_validation.py
+# Compares the pandera and compiled NumPy validation engines.
+# Run by following command: python benchmarks/bench_validation.py --sizes 10000,100000,1000000,10000000
+
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import click
+import numpy as np
+import pandas as pd
+from src.data_validation import CompiledSchema, define_schema, validate_and_clean_data
+from src.read_data import read_data
+
+
+def scale_data(raw_data, n_rows, seed=522):
+    """Resample the raw wine data to n_rows rows, adding jitter so most rows stay unique."""
+    rng = np.random.default_rng(seed)
+    data = raw_data.iloc[rng.integers(0, len(raw_data), n_rows)].reset_index(drop=True)
+    data['density'] = data['density'] + rng.uniform(0, 1e-6, n_rows)
+    return data
+
+
+@click.command()
+@click.option('--input_path', default='./data/raw/wine_quality.csv', type=click.Path(exists=True, dir_okay=False),
+              help='Raw wine data to scale up')
+@click.option('--sizes', default='10000,100000,1000000,10000000', type=str,
+              help='Comma-separated row counts to benchmark')
+@click.option('--repeats', default=3, type=int, help='Timed runs per engine and size (best is reported)')
+@click.option('--output_path', default=None, type=str, help='Optional CSV file for the results table')
+def bench_validation(input_path, sizes, repeats, output_path):
+    """Time validate_and_clean_data with the pandera and numpy engines at several data sizes."""
+    raw_data = read_data(input_path)
+    schema = define_schema()
+    compiled = CompiledSchema(schema)
+
+    results = []
+    for n_rows in [int(size) for size in sizes.split(',')]:
+        data = scale_data(raw_data, n_rows)
+        timings = {}
+        for engine in ['pandera', 'numpy']:
+            best = float('inf')
+            for _ in range(repeats):
+                start = time.perf_counter()
+                validate_and_clean_data(data, schema, engine=engine)
+                best = min(best, time.perf_counter() - start)
+            timings[engine] = best
+
+        _, failures = compiled.validate(data)
+        results.append({'rows': n_rows,
+                        'pandera_s': timings['pandera'],
+                        'numpy_s': timings['numpy'],
+                        'speedup': timings['pandera'] / timings['numpy'],
+                        'rows_failed': sum(failures.values())})
+        print(f"{n_rows:>10} rows: pandera {timings['pandera']:.3f}s, numpy {timings['numpy']:.3f}s "
+              f"({results[-1]['speedup']:.1f}x)")
+
+    if output_path:
+        pd.DataFrame(results).to_csv(output_path, index=False)
+        print(f"Results saved to {output_path}")
+
+
+if __name__ == '__main__':
+    bench_validation()
@@ -12,12 +12,22 @@ from src.eda_utils import (
     create_quality_distribution_bar
 )
 
+from src.chart_rendering import render_charts
+from src.instrumentation import configure, span
 from src.read_data import read_data
 
 @click.command()
 @click.argument("input_data", type=click.Path(exists=True))
 @click.argument("output_dir", type=click.Path())
-def eda(input_data, output_dir):
+@click.option("--max_workers", default=None, type=click.IntRange(min=1),
+              help="Processes rendering charts in parallel (one per CPU by default, 1 renders in this process)")
+@click.option("--force", is_flag=True, help="Re-render charts even if their saved PNG is up to date")
+@click.option("--sulfur_dioxide_mode", default="points", type=click.Choice(["points", "density"]),
+              help="Draw the sulfur dioxide chart as one point per wine or as a binned heatmap")
+@click.option("--spans_to", default=None, envvar="WINE_SPANS_PATH", type=click.Path(dir_okay=False),
+              help="JSON-lines file to append timing and memory spans of each stage to")
+@click.option("--trace_memory", is_flag=True, help="Record tracemalloc peaks and top allocations in the spans (slower)")
+def eda(input_data, output_dir, max_workers, force, sulfur_dioxide_mode, spans_to, trace_memory):
     """Perform exploratory data analysis on wine dataset.
 
     Parameters
@@ -26,28 +36,49 @@ def eda(input_data, output_dir):
         Path to input CSV file
     output_dir : str
         Directory to save output plots
+    max_workers : int
+        Number of processes rendering charts
+    force : bool
+        Re-render charts whose spec has not changed since their PNG was saved
+    sulfur_dioxide_mode : str
+        'points' or 'density' (a heatmap whose size does not depend on the number of rows)
+    spans_to : str
+        JSON-lines file for the stage spans (see src/instrumentation.py); spans are not recorded if None
+    trace_memory : bool
+        Trace Python allocations in the spans
     """
+    configure(spans_to, trace_memory=trace_memory, script="eda")
+
     # Create output dir if needed
     os.makedirs(output_dir, exist_ok=True)
 
     # Read data
-    train_df = read_data(input_data)
+    with span("read") as attrs:
+        train_df = read_data(input_data, cache=True)
+        attrs["rows"] = len(train_df)
 
     # Generate and save plots
-    plots = {
-        "dist_wine_scores_by_feature.png": create_quality_distribution_plot(train_df),
-        "density_red_vs_white.png": create_wine_quality_proportion_plot(train_df),
-        "total_vs_free_sulfur_dioxide.png": create_sulfur_dioxide_scatter(train_df),
-        "feature_corrs.png": create_correlation_matrix(train_df),
-        "red_vs_white_all_features.png": create_boxplots_by_color(train_df),
-        "dist_wine_scores.png": create_quality_distribution_bar(train_df)
+    builders = {
+        "dist_wine_scores_by_feature.png": create_quality_distribution_plot,
+        "density_red_vs_white.png": create_wine_quality_proportion_plot,
+        "total_vs_free_sulfur_dioxide.png": lambda df: create_sulfur_dioxide_scatter(df, mode=sulfur_dioxide_mode),
+        "feature_corrs.png": create_correlation_matrix,
+        "red_vs_white_all_features.png": create_boxplots_by_color,
+        "dist_wine_scores.png": create_quality_distribution_bar
     }
+    plots = {}
+    for filename, build in builders.items():
+        with span("build_chart", chart=filename, rows=len(train_df)):
+            plots[filename] = build(train_df)
 
-    # Save all plots
-    for filename, plot in plots.items():
-        path = os.path.join(output_dir, filename)
-        plot.save(path, ppi=200)
-        print(f"Saved plot to {path}")
+    # Save all plots, skipping those whose data and definition are unchanged
+    with span("render_charts", charts=len(plots)):
+        results = render_charts(plots, output_dir, ppi=200, max_workers=max_workers, force=force)
+    for filename, result in results.items():
+        if result["status"] == "cached":
+            print(f"Plot {result['path']} is up to date")
+        else:
+            print(f"Saved plot to {result['path']} ({result['seconds']:.2f}s)")
 
 if __name__ == "__main__":
     eda()
\ No newline at end of file
@@ -0,0 +1,46 @@
+# generate_synthetic_data.py
+# Writes synthetic wines fitted to the raw wine data, for load and scale testing.
+# Run by following command: python scripts/generate_synthetic_data.py --output_path ./data/synthetic/wine_quality_10M.csv --n_rows 10000000
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import click
+from src.read_data import read_data
+from src.synthetic_data import fit_generator, write_synthetic_csv
+
+@click.command()
+@click.option('--input_path', default='./data/raw/wine_quality.csv', type=click.Path(exists=True, dir_okay=False),
+              help='Wine data to fit the generator to (rows breaking the schema are left out)')
+@click.option('--output_path', type=str, required=True, help='CSV file to write the synthetic rows to')
+@click.option('--n_rows', type=click.IntRange(min=0), required=True, help='Number of rows to generate')
+@click.option('--chunksize', default=1_000_000, type=click.IntRange(min=1), help='Rows generated and written at a time')
+@click.option('--seed', default=522, type=int, help='Random seed')
+@click.option('--shrinkage', default=0.1, type=click.FloatRange(0, 1),
+              help="Least weight of each color's correlations in its quality groups' correlations")
+@click.option('--out_of_range_rate', default=0.0, type=click.FloatRange(0, 1),
+              help='Fraction of rows with a feature out of the schema range')
+@click.option('--duplicate_rate', default=0.0, type=click.FloatRange(0, 1), help='Fraction of duplicated rows')
+@click.option('--empty_rate', default=0.0, type=click.FloatRange(0, 1), help='Fraction of empty rows')
+def generate_synthetic_data(input_path, output_path, n_rows, chunksize, seed, shrinkage, out_of_range_rate,
+                            duplicate_rate, empty_rate):
+    """
+    Fits a Gaussian copula per color and quality to the valid wine rows and streams
+    N_ROWS synthetic rows in the same column layout to OUTPUT_PATH, optionally
+    with out-of-range, duplicate and empty rows for the validator to reject.
+    """
+    generator = fit_generator(read_data(input_path), shrinkage=shrinkage)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    try:
+        counts = write_synthetic_csv(generator, output_path, n_rows, chunksize=chunksize, seed=seed,
+                                     out_of_range_rate=out_of_range_rate, duplicate_rate=duplicate_rate,
+                                     empty_rate=empty_rate)
+    except ValueError as e:
+        print(f"Generation failed: {e}")
+        sys.exit(1)
+    print(f"Wrote {counts['rows']} rows to {output_path} in {counts['seconds']:.2f}s "
+          f"({counts['rows_per_s']:,.0f} rows/s)")
+
+if __name__ == '__main__':
+    generate_synthetic_data()
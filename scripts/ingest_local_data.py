@@ -0,0 +1,45 @@
+# ingest_local_data.py
+# Merges the per-color wine files in data/raw into wine_quality.csv without downloading anything.
+# Run by following command: python scripts/ingest_local_data.py --source ./data/raw/winequality-red.csv --source ./data/raw/winequality-white.csv --output_path ./data/raw/wine_quality.csv
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import click
+from src.instrumentation import configure, span
+from src.local_ingest import ingest_local_sources
+
+@click.command()
+@click.option('--source', 'sources', multiple=True, type=click.Path(exists=True, dir_okay=False),
+              default=['./data/raw/winequality-red.csv', './data/raw/winequality-white.csv'],
+              help='Semicolon-separated wine file of one color, named after it (e.g. winequality-red.csv); repeatable')
+@click.option('--output_path', default='./data/raw/wine_quality.csv', type=str, help='Merged CSV file to write')
+@click.option('--workers', default=None, type=click.IntRange(min=1),
+              help='Processes parsing the sources in parallel (one per CPU by default)')
+@click.option('--force', is_flag=True, help='Merge the sources even if their checksums are unchanged')
+@click.option('--spans_to', default=None, envvar='WINE_SPANS_PATH', type=click.Path(dir_okay=False),
+              help='JSON-lines file to append timing and memory spans of each stage to')
+def ingest_local_data(sources, output_path, workers, force, spans_to):
+    """
+    Parses per-color wine source files in parallel, adds their color column,
+    and writes them to one CSV in the layout of the downloaded wine_quality.csv.
+    Does nothing if the sources and output are unchanged since the last run.
+    """
+    configure(spans_to, script='ingest_local_data')
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    try:
+        with span('ingest', sources=len(sources)) as attrs:
+            counts = ingest_local_sources(list(sources), output_path, max_workers=workers, force=force)
+            attrs.update(skipped=counts['skipped'], rows=counts['rows'])
+    except (ValueError, KeyError) as e:
+        print(f"Ingest failed: {e}")
+        sys.exit(1)
+    if counts['skipped']:
+        print(f"{output_path} is up to date with its {counts['sources']} sources; nothing to do.")
+    else:
+        print(f"Wrote {counts['rows']} rows from {counts['sources']} sources to {output_path} "
+              f"in {counts['seconds']:.2f}s")
+
+if __name__ == '__main__':
+    ingest_local_data()
@@ -2,14 +2,20 @@ import click
 import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.coefficient_plots import model_coefficients, render_coefficient_plots
 from src.data_validation import save_data
-from src.find_best_model import find_best_model
+from src.find_best_model import BACKENDS, SEARCHES, find_best_model, search_summary, search_timings
+from src.fold_search import FoldTransformCache
+from src.instrumentation import configure, span
+from src.model_artifact import check_parity, export_artifact, load_artifact
 from src.read_data import read_data
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import pickle
+import tempfile
+import time
+from contextlib import nullcontext
 
 from sklearn.preprocessing import StandardScaler
 from sklearn.preprocessing import OneHotEncoder
@@ -32,14 +38,35 @@ warnings.filterwarnings('ignore', category=FutureWarning)
 @click.option('--plots_to', type=str, help="Path to directory where the model's analysis plots will be written to")
 @click.option('--model_to', type=str, help='Path to directory where the tuned model is stored')
 @click.option('--seed', type=int, help="Random seed", default=522)
-def model_and_result(training_data, test_data, results_to, plots_to, model_to, seed):
+@click.option('--n_jobs', type=int, help="Number of candidate/fold fits to run in parallel (-1 for all cores)", default=None)
+@click.option('--backend', type=click.Choice(BACKENDS), help="joblib backend for parallel fits", default='loky')
+@click.option('--search', type=click.Choice(SEARCHES), help="Random search, successive halving over growing subsamples, or a warm-started path over C", default='random')
+@click.option('--preprocessing_cache', type=click.Choice(['none', 'memory', 'disk']), help="Preprocess each CV fold once per search, caching in memory or on disk", default='none')
+@click.option('--cache_dir', type=str, help="Directory to keep the disk preprocessing cache in (a temporary directory removed after the search by default)", default=None)
+@click.option('--shared_folds', is_flag=True, help="With --search path, memory-map the preprocessed folds so parallel workers share one copy instead of each receiving their own")
+@click.option('--plot_workers', type=click.IntRange(min=1), help="Processes rendering the coefficient plots in parallel (one per CPU by default)", default=None)
+@click.option('--combined_coefficient_plot', is_flag=True, help="Save the coefficients of all quality classes as one small-multiples figure instead of one figure per class")
+@click.option('--spans_to', type=click.Path(dir_okay=False), envvar='WINE_SPANS_PATH', help="JSON-lines file to append timing and memory spans of each stage to", default=None)
+@click.option('--trace_memory', is_flag=True, help="Record tracemalloc peaks and top allocations in the spans (slower)")
+def model_and_result(training_data, test_data, results_to, plots_to, model_to, seed, n_jobs, backend, search,
+                     preprocessing_cache, cache_dir, shared_folds, plot_workers, combined_coefficient_plot, spans_to,
+                     trace_memory):
     '''Fits a wine quality logistic regression model to the training data 
     and evaluates the model on the test data with accuracy score.'''
+    configure(spans_to, trace_memory=trace_memory, script='model_and_results')
+    in_process = backend == 'threading' or n_jobs in (None, 1)
+    if preprocessing_cache != 'none' and search == 'path':
+        raise click.UsageError("--preprocessing_cache does not apply to --search path, which preprocesses each fold once")
+    if preprocessing_cache == 'memory' and not in_process:
+        raise click.UsageError("--preprocessing_cache memory cannot be shared by worker processes; "
+                               "use --backend threading, --n_jobs 1 or --preprocessing_cache disk")
     np.random.seed(seed)
 
     # Read in training and test data
-    train_df = read_data(training_data)
-    test_df = read_data(test_data)
+    with span('read') as attrs:
+        train_df = read_data(training_data, cache=True)
+        test_df = read_data(test_data, cache=True)
+        attrs['rows'] = len(train_df) + len(test_df)
 
     os.makedirs(results_to, exist_ok=True)
     os.makedirs(plots_to, exist_ok=True)
@@ -66,20 +93,59 @@ def model_and_result(training_data, test_data, results_to, plots_to, model_to, s
     )
 
     # Find best performing model through randomized search and fit it using X_train and y_train
-    random_search = find_best_model(X_train, y_train, model, stats.uniform(0.001, 100), 3, 50, 'accuracy', 42)
+    # A disk cache without --cache_dir lives in a temporary directory removed after the search
+    cache_location = (tempfile.TemporaryDirectory(prefix='fold_cache_')
+                      if preprocessing_cache == 'disk' and cache_dir is None else nullcontext(cache_dir))
+    with cache_location as location:
+        fold_cache = None
+        if preprocessing_cache == 'memory':
+            fold_cache = FoldTransformCache()
+        elif preprocessing_cache == 'disk':
+            fold_cache = FoldTransformCache(location)
+        random_search = find_best_model(X_train, y_train, model, stats.uniform(0.001, 100), 3, 50, 'accuracy', 42,
+                                        n_jobs=n_jobs, backend=backend, search=search,
+                                        preprocessing_cache=fold_cache, shared_folds=shared_folds)
+        if fold_cache is not None and in_process:
+            print(f"Preprocessing cache: {fold_cache.hits} hits, {fold_cache.misses} misses")
+        elif fold_cache is not None:
+            # Hits and misses happen in the worker processes; the stored folds are the misses
+            print(f"Preprocessing cache: {len(fold_cache)} preprocessed folds stored")
+
+    # Save per-candidate timings and report how much the parallel fits overlapped
+    timings = search_timings(random_search)
+    timings_file = os.path.join(results_to, "search_timings.csv")
+    save_data(timings, timings_file)
+    fit_and_score_time = timings['total_fit_time'].sum() + timings['total_score_time'].sum()
+    print(f"Search took {random_search.search_time_:.1f}s wall time for {fit_and_score_time:.1f}s of fits "
+          f"({fit_and_score_time / random_search.search_time_:.1f}x parallel speedup); timings saved to {timings_file}")
+    if search == 'halving':
+        summary = search_summary(random_search)
+        print(f"Successive halving ran {summary['n_fits']} fits in {summary['search_time']:.1f}s; a full random search "
+              f"would run {summary['full_search_fits']} fits in about {summary['full_search_time']:.1f}s "
+              f"({summary['time_saved']:.1f}s saved)")
 
     # Save the tuned model to output location
     model_path = os.path.join(model_to, 'tuned_model.pickle')
 
-    with open(model_path, 'wb') as f:
+    with span('save_model'), open(model_path, 'wb') as f:
         pickle.dump(random_search, f)
         print(f'Tunded model output to {model_path}')
 
+    # Save the compact inference artifact and check it predicts like the pickled search
+    artifact_path = os.path.join(model_to, 'tuned_model.npz')
+    with span('export_artifact'):
+        export_artifact(random_search, artifact_path)
+        parity = check_parity(load_artifact(artifact_path), random_search, X_test)
+    if parity['prediction_mismatches'] or parity['max_proba_diff'] > 1e-9:
+        raise RuntimeError(f"Model artifact does not match the tuned model: {parity}")
+    print(f'Model artifact output to {artifact_path} (max probability difference {parity["max_proba_diff"]:.1e})')
+
     # Best parameters
     print("Best Parameters:", random_search.best_params_)
 
     # Evaluate
-    y_pred = random_search.predict(X_test)
+    with span('predict', rows=len(X_test)):
+        y_pred = random_search.predict(X_test)
     test_acc = accuracy_score(y_test, y_pred)
 
     # Save best parameter and accuracy scores
@@ -88,28 +154,14 @@ def model_and_result(training_data, test_data, results_to, plots_to, model_to, s
     save_data(model_results, output_file)
 
     # Plot bar graphs for Logistic Regression coefficients
-    logreg = random_search.best_estimator_.named_steps['logisticregression']
-    coefficients = logreg.coef_
-    class_labels = logreg.classes_
-    for i, class_label in enumerate(class_labels):
-        plt.figure(figsize=(10, 6))
-        sorted_indices = np.argsort(coefficients[i])
-        sorted_features = np.array(list(X_train))[sorted_indices]
-        sorted_coefs = coefficients[i][sorted_indices]
-
-        plt.barh(sorted_features, sorted_coefs, color='skyblue')
-        plt.xlabel('Coefficient Value')
-        plt.ylabel('Feature')
-        plt.title(f'Feature Coefficients for Wine Quality {class_label}')
-        plt.tight_layout()
-
-        # Save the plot
-        filename = f'wine_quality_{class_label}_coefficients.png'
-        filepath = os.path.join(plots_to, filename)
-        plt.savefig(filepath, dpi=300)
-        plt.close()
-
-        print(f"Plot saved as {filepath}")
+    start = time.perf_counter()
+    coefficients, class_labels, feature_names = model_coefficients(random_search)
+    with span('coefficient_plots', combined=combined_coefficient_plot):
+        plots = render_coefficient_plots(coefficients, feature_names, class_labels, plots_to, dpi=300,
+                                         max_workers=plot_workers, combined=combined_coefficient_plot)
+    for result in plots.values():
+        print(f"Plot saved as {result['path']} ({result['seconds']:.2f}s)")
+    print(f"Coefficient plots took {time.perf_counter() - start:.2f}s wall time")
 
 if __name__ == '__main__':
     model_and_result()
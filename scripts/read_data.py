@@ -9,6 +9,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import click
 import pandas as pd
 from sklearn.model_selection import train_test_split
+from src.data_split import hash_split_csv
+from src.instrumentation import configure, span
 from src.read_data import read_data
 
 @click.command()
@@ -26,7 +28,27 @@ from src.read_data import read_data
               default=0.2,
               type=float,
               help='Proportion of data to use in test set')
-def read_split_data(cleaned_data_path, processed_data_path, seed, test_size):
+@click.option('--split_mode',
+              default='random',
+              type=click.Choice(['random', 'hash']),
+              help='Shuffle the data in memory (random), or stream it and split each row by a seeded hash of its contents (hash)')
+@click.option('--stratify',
+              is_flag=True,
+              help='Give each quality class its share of test rows')
+@click.option('--chunksize',
+              default=100_000,
+              type=click.IntRange(min=1),
+              help='Rows read at a time by the hash split')
+@click.option('--spans_to',
+              default=None,
+              envvar='WINE_SPANS_PATH',
+              type=click.Path(dir_okay=False),
+              help='JSON-lines file to append timing and memory spans of each stage to')
+@click.option('--trace_memory',
+              is_flag=True,
+              help='Record tracemalloc peaks and top allocations in the spans (slower)')
+def read_split_data(cleaned_data_path, processed_data_path, seed, test_size, split_mode='random', stratify=False,
+                    chunksize=100_000, spans_to=None, trace_memory=False):
     """
     Reads cleaned data from CLEANED_DATA_PATH and splits it into
     training and test sets and stores that at the folder
@@ -38,18 +60,37 @@ def read_split_data(cleaned_data_path, processed_data_path, seed, test_size):
 
     By default, it reads from the data/raw folder and stores data splits in data/processed.
     The random seed is 522 by default and yields an 80:20 split for training and test.
+
+    The hash split mode reads the data in chunks and keeps each row in the same
+    set as rows are added, so memory use stays flat and splits stay comparable.
     """
+    configure(spans_to, trace_memory=trace_memory, script='read_data')
+
     # Make sure folder exists for output
     os.makedirs(processed_data_path, exist_ok=True)
 
+    if split_mode == 'hash':
+        with span('hash_split', test_size=test_size, stratify=stratify, chunksize=chunksize) as attrs:
+            counts = hash_split_csv(cleaned_data_path, processed_data_path, test_size=test_size, seed=seed,
+                                    stratify='quality' if stratify else None, chunksize=chunksize)
+            attrs['rows'] = counts['rows_read']
+        print(f"Split {counts['rows_read']} rows into {counts['train_rows']} training "
+              f"and {counts['test_rows']} test rows")
+        return
+
     # Read data to split into training and test sets
-    cleaned_data = read_data(cleaned_data_path)
+    with span('read') as attrs:
+        cleaned_data = read_data(cleaned_data_path, cache=True)
+        attrs['rows'] = len(cleaned_data)
 
-    train_df, test_df = train_test_split(cleaned_data, test_size=test_size, random_state=seed)
+    with span('split', rows=len(cleaned_data), test_size=test_size):
+        train_df, test_df = train_test_split(cleaned_data, test_size=test_size, random_state=seed,
+                                             stratify=cleaned_data['quality'] if stratify else None)
 
     # Store the training and test sets
-    train_df.to_csv(os.path.join(processed_data_path, 'training_set.csv'), index=False)
-    test_df.to_csv(os.path.join(processed_data_path, 'test_set.csv'), index=False)
+    with span('save', rows=len(cleaned_data)):
+        train_df.to_csv(os.path.join(processed_data_path, 'training_set.csv'), index=False)
+        test_df.to_csv(os.path.join(processed_data_path, 'test_set.csv'), index=False)
 
 if __name__ == '__main__':
     read_split_data()
\ No newline at end of file
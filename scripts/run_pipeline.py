@@ -0,0 +1,49 @@
+# run_pipeline.py
+# Runs the analysis stages that are out of date, skipping those whose outputs are cached.
+# Run by following command: python scripts/run_pipeline.py --targets model --max_workers 2
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import click
+from src.find_best_model import SEARCHES
+from src.pipeline_runner import CACHE_DIR, run_pipeline, wine_pipeline
+
+@click.command()
+@click.option('--targets', default=None, type=str,
+              help='Comma-separated stages to bring up to date (download, validate, split, eda, model, report, report_pdf); all by default')
+@click.option('--force', default='', type=str, help='Comma-separated stages to rerun even if cached')
+@click.option('--adopt', default='', type=str,
+              help='Comma-separated stages whose existing outputs are cached as up to date without running them (e.g. download)')
+@click.option('--max_workers', default=2, type=click.IntRange(min=1), help='Most stages running at once')
+@click.option('--cache_dir', default=CACHE_DIR, type=str, help='Directory of the stage cache')
+@click.option('--seed', default=522, type=int, help='Random seed for the split and the model search')
+@click.option('--test_size', default=0.2, type=float, help='Proportion of data to use in test set')
+@click.option('--n_jobs', default=-1, type=int, help='Parallel fits in the model search')
+@click.option('--search', default='random', type=click.Choice(SEARCHES), help='Search mode of the model stage')
+@click.option('--dry_run', is_flag=True, help='Only report which stages would run')
+def run(targets, force, adopt, max_workers, cache_dir, seed, test_size, n_jobs, search, dry_run):
+    """
+    Runs download -> validate -> split -> eda/model -> report as a DAG.
+    A stage is skipped when its outputs are cached for the hash of its
+    input files, parameters and source code.
+    """
+    stages = wine_pipeline(seed=seed, test_size=test_size, n_jobs=n_jobs, search=search)
+    results = run_pipeline(stages,
+                           targets=targets.split(',') if targets else None,
+                           cache_dir=cache_dir,
+                           max_workers=max_workers,
+                           force=[name for name in force.split(',') if name],
+                           adopt=[name for name in adopt.split(',') if name],
+                           dry_run=dry_run)
+
+    counts = {}
+    for result in results.values():
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    print('Pipeline finished: ' + ', '.join(f'{n} {status}' for status, n in counts.items()))
+    if counts.get('failed') or counts.get('blocked'):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    run()
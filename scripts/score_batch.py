@@ -0,0 +1,42 @@
+# score_batch.py
+# Scores a CSV of wines of any size with the tuned model, chunk by chunk.
+# Run by following command: python scripts/score_batch.py --input_path ./data/processed/test_set.csv --output_path ./results/tables/test_set_scored.csv
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import click
+from src.batch_scoring import ON_INVALID, score_csv
+from src.prediction_server import load_model
+
+@click.command()
+@click.option('--model_path', default='./results/models/tuned_model.npz', type=click.Path(exists=True, dir_okay=False),
+              help='Path to the tuned model artifact (.npz) or pickle')
+@click.option('--input_path', type=click.Path(exists=True, dir_okay=False), required=True,
+              help='CSV of wines with the training columns')
+@click.option('--output_path', type=str, required=True, help='CSV file to write the input rows and their predictions to')
+@click.option('--chunksize', default=100_000, type=click.IntRange(min=1), help='Rows read and scored at a time')
+@click.option('--on_invalid', default='error', type=click.Choice(ON_INVALID),
+              help='Stop at rows breaking the training schema, or skip them')
+def score_batch(model_path, input_path, output_path, chunksize, on_invalid):
+    """
+    Streams a CSV through the tuned model, validating each chunk against the
+    training schema and appending predicted classes and probabilities to the output.
+    """
+    model = load_model(model_path)
+    print(f"Scoring {input_path} in chunks of {chunksize} rows...")
+    try:
+        counts = score_csv(model, input_path, output_path, chunksize=chunksize, on_invalid=on_invalid)
+    except ValueError as e:
+        print(f"Scoring failed: {e}")
+        sys.exit(1)
+
+    if counts['invalid_rows']:
+        print(f"Skipped {counts['invalid_rows']} rows breaking the schema: {counts['failures']}")
+    print(f"Scored {counts['rows_scored']} of {counts['rows_read']} rows in {counts['seconds']:.2f}s "
+          f"({counts['rows_per_s']:,.0f} rows/s)")
+    print(f"Predictions saved to {output_path}")
+
+if __name__ == '__main__':
+    score_batch()
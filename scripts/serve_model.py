@@ -0,0 +1,39 @@
+# serve_model.py
+# Serves the tuned wine quality model over HTTP on the local machine.
+# Run by following command: python scripts/serve_model.py --model_path ./results/models/tuned_model.npz --port 8000
+
+import asyncio
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import click
+from src.prediction_server import PredictionServer, load_model
+
+@click.command()
+@click.option('--model_path', default='./results/models/tuned_model.npz', type=click.Path(exists=True, dir_okay=False),
+              help='Path to the tuned model artifact (.npz) or pickle')
+@click.option('--host', default='127.0.0.1', type=str, help='Interface to listen on')
+@click.option('--port', default=8000, type=int, help='Port to listen on')
+@click.option('--max_batch_size', default=64, type=click.IntRange(min=1), help='Maximum rows scored in one batch')
+@click.option('--max_wait_ms', default=5.0, type=click.FloatRange(min=0), help='Longest wait for a batch to fill, in milliseconds')
+def serve_model(model_path, host, port, max_batch_size, max_wait_ms):
+    """
+    Loads the tuned model once and scores wines POSTed as JSON to /predict,
+    micro-batching concurrent requests. Counters are served at /stats.
+    """
+    server = PredictionServer(load_model(model_path), host=host, port=port,
+                              max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    async def run():
+        await server.start()
+        print(f"Serving {model_path} on http://{server.host}:{server.port} (Ctrl+C to stop)")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("Server stopped")
+
+if __name__ == '__main__':
+    serve_model()
@@ -0,0 +1,48 @@
+# span_summary.py
+# Prints the slowest stages recorded by the scripts' --spans_to option.
+# Run by following command: python scripts/span_summary.py ./results/spans.jsonl --top 10
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import click
+import pandas as pd
+from src.instrumentation import read_spans, summarize_spans
+
+@click.command()
+@click.argument('spans_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--top', default=10, type=click.IntRange(min=1), help='Number of spans to show')
+@click.option('--by', default='wall_s', type=click.Choice(['wall_s', 'cpu_s', 'rss_growth_mb', 'traced_peak_mb']),
+              help='Measure to rank the spans by')
+@click.option('--allocations', is_flag=True, help='Also print the top allocation sites of the slowest spans')
+def span_summary(spans_path, top, by, allocations):
+    """
+    Summarizes a JSON-lines span file: the slowest individual spans and
+    the totals per script and span name.
+    """
+    spans = read_spans(spans_path)
+    if spans.empty:
+        print(f"No spans in {spans_path}")
+        return
+    if by not in spans.columns:
+        print(f"No span in {spans_path} recorded {by}; run the scripts with --trace_memory")
+        sys.exit(1)
+    slowest, totals = summarize_spans(spans, top=top, by=by)
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.float_format', '{:.3f}'.format):
+        print(f"{len(spans)} spans from {spans['script'].nunique()} scripts in {spans_path}\n")
+        print(f"Slowest spans by {by}:")
+        print(slowest.to_string(index=False))
+        print(f"\nTotals by span:")
+        print(totals.to_string(index=False))
+
+    if allocations and 'top_allocations' in spans.columns:
+        print("\nTop allocations:")
+        for _, row in spans.sort_values(by, ascending=False).head(top).iterrows():
+            if isinstance(row['top_allocations'], list) and row['top_allocations']:
+                print(f"{row['script']} / {row['span']}:")
+                for allocation in row['top_allocations']:
+                    print(f"  {allocation['size_mb']:8.2f} MB  {allocation['count']:>8} blocks  {allocation['location']}")
+
+if __name__ == '__main__':
+    span_summary()
@@ -10,9 +10,13 @@ import pandera as pa
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from src.data_validation import (
     create_directory, 
+    define_schema,
     validate_and_clean_data, 
+    validate_and_clean_data_chunked,
+    validate_and_clean_data_incremental,
     save_data)
 
+from src.instrumentation import configure, span
 from src.read_data import read_data
 
 @click.command()
@@ -28,46 +32,101 @@ from src.read_data import read_data
     help="Path to save the processed data.",
     type=click.Path(file_okay=False),
 )
-def validate_raw_data(input_path, processed_data_path):
+@click.option(
+    "--chunksize",
+    default=None,
+    help="Validate the input in chunks of this many rows to keep memory use flat.",
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--engine",
+    default="pandera",
+    help="Validation engine: pandera, or numpy for the compiled NumPy validator.",
+    type=click.Choice(["pandera", "numpy"]),
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only validate rows appended to the input since the last run, appending them to the output.",
+)
+@click.option(
+    "--state_dir",
+    default=None,
+    help="Directory for the incremental watermark and row hashes (next to the output by default).",
+    type=click.Path(file_okay=False),
+)
+@click.option(
+    "--spans_to",
+    default=None,
+    envvar="WINE_SPANS_PATH",
+    help="JSON-lines file to append timing and memory spans of each stage to.",
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "--trace_memory",
+    is_flag=True,
+    help="Record tracemalloc peaks and top allocations in the spans (slower).",
+)
+def validate_raw_data(input_path, processed_data_path, chunksize, engine, incremental, state_dir, spans_to,
+                      trace_memory):
     """
     Script to validate and clean wine quality data.
     Data validation done by pandera before data splitting. 
     """
+    configure(spans_to, trace_memory=trace_memory, script="validate_raw_data")
     # Make sure folder exists for output
     create_directory(processed_data_path)
-    
+    output_file = os.path.join(processed_data_path, "cleaned_wine_quality.csv")
+
+    if incremental:
+        print(f"Validating rows appended to {input_path} since the last run...")
+        try:
+            with span("validate_incremental", engine=engine) as attrs:
+                counts = validate_and_clean_data_incremental(input_path, define_schema(), output_file, state_dir,
+                                                             chunksize or 100_000, engine=engine)
+                attrs.update(mode=counts["mode"], rows=counts["rows_read"], bytes_read=counts["bytes_read"])
+        except pa.errors.SchemaErrors as e:
+            print("Validation failed. Errors:")
+            print(e.failure_cases)
+            return
+        print(f"{counts['mode'].capitalize()} run read {counts['rows_read']} rows ({counts['bytes_read']} bytes): "
+              f"dropped {counts['invalid_rows']} invalid and {counts['duplicate_rows']} duplicate rows, "
+              f"appended {counts['rows_written']}.")
+        print(f"Processed data saved to {output_file} ({counts['total_rows']} rows)")
+        print(f"Data validation is done.")
+        return
+
+    if chunksize is not None:
+        print(f"Validating {input_path} in chunks of {chunksize} rows...")
+        try:
+            with span("validate_chunked", engine=engine, chunksize=chunksize) as attrs:
+                counts = validate_and_clean_data_chunked(input_path, define_schema(), output_file,
+                                                         chunksize, engine=engine)
+                attrs["rows"] = counts["rows_read"]
+        except pa.errors.SchemaErrors as e:
+            print("Validation failed. Errors:")
+            print(e.failure_cases)
+            return
+        print(f"Read {counts['rows_read']} rows: dropped {counts['invalid_rows']} invalid "
+              f"and {counts['duplicate_rows']} duplicate rows.")
+        print(f"Processed data saved to {output_file}")
+        print(f"Data validation is done.")
+        return
+
     # Read the data
     print(f"Reading data from {input_path}...")
-    raw_data = read_data(input_path)
+    with span("read") as attrs:
+        raw_data = read_data(input_path, cache=True)
+        attrs["rows"] = len(raw_data)
 
     # Define the schema for validation
-    schema = pa.DataFrameSchema(
-        {
-            "color": pa.Column(str, pa.Check.isin(["red", "white"])),
-            "fixed_acidity": pa.Column(float, pa.Check.between(0, 16), nullable=True),
-            "volatile_acidity": pa.Column(float, pa.Check.between(0, 1.8), nullable=True),
-            "citric_acid": pa.Column(float, pa.Check.between(0, 1.4), nullable=True),
-            "residual_sugar": pa.Column(float, pa.Check.between(0, 30), nullable=True),
-            "chlorides": pa.Column(float, pa.Check.between(0, 0.7), nullable=True),
-            "free_sulfur_dioxide": pa.Column(float, pa.Check.between(0, 160), nullable=True),
-            "total_sulfur_dioxide": pa.Column(float, pa.Check.between(0, 400), nullable=True),
-            "density": pa.Column(float, pa.Check.between(0, 1.5), nullable=True),
-            "pH": pa.Column(float, pa.Check.between(0, 5), nullable=True),
-            "sulphates": pa.Column(float, pa.Check.between(0, 2.5), nullable=True),
-            "alcohol": pa.Column(float, pa.Check.between(9, 15), nullable=True),
-            "quality": pa.Column(float, pa.Check.between(1, 10), nullable=True),
-        },
-        checks=[
-            pa.Check(lambda df: ~df.duplicated().any(), error="Duplicate rows found."),
-            pa.Check(lambda df: ~(df.isna().all(axis=1)).any(), error="Empty rows found."),
-        ],
-        drop_invalid_rows=True,
-    )
+    schema = define_schema()
 
     # Validate and clean the data
-    print("Validating and cleaning data through pandera...")
+    print(f"Validating and cleaning data through {engine}...")
     try:
-        clean_data = validate_and_clean_data(raw_data, schema)
+        with span("validate", engine=engine, rows=len(raw_data)):
+            clean_data = validate_and_clean_data(raw_data, schema, engine=engine)
         print("Validation successful.")
     except pa.errors.SchemaErrors as e:
         print("Validation failed. Errors:")
@@ -75,8 +134,8 @@ def validate_raw_data(input_path, processed_data_path):
         return
 
     # Save cleaned data
-    output_file = os.path.join(processed_data_path, "cleaned_wine_quality.csv")
-    save_data(clean_data, output_file)
+    with span("save", rows=len(clean_data)):
+        save_data(clean_data, output_file)
     print(f"Processed data saved to {output_file}")
     print(f"Data validation is done.")
 
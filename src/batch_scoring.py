@@ -0,0 +1,100 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from src.data_validation import CompiledSchema, define_schema
+from src.fused_inference import compile_model
+from src.read_data import read_data, write_csv_chunk
+
+ON_INVALID = ('error', 'skip')
+
+def score_csv(model, input_path, output_path, chunksize=100_000, schema=None, on_invalid='error'):
+    """Scores a CSV of wines chunk by chunk and writes the predictions next to the input columns
+
+    Each chunk is checked against the training schema's column rules (rows missing a feature are invalid too),
+    scored with the fused NumPy engine (see compile_model) and appended to the output, so memory depends on
+    the chunk size and not on the size of the file. The output gets a predicted_quality column and one probability_<class> column per
+    class. It is written to a temporary file and only moved to output_path once every chunk is scored.
+
+    Parameters
+    ----------
+    model : object
+        Tuned model: a search object or pipeline from model_and_results.py, or a model loaded from its artifact
+    input_path : str
+        CSV with the training feature columns (any other columns, e.g. quality, are copied to the output)
+    output_path : str
+        CSV file to write
+    chunksize : int
+        Number of rows read and scored at a time
+    schema : pandera.DataFrameSchema, optional
+        Schema whose rules the feature columns must follow; defaults to define_schema()
+    on_invalid : str
+        'error' stops at the first chunk with rows breaking the schema, 'skip' leaves those rows out
+        of the output and counts them
+
+    Returns
+    -------
+    dict
+        rows_read, rows_scored, invalid_rows, failures (rule name to count of invalid rows),
+        seconds (wall time) and rows_per_s
+    """
+    if not isinstance(chunksize, int) or chunksize <= 0:
+        raise ValueError('chunksize must be a positive integer')
+    if on_invalid not in ON_INVALID:
+        raise ValueError(f'on_invalid must be one of {ON_INVALID}')
+
+    fused = compile_model(model)
+    feature_names = list(fused.feature_names_in_)
+    numeric_columns = [feature_names[i] for i in fused.numeric_idx]
+    categorical_columns = [feature_names[position] for position, _, _ in fused.categorical]
+
+    # Only the feature columns are checked: new wines have no quality yet. The model cannot score a
+    # missing feature, so feature columns must not be null even where the schema allows it
+    schema = define_schema() if schema is None else schema
+    schema = schema.remove_columns([name for name in schema.columns if name not in feature_names])
+    compiled = CompiledSchema(schema.update_columns({name: {'nullable': False} for name in schema.columns}))
+    probability_columns = [f'probability_{label}' for label in fused.classes_]
+
+    counts = {'rows_read': 0, 'rows_scored': 0, 'invalid_rows': 0, 'failures': {}}
+    start = time.perf_counter()
+    tmp_path = f'{output_path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as out:
+            header = True
+            for chunk in read_data(input_path, chunksize=chunksize):
+                counts['rows_read'] += len(chunk)
+                keep, failures = compiled.check(chunk)
+                n_invalid = len(chunk) - int(np.count_nonzero(keep))
+                if n_invalid:
+                    failures = {rule: n for rule, n in failures.items() if n}
+                    if on_invalid == 'error':
+                        first_row = counts['rows_read'] - len(chunk) + int(np.argmin(keep))
+                        raise ValueError(f'{n_invalid} rows break the schema, the first at data row {first_row}: {failures}')
+                    for rule, n in failures.items():
+                        counts['failures'][rule] = counts['failures'].get(rule, 0) + n
+                    counts['invalid_rows'] += n_invalid
+                    chunk = chunk[keep]
+
+                logits = fused.score_arrays(chunk[numeric_columns].to_numpy(dtype=np.float64),
+                                            *(chunk[column].to_numpy() for column in categorical_columns))
+                scored = chunk.assign(predicted_quality=fused.classes_from_logits(logits))
+                probabilities = pd.DataFrame(fused.proba_from_logits(logits), columns=probability_columns,
+                                             index=chunk.index)
+                write_csv_chunk(pd.concat([scored, probabilities], axis=1), out, header=header)
+                header = False
+                counts['rows_scored'] += len(chunk)
+            if header:
+                # No rows to score: still check the columns and write the output's header
+                empty = read_data(input_path)
+                compiled.check(empty)
+                scored = empty.assign(predicted_quality=fused.classes_[:0])
+                probabilities = pd.DataFrame(np.empty((0, len(probability_columns))), columns=probability_columns)
+                write_csv_chunk(pd.concat([scored, probabilities], axis=1), out, header=True)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    counts['seconds'] = time.perf_counter() - start
+    counts['rows_per_s'] = counts['rows_read'] / counts['seconds'] if counts['seconds'] > 0 else 0.0
+    return counts
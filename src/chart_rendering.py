@@ -0,0 +1,133 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import altair as alt
+from src.instrumentation import span
+
+MANIFEST = '.chart_hashes.json'
+
+def chart_spec_hash(chart, ppi=200):
+    """Hashes everything a rendered chart depends on: its data, its definition and the render settings
+
+    Parameters
+    ----------
+    chart : altair.TopLevelMixin
+        Chart to hash (Chart, LayerChart, ConcatChart, ...)
+    ppi : int
+        Resolution it is rendered at
+
+    Returns
+    -------
+    str
+        SHA-256 hex digest
+    """
+    return _hash_spec(_spec_json(chart), ppi)
+
+def _spec_json(chart):
+    """The chart's Vega-Lite spec with its data inlined, whichever data transformer is active"""
+    with alt.data_transformers.enable('default', max_rows=None):
+        return chart.to_json(sort_keys=True)
+
+def _hash_spec(spec, ppi):
+    try:
+        import vl_convert
+        renderer = vl_convert.__version__
+    except ImportError:
+        renderer = None
+    sha = hashlib.sha256(spec.encode())
+    sha.update(json.dumps({'ppi': ppi, 'altair': alt.__version__, 'vl_convert': renderer}).encode())
+    return sha.hexdigest()
+
+def _render(chart, path, ppi, data_transformer):
+    """Saves one chart (runs in a worker process) and returns the time it took"""
+    start = time.perf_counter()
+    with span('render_chart', chart=os.path.basename(path), ppi=ppi):
+        _save_chart(chart, path, ppi, data_transformer)
+    return time.perf_counter() - start
+
+def _save_chart(chart, path, ppi, data_transformer):
+    alt.data_transformers.enable(data_transformer)
+    tmp_path = f'{os.path.splitext(path)[0]}.{os.getpid()}.tmp{os.path.splitext(path)[1]}'
+    try:
+        chart.save(tmp_path, ppi=ppi)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def render_charts(charts, output_dir, ppi=200, max_workers=None, force=False):
+    """Renders charts to image files in parallel, skipping the ones that are already up to date
+
+    The spec hash of each chart (see chart_spec_hash) is recorded in output_dir/.chart_hashes.json
+    when it is rendered. A chart is skipped when its file exists and its hash matches the recorded one.
+    The other charts are rendered in a pool of worker processes, largest spec first.
+
+    Parameters
+    ----------
+    charts : dict
+        File name (e.g. 'feature_corrs.png') to altair chart
+    output_dir : str
+        Directory to save the files in
+    ppi : int
+        Resolution of the images
+    max_workers : int, optional
+        Number of worker processes; by default one per CPU, at most one per chart. 1 renders in this process
+    force : bool
+        Render every chart even when it is up to date
+
+    Returns
+    -------
+    dict
+        File name to {'path', 'status' ('rendered' or 'cached'), 'seconds' (render wall time)}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST)
+    recorded = {}
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path) as f:
+                recorded = json.load(f)
+        except ValueError:
+            recorded = {}
+
+    results, hashes, sizes, pending = {}, {}, {}, []
+    for filename, chart in charts.items():
+        path = os.path.join(output_dir, filename)
+        spec = _spec_json(chart)
+        hashes[filename], sizes[filename] = _hash_spec(spec, ppi), len(spec)
+        if not force and os.path.exists(path) and recorded.get(filename) == hashes[filename]:
+            results[filename] = {'path': path, 'status': 'cached', 'seconds': 0.0}
+        else:
+            pending.append(filename)
+
+    # Start the slowest renders first; spec size is a good proxy for their cost
+    pending.sort(key=lambda filename: sizes[filename], reverse=True)
+
+    data_transformer = alt.data_transformers.active
+    n_workers = min(max_workers or os.cpu_count() or 1, len(pending))
+    try:
+        if n_workers <= 1:
+            for filename in pending:
+                path = os.path.join(output_dir, filename)
+                results[filename] = {'path': path, 'status': 'rendered',
+                                     'seconds': _render(charts[filename], path, ppi, data_transformer)}
+                recorded[filename] = hashes[filename]
+        else:
+            # Fresh interpreters rather than forks: the renderer's runtime is not fork-safe
+            with ProcessPoolExecutor(n_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = {executor.submit(_render, charts[filename], os.path.join(output_dir, filename), ppi,
+                                           data_transformer): filename for filename in pending}
+                for future in as_completed(futures):
+                    filename = futures[future]
+                    results[filename] = {'path': os.path.join(output_dir, filename), 'status': 'rendered',
+                                         'seconds': future.result()}
+                    recorded[filename] = hashes[filename]
+    finally:
+        # Record what was rendered even if another chart failed
+        with open(f'{manifest_path}.tmp', 'w') as f:
+            json.dump(recorded, f, indent=2, sort_keys=True)
+        os.replace(f'{manifest_path}.tmp', manifest_path)
+    return {filename: results[filename] for filename in charts}
@@ -0,0 +1,146 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from src.instrumentation import span
+
+COMBINED_FILENAME = 'wine_quality_coefficients.png'
+
+def coefficient_filename(class_label):
+    """File name of the coefficient plot of one quality class"""
+    return f'wine_quality_{class_label}_coefficients.png'
+
+def model_coefficients(model):
+    """Coefficient matrix, class labels and feature names of a fitted wine quality model
+
+    The feature names are those of the preprocessor's output (get_feature_names_out), in the order
+    the coefficients are in, so the one-hot encoded color comes first rather than where it is in X.
+
+    Parameters
+    ----------
+    model : sklearn.pipeline.Pipeline or fitted search object with best_estimator_
+        Pipeline of a ColumnTransformer and LogisticRegression
+
+    Returns
+    -------
+    tuple
+        (coefficients of shape (n_classes, n_features), class labels, feature names)
+    """
+    pipeline = getattr(model, 'best_estimator_', model)
+    preprocessor, logreg = pipeline.steps[0][1], pipeline.steps[-1][1]
+    # Drop the transformer prefixes, e.g. 'standardscaler__alcohol' -> 'alcohol'
+    feature_names = [name.split('__', 1)[-1] for name in preprocessor.get_feature_names_out()]
+    if len(feature_names) != logreg.coef_.shape[1]:
+        raise ValueError("The preprocessor's features do not match the model's coefficients")
+    return logreg.coef_, logreg.classes_, np.array(feature_names)
+
+def _draw_coefficients(ax, coefs, feature_names, class_label):
+    order = np.argsort(coefs)
+    ax.barh(feature_names[order], coefs[order], color='skyblue')
+    ax.set_xlabel('Coefficient Value')
+    ax.set_ylabel('Feature')
+    ax.set_title(f'Feature Coefficients for Wine Quality {class_label}')
+
+def _save(fig, path, dpi):
+    """Saves a figure with the Agg canvas, writing to a temporary file first"""
+    FigureCanvasAgg(fig)
+    tmp_path = f'{os.path.splitext(path)[0]}.{os.getpid()}.tmp.png'
+    try:
+        fig.savefig(tmp_path, dpi=dpi, format='png')
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _render_class(coefs, feature_names, class_label, path, dpi):
+    """Saves the coefficient plot of one class (runs in a worker process) and returns the time it took"""
+    start = time.perf_counter()
+    with span('render_coefficient_plot', quality=str(class_label), dpi=dpi):
+        fig = Figure(figsize=(10, 6))
+        _draw_coefficients(fig.add_subplot(), coefs, feature_names, class_label)
+        fig.tight_layout()
+        _save(fig, path, dpi)
+    return time.perf_counter() - start
+
+def _render_combined(coefficients, feature_names, class_labels, path, dpi, columns=4):
+    """Saves the coefficient plots of all classes as small multiples in one figure"""
+    start = time.perf_counter()
+    with span('render_coefficient_plot', quality='all', dpi=dpi):
+        _draw_combined(coefficients, feature_names, class_labels, path, dpi, columns)
+    return time.perf_counter() - start
+
+def _draw_combined(coefficients, feature_names, class_labels, path, dpi, columns):
+    columns = min(columns, len(class_labels))
+    rows = math.ceil(len(class_labels) / columns)
+    fig = Figure(figsize=(5 * columns, 3.5 * rows))
+    axes = fig.subplots(rows, columns, sharex=True, squeeze=False).ravel()
+    for ax, coefs, class_label in zip(axes, coefficients, class_labels):
+        _draw_coefficients(ax, coefs, feature_names, class_label)
+        ax.set_title(f'Wine Quality {class_label}')
+        ax.tick_params(axis='y', labelsize=7)
+        ax.xaxis.set_tick_params(labelbottom=True)
+    for ax in axes[len(class_labels):]:
+        ax.set_visible(False)
+    fig.suptitle('Feature Coefficients by Wine Quality')
+    fig.tight_layout()
+    _save(fig, path, dpi)
+
+def render_coefficient_plots(coefficients, feature_names, class_labels, output_dir, dpi=300, max_workers=None,
+                             combined=False):
+    """Renders a horizontal bar chart of each class's sorted coefficients, in parallel worker processes
+
+    Figures are drawn with matplotlib's Agg canvas directly, without pyplot, so no interactive backend
+    or global figure state is involved.
+
+    Parameters
+    ----------
+    coefficients : numpy.ndarray
+        Coefficient matrix of shape (n_classes, n_features), e.g. LogisticRegression.coef_
+    feature_names : array-like of str
+        Name of each coefficient column (see model_coefficients)
+    class_labels : array-like
+        Label of each coefficient row
+    output_dir : str
+        Directory to save the plots in
+    dpi : int
+        Resolution of the images
+    max_workers : int, optional
+        Number of worker processes; by default one per CPU, at most one per plot. 1 renders in this process
+    combined : bool
+        Save one small-multiples figure of all classes (wine_quality_coefficients.png)
+        instead of one file per class
+
+    Returns
+    -------
+    dict
+        File name to {'path', 'seconds' (render wall time)}
+    """
+    coefficients = np.asarray(coefficients)
+    feature_names = np.asarray(feature_names)
+    if coefficients.shape != (len(class_labels), len(feature_names)):
+        raise ValueError(f"Coefficients of shape {coefficients.shape} do not match "
+                         f"{len(class_labels)} classes and {len(feature_names)} features")
+    os.makedirs(output_dir, exist_ok=True)
+
+    if combined:
+        path = os.path.join(output_dir, COMBINED_FILENAME)
+        seconds = _render_combined(coefficients, feature_names, list(class_labels), path, dpi)
+        return {COMBINED_FILENAME: {'path': path, 'seconds': seconds}}
+
+    jobs = {coefficient_filename(label): (coefs, feature_names, label,
+                                          os.path.join(output_dir, coefficient_filename(label)), dpi)
+            for coefs, label in zip(coefficients, class_labels)}
+    n_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    seconds = {}
+    if n_workers <= 1:
+        for filename, args in jobs.items():
+            seconds[filename] = _render_class(*args)
+    else:
+        with ProcessPoolExecutor(n_workers) as executor:
+            futures = {executor.submit(_render_class, *args): filename for filename, args in jobs.items()}
+            for future in as_completed(futures):
+                seconds[futures[future]] = future.result()
+    return {filename: {'path': args[3], 'seconds': seconds[filename]} for filename, args in jobs.items()}
@@ -0,0 +1,153 @@
+import os
+from fractions import Fraction
+import numpy as np
+import pandas as pd
+from src.data_validation import row_hashes
+from src.read_data import read_data
+
+TRAIN_FILENAME = 'training_set.csv'
+TEST_FILENAME = 'test_set.csv'
+
+def _mix(values):
+    """splitmix64 finalizer: spreads 64-bit values evenly over all 64 bits"""
+    values = np.asarray(values, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+def hash_fractions(data, seed):
+    """Seeded content hash of each row, as a number in [0, 1)
+
+    The value depends only on the row's contents and the seed, not on its position or the rows around it,
+    and integer and float columns hash alike (see row_hashes).
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Rows to hash
+    seed : int
+        Seed mixed into every hash; another seed gives an independent split
+
+    Returns
+    -------
+    numpy.ndarray
+        One float per row, uniformly spread over [0, 1)
+    """
+    seed_hash = _mix(np.uint64(seed % 2**64))
+    mixed = _mix(row_hashes(data) ^ seed_hash)
+    # The top 53 bits as a double
+    return (mixed >> np.uint64(11)).astype(np.float64) * 2.0**-53
+
+def _window(test_size, max_rows=100):
+    """Smallest window of rows m and quota of test rows q with q / m closest to test_size (m at most max_rows)"""
+    fraction = Fraction(test_size).limit_denominator(max_rows)
+    return fraction.denominator, fraction.numerator
+
+def _stratified_test_mask(fractions, classes, test_size, counts):
+    """Follows the hash, but gives each class exactly q test rows in every window of m of its rows
+
+    The rows of each class are taken in consecutive windows of m rows (see _window). Within a window, the running
+    count of rows whose hash fraction is below q / m is clipped so that it never passes q and reaches q by the
+    window's last row; a row goes to the test set where the clipped count goes up. Each class's test count is
+    therefore within q rows of test_size of its rows at any point.
+
+    counts maps each class to its [rows, rows below q / m in its unfinished window] so far and is updated in place.
+    """
+    m, q = _window(test_size)
+    below = fractions < q / m
+    is_test = np.zeros(len(fractions), dtype=bool)
+    # Missing values form a class of their own
+    codes, labels = pd.factorize(classes, use_na_sentinel=False)
+    for code, label in enumerate(labels):
+        label = None if pd.isna(label) else label
+        rows = np.flatnonzero(codes == code)
+        seen, carried = counts.get(label, (0, 0))
+        position = seen + np.arange(len(rows))  # 0-based among the class's rows
+        window, j = position // m, position % m + 1
+        hits = below[rows].astype(np.int64)
+        before = np.cumsum(hits) - hits
+        # Hash test rows so far in each row's window, counting those carried over from earlier chunks
+        window_start = pd.Series(before).groupby(window).transform('first').to_numpy()
+        raw = before - window_start + np.where(window == window[0], carried, 0) + hits
+        lower = np.maximum(0, q - (m - j))
+        clipped = np.clip(raw, lower, q)
+        clipped_before = np.where(j == 1, 0, np.clip(raw - hits, np.maximum(0, q - (m - j + 1)), q))
+        is_test[rows] = clipped > clipped_before
+        counts[label] = [seen + len(rows), 0 if j[-1] == m else int(raw[-1])]
+    return is_test
+
+def hash_split_csv(input_path, output_dir, test_size=0.2, seed=522, stratify=None, chunksize=100_000):
+    """Splits a CSV file into training and test sets by a seeded hash of each row, in one streaming pass
+
+    A row goes to the test set when its hash fraction (see hash_fractions) is below test_size, so without
+    stratify its split depends only on its contents and the seed: rows keep their split as rows are added,
+    removed or reordered, and duplicate rows never straddle the split. Only one chunk is held in memory.
+
+    With stratify, every window of m consecutive rows of a class gets exactly q test rows, with q / m the
+    fraction closest to test_size with m at most 100 (1 in 5 for 0.2). The hash picks which rows, but the last
+    rows of a window are moved to fill or keep within its quota, so small classes get their share of test rows
+    too. A row's split then also depends on the rows of its class before it: splits stay fixed while rows are
+    only appended, and duplicate rows can end up on both sides.
+
+    Parameters
+    ----------
+    input_path : str
+        CSV file to split, e.g. the cleaned wine data
+    output_dir : str
+        Directory to write training_set.csv and test_set.csv to; both are replaced only once complete
+    test_size : float
+        Expected fraction of rows in the test set, between 0 and 1
+    seed : int
+        Seed of the hash
+    stratify : str, optional
+        Column whose classes each get test_size of their rows, e.g. 'quality'
+    chunksize : int
+        Rows read at a time
+
+    Returns
+    -------
+    dict
+        Number of rows read and written to each set
+
+    Example
+    -------
+    >>> hash_split_csv('data/processed/cleaned_wine_quality.csv', 'data/processed', stratify='quality')
+    """
+    if not 0 < test_size < 1:
+        raise ValueError("test_size must be between 0 and 1")
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {name: os.path.join(output_dir, filename)
+             for name, filename in [('train', TRAIN_FILENAME), ('test', TEST_FILENAME)]}
+    tmp_paths = {name: f'{path}.{os.getpid()}.tmp' for name, path in paths.items()}
+    counts = {'rows_read': 0, 'train_rows': 0, 'test_rows': 0}
+    class_counts = {}
+    header = True
+    try:
+        with open(tmp_paths['train'], 'w') as train_out, open(tmp_paths['test'], 'w') as test_out:
+            for chunk in read_data(input_path, chunksize=chunksize):
+                if stratify is not None and stratify not in chunk.columns:
+                    raise KeyError(f"No column {stratify!r} to stratify on")
+                fractions = hash_fractions(chunk, seed)
+                if stratify is None:
+                    is_test = fractions < test_size
+                else:
+                    is_test = _stratified_test_mask(fractions, chunk[stratify], test_size, class_counts)
+                chunk[~is_test].to_csv(train_out, header=header, index=False)
+                chunk[is_test].to_csv(test_out, header=header, index=False)
+                header = False
+                counts['rows_read'] += len(chunk)
+                counts['test_rows'] += int(is_test.sum())
+            if header:
+                # Empty input: copy its header, if it has one
+                columns = read_data(input_path).columns
+                for out in (train_out, test_out):
+                    out.write(','.join(columns) + '\n')
+        counts['train_rows'] = counts['rows_read'] - counts['test_rows']
+        for name in paths:
+            os.replace(tmp_paths[name], paths[name])
+    finally:
+        for tmp_path in tmp_paths.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return counts
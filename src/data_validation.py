@@ -1,7 +1,14 @@
+import copy
+import hashlib
+import io
+import json
 import os
+import numpy as np
 import pandas as pd
 import pandera as pa
 
+from src.read_data import read_data
+
 
 def create_directory(path):
     """
@@ -75,7 +82,7 @@ def define_schema():
     )
 
 
-def validate_and_clean_data(data, schema):
+def validate_and_clean_data(data, schema, engine="pandera"):
     """
     Validate and clean data using a Pandera schema.
     Any rows that fail the validation rules are dropped, along with duplicate and completely empty rows.
@@ -84,14 +91,425 @@ def validate_and_clean_data(data, schema):
     ----------
     data (pandas.DataFrame): The input DataFrame to validate.
     schema (pandera.DataFrameSchema): The schema to validate the DataFrame against.
+    engine (str): "pandera" to validate with Pandera, or "numpy" to apply the schema
+        as compiled NumPy masks (see CompiledSchema). Both keep the same rows.
     
     Returns
     -------
     pandas.DataFrame: The validated and cleaned DataFrame.
     """
+    if engine == "numpy":
+        return CompiledSchema(schema).validate(data)[0]
+    if engine != "pandera":
+        raise ValueError("engine must be 'pandera' or 'numpy'.")
     return schema.validate(data, lazy=True).drop_duplicates().dropna(how="all")
 
 
+def row_hashes(data):
+    """
+    Compute a 64-bit content hash for every row of a DataFrame.
+    Numeric columns are hashed as float64 so that the same row hashes identically
+    whether pandas parsed its chunk as integers or floats.
+
+    Parameters
+    ----------
+    data (pandas.DataFrame): The rows to hash.
+
+    Returns
+    -------
+    numpy.ndarray: One uint64 hash per row, in row order.
+    """
+    numeric_cols = data.select_dtypes(include="number").columns
+    casts = {col: "float64" for col in numeric_cols if data[col].dtype != "float64"}
+    if casts:
+        data = data.astype(casts)
+    return pd.util.hash_pandas_object(data, index=False).to_numpy()
+
+
+class RowHashSet:
+    """
+    Compact set of 64-bit row hashes used to find duplicate rows across chunks.
+    Hashes are kept in a single sorted uint64 array (8 bytes per unique row) rather
+    than a Python set or the rows themselves.
+
+    Parameters
+    ----------
+    hashes (numpy.ndarray, optional): Hashes already known to be in the set.
+    """
+
+    def __init__(self, hashes=None):
+        if hashes is None:
+            hashes = np.empty(0, dtype=np.uint64)
+        self.hashes = np.unique(np.asarray(hashes, dtype=np.uint64))
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def add_new(self, hashes):
+        """
+        Add a batch of hashes and report which of them were not seen before.
+        Only the first occurrence of a hash within the batch counts as new.
+
+        Parameters
+        ----------
+        hashes (numpy.ndarray): uint64 row hashes, in row order.
+
+        Returns
+        -------
+        numpy.ndarray: Boolean mask, True for rows whose hash is new.
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        is_new = ~pd.Series(hashes).duplicated().to_numpy()
+
+        if len(self.hashes):
+            pos = np.searchsorted(self.hashes, hashes).clip(max=len(self.hashes) - 1)
+            is_new &= self.hashes[pos] != hashes
+
+        # Merge the sorted new hashes into the sorted set instead of re-sorting all of it
+        new = np.sort(hashes[is_new])
+        self.hashes = np.insert(self.hashes, np.searchsorted(self.hashes, new), new)
+        return is_new
+
+    def save(self, path):
+        """
+        Save the hashes to a .npy file with np.save.
+
+        Parameters
+        ----------
+        path (str): File to write.
+        """
+        with open(path, "wb") as f:
+            np.save(f, self.hashes)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a RowHashSet saved with save.
+
+        Parameters
+        ----------
+        path (str): File written by save.
+
+        Returns
+        -------
+        RowHashSet: The saved set.
+        """
+        row_hash_set = cls()
+        row_hash_set.hashes = np.load(path)
+        return row_hash_set
+
+
+def _chunk_checker(schema, engine):
+    """
+    Build a function applying the column rules of a schema to one chunk of rows.
+    The frame-wide duplicate and empty-row checks are left to the caller, which
+    handles them across chunks.
+    """
+    if engine == "numpy":
+        compiled = CompiledSchema(schema)
+        return lambda chunk: chunk[compiled.check(chunk)[0]]
+    if engine == "pandera":
+        chunk_schema = copy.deepcopy(schema)
+        chunk_schema.checks = []
+        return lambda chunk: chunk_schema.validate(chunk, lazy=True)
+    raise ValueError("engine must be 'pandera' or 'numpy'.")
+
+
+def validate_and_clean_data_chunked(input_path, schema, output_path, chunksize=100_000, engine="pandera"):
+    """
+    Validate and clean a CSV file in chunks, writing cleaned rows as they are produced.
+    Each chunk is validated against the column rules of the schema, and duplicates are
+    found across the whole file with a RowHashSet, so peak memory depends on the chunk
+    size (plus 8 bytes per unique row) rather than on the size of the input.
+    Rows are kept or dropped exactly as validate_and_clean_data would.
+
+    Parameters
+    ----------
+    input_path (str): Path to the raw CSV file.
+    schema (pandera.DataFrameSchema): The schema to validate each chunk against.
+    output_path (str): The file path where the cleaned CSV file will be written.
+    chunksize (int): Number of rows to read and validate at a time.
+    engine (str): "pandera" or "numpy", as for validate_and_clean_data.
+
+    Returns
+    -------
+    dict: Row counts for "rows_read", "invalid_rows", "duplicate_rows" and "rows_written".
+    """
+    if not isinstance(chunksize, int) or chunksize <= 0:
+        raise ValueError("chunksize must be a positive integer.")
+
+    # Duplicates are handled across chunks below, so the frame-wide checks would only
+    # repeat that work on every chunk.
+    check_chunk = _chunk_checker(schema, engine)
+
+    seen = RowHashSet()
+    counts = {"rows_read": 0, "invalid_rows": 0, "duplicate_rows": 0, "rows_written": 0}
+    with open(output_path, "w", newline="") as out:
+        for i, chunk in enumerate(read_data(input_path, chunksize=chunksize)):
+            counts["rows_read"] += len(chunk)
+            valid = check_chunk(chunk).dropna(how="all")
+            counts["invalid_rows"] += len(chunk) - len(valid)
+
+            unique = valid[seen.add_new(row_hashes(valid))]
+            counts["duplicate_rows"] += len(valid) - len(unique)
+
+            unique.to_csv(out, header=(i == 0), index=False)
+            counts["rows_written"] += len(unique)
+
+    if counts["rows_written"] == 0:
+        os.remove(output_path)
+        raise ValueError("No rows passed validation; nothing was saved.")
+    return counts
+
+
+class _BoundedReader(io.RawIOBase):
+    """Read-only view of the bytes of a binary file up to a given offset."""
+
+    def __init__(self, f, end):
+        self.f = f
+        self.end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = max(0, min(len(buffer), self.end - self.f.tell()))
+        data = self.f.read(n)
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _complete_lines_end(f, size, block=65536):
+    """Offset just past the last newline of a binary file, so a half-written last line is left for later."""
+    pos = size
+    while pos > 0:
+        start = max(0, pos - block)
+        f.seek(start)
+        last = f.read(pos - start).rfind(b"\n")
+        if last >= 0:
+            return start + last + 1
+        pos = start
+    return 0
+
+
+def _head_digest(f, offset, length=65536):
+    """SHA-256 of the first bytes of a file, used to notice a raw file that was replaced rather than appended to."""
+    f.seek(0)
+    return hashlib.sha256(f.read(min(offset, length))).hexdigest()
+
+
+def validate_and_clean_data_incremental(input_path, schema, output_path, state_dir=None, chunksize=100_000,
+                                        engine="pandera"):
+    """
+    Validate only the rows appended to a raw CSV file since the last run, and append them to the cleaned output.
+    A watermark records the byte offset of the input validated so far, and the row hashes of every
+    cleaned row are kept in a RowHashSet saved with np.save, so new rows duplicating earlier history
+    are dropped. Run time and memory depend on the size of the new tail (plus 8 bytes per unique
+    row), not on the whole history. After any number of runs the output holds the same rows as
+    validate_and_clean_data_chunked on the whole file.
+
+    The state is updated only after the new rows are appended. If a run is interrupted, the next run
+    first truncates the output back to its size at the watermark. If the start of the input changed, or
+    the input got shorter, the file was replaced rather than appended to and everything is validated again.
+    A half-written last line (no trailing newline yet) is left for the next run.
+
+    Parameters
+    ----------
+    input_path (str): Path to the raw CSV file.
+    schema (pandera.DataFrameSchema): The schema to validate the new rows against.
+    output_path (str): The cleaned CSV file to append to.
+    state_dir (str, optional): Directory for the watermark and the row-hash index;
+        by default output_path + ".ingest".
+    chunksize (int): Number of rows to read and validate at a time.
+    engine (str): "pandera" or "numpy", as for validate_and_clean_data.
+
+    Returns
+    -------
+    dict: "mode" ("full" or "incremental"), "bytes_read" and the row counts "rows_read",
+        "invalid_rows", "duplicate_rows", "rows_written" of this run, and "total_rows" in the output.
+    """
+    if not isinstance(chunksize, int) or chunksize <= 0:
+        raise ValueError("chunksize must be a positive integer.")
+    check_chunk = _chunk_checker(schema, engine)
+    state_dir = state_dir or f"{output_path}.ingest"
+    os.makedirs(state_dir, exist_ok=True)
+    watermark_path = os.path.join(state_dir, "watermark.json")
+
+    state = None
+    if os.path.exists(watermark_path) and os.path.exists(output_path):
+        with open(watermark_path) as f:
+            state = json.load(f)
+    # Never reuse the name of the hash file the current watermark points to
+    generation = (state or {}).get("generation", 0) + 1
+
+    counts = {"mode": "incremental", "bytes_read": 0, "rows_read": 0, "invalid_rows": 0,
+              "duplicate_rows": 0, "rows_written": 0}
+    with open(input_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if (state is None or size < state["offset"]
+                or _head_digest(f, state["offset"]) != state["head_sha256"]
+                or os.path.getsize(output_path) < state["output_bytes"]):
+            counts["mode"] = "full"
+            state = {"offset": 0, "columns": None, "output_bytes": 0, "total_rows": 0, "hashes": None}
+        seen = RowHashSet.load(os.path.join(state_dir, state["hashes"])) if state["hashes"] else RowHashSet()
+
+        end = _complete_lines_end(f, size)
+        f.seek(state["offset"])
+        columns = state["columns"]
+        if columns is None and end > 0:
+            columns = pd.read_csv(io.BytesIO(f.readline()), nrows=0).columns.tolist()
+        start = f.tell()
+
+        with open(output_path, "r+b" if state["output_bytes"] else "wb") as out:
+            # Drop anything a previous, interrupted run appended after the watermark
+            out.truncate(state["output_bytes"])
+            out.seek(state["output_bytes"])
+            text_out = io.TextIOWrapper(out, newline="", write_through=True)
+            header = state["output_bytes"] == 0
+            if end > start:
+                reader = pd.read_csv(io.BufferedReader(_BoundedReader(f, end)), names=columns, header=None,
+                                     chunksize=chunksize)
+                for chunk in reader:
+                    counts["rows_read"] += len(chunk)
+                    valid = check_chunk(chunk).dropna(how="all")
+                    counts["invalid_rows"] += len(chunk) - len(valid)
+
+                    unique = valid[seen.add_new(row_hashes(valid))]
+                    counts["duplicate_rows"] += len(valid) - len(unique)
+                    if len(unique) or header:
+                        unique.to_csv(text_out, header=header, index=False)
+                        header = False
+                    counts["rows_written"] += len(unique)
+            elif header and columns is not None:
+                text_out.write(",".join(columns) + "\n")
+            text_out.flush()
+            out.flush()
+            os.fsync(out.fileno())
+            output_bytes = out.tell()
+            text_out.detach()
+
+        counts["bytes_read"] = end - state["offset"]
+        head_sha256 = _head_digest(f, end)
+
+    # Save the new hashes under a new name and switch the watermark to them in one atomic replace
+    hashes_name = f"row_hashes.{generation}.npy"
+    seen.save(os.path.join(state_dir, hashes_name))
+    new_state = {"input_path": os.path.abspath(input_path), "offset": end, "head_sha256": head_sha256,
+                 "columns": columns, "output_bytes": output_bytes,
+                 "total_rows": state["total_rows"] + counts["rows_written"],
+                 "hashes": hashes_name, "generation": generation}
+    with open(f"{watermark_path}.tmp", "w") as f:
+        json.dump(new_state, f, indent=2)
+    os.replace(f"{watermark_path}.tmp", watermark_path)
+    for name in os.listdir(state_dir):
+        if name.startswith("row_hashes.") and name != hashes_name:
+            os.remove(os.path.join(state_dir, name))
+
+    counts["total_rows"] = new_state["total_rows"]
+    return counts
+
+
+_COMPILED_CHECKS = {
+    "in_range": lambda v, st: ((v >= st["min_value"]) if st["include_min"] else (v > st["min_value"]))
+                              & ((v <= st["max_value"]) if st["include_max"] else (v < st["max_value"])),
+    "greater_than": lambda v, st: v > st["min_value"],
+    "greater_than_or_equal_to": lambda v, st: v >= st["min_value"],
+    "less_than": lambda v, st: v < st["max_value"],
+    "less_than_or_equal_to": lambda v, st: v <= st["max_value"],
+}
+
+
+class CompiledSchema:
+    """
+    A Pandera schema compiled into NumPy boolean masks.
+    Every column check becomes one vectorized comparison over the column array, so the
+    whole schema is applied in a single pass without building Pandera's failure-case frame.
+    Validating with a CompiledSchema keeps the same rows as validate_and_clean_data.
+
+    Only the column checks used by define_schema (in_range/between, isin and the
+    greater/less than comparisons) plus nullability can be compiled. Frame-wide checks
+    are not compiled: duplicate and completely empty rows are always dropped instead,
+    as validate_and_clean_data does.
+
+    Parameters
+    ----------
+    schema (pandera.DataFrameSchema): The schema to compile.
+    """
+
+    def __init__(self, schema):
+        self.rules = []
+        for name, column in schema.columns.items():
+            for check in column.checks:
+                if check.name != "isin" and check.name not in _COMPILED_CHECKS:
+                    raise ValueError(f"Check '{check.name}' on column '{name}' cannot be compiled.")
+                self.rules.append((name, check.name, check.statistics))
+        self.nullable = {name: column.nullable for name, column in schema.columns.items()}
+
+    def check(self, data):
+        """
+        Apply the column checks and nullability rules of the schema.
+
+        Parameters
+        ----------
+        data (pandas.DataFrame): The input DataFrame to check.
+
+        Returns
+        -------
+        tuple: A boolean numpy.ndarray, True for rows passing every column rule, and a
+            dict mapping "column:check" and "column:not_nullable" to failure counts.
+        """
+        missing = [name for name in self.nullable if name not in data.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {missing}")
+
+        keep = np.ones(len(data), dtype=bool)
+        failures = {}
+        is_null = {name: data[name].isna().to_numpy() for name in self.nullable}
+
+        for name, nullable in self.nullable.items():
+            if not nullable:
+                failures[f"{name}:not_nullable"] = int(np.count_nonzero(is_null[name]))
+                keep &= ~is_null[name]
+
+        for name, check, statistics in self.rules:
+            if check == "isin":
+                ok = data[name].isin(statistics["allowed_values"]).to_numpy()
+            else:
+                with np.errstate(invalid="ignore"):
+                    ok = _COMPILED_CHECKS[check](data[name].to_numpy(dtype=np.float64), statistics)
+            # Nulls are reported by the nullability rule, not by the value checks
+            ok |= is_null[name]
+            failures[f"{name}:{check}"] = int(len(ok) - np.count_nonzero(ok))
+            keep &= ok
+
+        return keep, failures
+
+    def validate(self, data):
+        """
+        Validate and clean data, and count how many rows broke each rule.
+        A row that breaks several rules is counted once under each of them.
+
+        Parameters
+        ----------
+        data (pandas.DataFrame): The input DataFrame to validate.
+
+        Returns
+        -------
+        tuple: The cleaned pandas.DataFrame and a dict mapping "column:check",
+            "column:not_nullable", "duplicates" and "empty_rows" to failure counts.
+        """
+        keep, failures = self.check(data)
+        valid = data.iloc[np.flatnonzero(keep)]
+
+        first = ~pd.Series(row_hashes(valid)).duplicated().to_numpy()
+        failures["duplicates"] = int(len(valid) - np.count_nonzero(first))
+
+        empty = valid.isna().all(axis=1).to_numpy()
+        failures["empty_rows"] = int(np.count_nonzero(first & empty))
+
+        return valid[first & ~empty], failures
+
+
 def save_data(data, output_path):
     """
     Save cleaned data to a CSV file.
@@ -1,9 +1,15 @@
+import numpy as np
 import pandas as pd
 import altair as alt
-import altair_ally as aly
+from src.wine_statistics import WineStatistics
 
-def create_quality_distribution_plot(df, color_column='quality'):
+def create_quality_distribution_plot(df, color_column='quality', steps=100, bins=512):
     """Creates a distribution plot for wine quality scores.
+
+    The density of each numeric feature is estimated per color_column group in NumPy,
+    with a Gaussian kernel (Scott's rule bandwidth, as Vega's density transform uses)
+    applied to a fine histogram of the feature. Only the densities at the plotted
+    points are embedded in the chart, not the rows of df.
     
     Parameters
     ----------
@@ -11,27 +17,97 @@ def create_quality_distribution_plot(df, color_column='quality'):
         DataFrame containing wine features
     color_column : str
         Column for coloring (default: quality)
+    steps : int
+        Number of points each density is evaluated at
+    bins : int
+        Number of histogram bins the kernel is applied to
         
     Returns
     -------
-    altair.Chart
-        Distribution plot
+    altair.ConcatChart
+        Distribution plot, one density plot per numeric feature
     """
     if not isinstance(df, pd.DataFrame):
         raise TypeError("df must be a DataFrame")
         
-    aly.alt.data_transformers.enable('vegafusion')
-    return aly.dist(df, color=color_column)
+    columns = df.select_dtypes('number').columns.tolist()[::-1]
+    densities = _feature_densities(df, columns, color_column, steps, bins)
+    color_type = 'Q' if pd.api.types.is_numeric_dtype(df[color_column]) else 'N'
+
+    subplots = []
+    for col in columns:
+        subplot = alt.Chart(mark=alt.MarkDef('area', opacity=0.1, interpolate='monotone')).transform_filter(
+            alt.datum.feature == col
+        ).encode(
+            alt.X('value:Q', title=col, axis=alt.Axis(grid=False)),
+            alt.Y('density:Q', title=None).stack(False),
+            alt.Color(f'{color_column}:{color_type}', title=None)
+        ).properties(width=185, height=120)
+        subplots.append(subplot + subplot.mark_line(interpolate='monotone'))
+
+    # Layout in a single row for up to 3 features, then as square a grid as possible
+    n_columns = len(columns) if len(columns) <= 3 else int(np.ceil(np.sqrt(len(columns))))
+    return alt.concat(*subplots, columns=n_columns, data=densities)
+
+def _feature_densities(df, columns, color_column, steps, bins):
+    """Binned kernel density of each column per group, evaluated on a grid over the column's range, in long format."""
+    groups = df[color_column].dropna().unique()
+    groups.sort()
+    frames = []
+    for col in columns:
+        values = df[col].to_numpy(dtype=np.float64)
+        finite = np.isfinite(values)
+        if not finite.any():
+            continue
+        low, high = values[finite].min(), values[finite].max()
+        edges = np.linspace(low, high, bins + 1) if high > low else np.array([low - 0.5, high + 0.5])
+        centers = (edges[:-1] + edges[1:]) / 2
+        grid = np.linspace(low, high, steps)
+        for group in groups:
+            group_values = values[finite & (df[color_column] == group).to_numpy()]
+            if len(group_values) == 0:
+                continue
+            counts, _ = np.histogram(group_values, bins=edges)
+            bandwidth = _scott_bandwidth(group_values, fallback=2 * (edges[-1] - edges[0]) / steps)
+            kernel = np.exp(-0.5 * ((grid[:, None] - centers[None, :]) / bandwidth) ** 2)
+            density = kernel @ counts / (len(group_values) * bandwidth * np.sqrt(2 * np.pi))
+            frames.append(pd.DataFrame({'feature': col, color_column: group,
+                                        'value': _round_significant(grid, 6), 'density': _round_significant(density)}))
+    return pd.concat(frames, ignore_index=True)
+
+def _round_significant(values, digits=4):
+    """Rounds to a number of significant digits, which is all a plot needs, to keep the spec small."""
+    # Values this far below the largest one round to zero anyway, and would overflow the scale
+    values = np.where(np.abs(values) < 1e-12 * np.abs(values).max(), 0.0, values)
+    magnitude = np.floor(np.log10(np.abs(values), out=np.zeros_like(values), where=values != 0))
+    scale = 10.0 ** (digits - 1 - magnitude)
+    return np.round(values * scale) / scale
+
+def _scott_bandwidth(values, fallback):
+    """Normal reference bandwidth 1.06 * min(sd, IQR / 1.34) * n^(-1/5), or fallback for constant values."""
+    sd = values.std(ddof=1) if len(values) > 1 else 0.0
+    q1, q3 = np.percentile(values, [25, 75])
+    spread = min(sd, (q3 - q1) / 1.34) or sd
+    return 1.06 * spread * len(values) ** -0.2 if spread > 0 else fallback
 
 def create_wine_quality_proportion_plot(df):
-    """Creates a line plot showing quality score proportions by wine color."""
-    if 'color' not in df.columns or 'quality' not in df.columns:
+    """Creates a line plot showing quality score proportions by wine color.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame or WineStatistics
+        Wine data, or statistics accumulated over it, with 'color' and 'quality' columns
+
+    Returns
+    -------
+    altair.Chart
+        Line plot
+    """
+    if 'color' not in _columns(df) or 'quality' not in _columns(df):
         raise ValueError("Missing required columns")
 
     # Calculate proportions
-    props = (df.groupby(['color', 'quality'])
-             .size()
-             .reset_index(name='count'))
+    props = _class_counts(df, ['color', 'quality']).reset_index(name='count')
     props['proportion'] = props.groupby('color')['count'].transform(lambda x: x/x.sum())
 
     # Create plot
@@ -55,28 +131,98 @@ def create_wine_quality_proportion_plot(df):
     
     return chart
 
-def create_correlation_matrix(df):
+def create_correlation_matrix(df, corr_types=('pearson', 'spearman')):
     """Creates a correlation matrix visualization for numerical features.
+
+    The correlations are computed with pandas, or from the covariance of a
+    WineStatistics accumulator (Pearson only, since rank correlations need
+    every row); the chart only holds the lower triangle of each correlation matrix.
     
     Parameters
     ----------
-    df : pandas.DataFrame
-        Wine feature data
+    df : pandas.DataFrame or WineStatistics
+        Wine feature data, or statistics accumulated over it
+    corr_types : tuple of str
+        Correlations to plot side by side (any method accepted by DataFrame.corr)
         
     Returns
     -------
-    altair.Chart
+    altair.ConcatChart
         Correlation matrix plot
     """
+    if isinstance(df, WineStatistics):
+        if any(corr_type != 'pearson' for corr_type in corr_types):
+            raise ValueError("Only pearson correlations can be computed from WineStatistics")
+        return _correlation_chart({'pearson': df.correlation()})
     if not isinstance(df, pd.DataFrame):
         raise TypeError("df must be a DataFrame")
     
-    return aly.corr(df)
+    numeric = df.select_dtypes(['number', 'boolean'])
+    return _correlation_chart({corr_type: numeric.corr(corr_type) for corr_type in corr_types})
+
+def _correlation_chart(matrices):
+    """Draws the lower triangles of correlation matrices as side by side circle grids."""
+    frames = []
+    for corr_type, corr_df in matrices.items():
+        corr_df = corr_df.copy()
+        corr_df.values[np.triu_indices_from(corr_df.values)] = np.nan
+        long = corr_df.rename_axis('index').reset_index().melt(id_vars='index').dropna()
+        frames.append(long.assign(corr_type=corr_type))
+    corr_long = pd.concat(frames, ignore_index=True).sort_values(['corr_type', 'variable'], ascending=[True, False])
+
+    first = corr_long[corr_long['corr_type'] == next(iter(matrices))]
+    var_sort = first['variable'].value_counts().index.tolist()
+    ind_sort = first['index'].value_counts().index.tolist()
+
+    subplots = []
+    for num, corr_type in enumerate(matrices):
+        subplots.append(
+            alt.Chart(mark='circle', title=f'{corr_type.capitalize()} correlations').transform_filter(
+                alt.datum.corr_type == corr_type
+            ).transform_calculate(
+                abs_value='abs(datum.value)'
+            ).encode(
+                alt.X('index:N', sort=ind_sort, title=''),
+                alt.Y('variable:N', sort=var_sort[::-1], title='',
+                      axis=alt.Axis(labels=False) if num > 0 else alt.Axis()),
+                alt.Color('value:Q', title='', scale=alt.Scale(domain=[-1, 1], scheme='blueorange')),
+                alt.Size('abs_value:Q', scale=alt.Scale(domain=[0, 1]), legend=None),
+                [alt.Tooltip('value:Q', format='.2f').title('corr'), alt.Tooltip('index:N').title('x'),
+                 alt.Tooltip('variable:N').title('y')]
+            )
+        )
+
+    return alt.concat(*subplots, data=corr_long).resolve_axis(y='shared').configure_view(strokeWidth=0)
+
+def create_sulfur_dioxide_scatter(df, sample_size=None, mode='points', bins=40):
+    """Creates a scatter plot for sulfur dioxide measurements.
 
-def create_sulfur_dioxide_scatter(df, sample_size=None):
-    """Creates a scatter plot for sulfur dioxide measurements."""
+    In 'density' mode the points are binned into a 2-D histogram with NumPy and drawn as a heatmap,
+    and the regression line is fitted from sufficient statistics accumulated over the rows in chunks.
+    The chart then holds at most bins * bins cells whatever the number of rows, so no sampling is needed.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Wine data with free and total sulfur dioxide columns
+    sample_size : int, optional
+        Number of rows to sample in 'points' mode
+    mode : str
+        'points' draws one circle per row, 'density' a binned heatmap
+    bins : int
+        Number of bins along each axis in 'density' mode
+
+    Returns
+    -------
+    altair.LayerChart
+        Scatter plot or heatmap with its regression line
+    """
     if not isinstance(df, pd.DataFrame):
         raise TypeError("df must be a DataFrame")
+    if mode not in ('points', 'density'):
+        raise ValueError("mode must be 'points' or 'density'")
+    if mode == 'density':
+        return _sulfur_dioxide_density(df, bins)
         
     if sample_size is not None:
         if not isinstance(sample_size, int) or sample_size <= 0:
@@ -106,17 +252,102 @@ def create_sulfur_dioxide_scatter(df, sample_size=None):
     
     return points + line
 
-def create_boxplots_by_color(df):
+def _sulfur_dioxide_density(df, bins):
+    """Heatmap of binned free vs total sulfur dioxide with a least-squares line."""
+    x = df['free_sulfur_dioxide'].to_numpy(dtype=np.float64)
+    y = df['total_sulfur_dioxide'].to_numpy(dtype=np.float64)
+    finite = np.isfinite(x) & np.isfinite(y)
+    x, y = x[finite], y[finite]
+    if len(x) == 0:
+        raise ValueError("No rows with both sulfur dioxide values")
+
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    x_idx, y_idx = np.nonzero(counts)
+    cells = pd.DataFrame({
+        'free_start': x_edges[x_idx], 'free_end': x_edges[x_idx + 1],
+        'total_start': y_edges[y_idx], 'total_end': y_edges[y_idx + 1],
+        'count': counts[x_idx, y_idx].astype(int)
+    })
+
+    slope, intercept = regression_line(regression_statistics(x, y))
+    line_x = np.array([x_edges[0], x_edges[-1]])
+    line = pd.DataFrame({'free_sulfur_dioxide': line_x, 'total_sulfur_dioxide': intercept + slope * line_x})
+
+    heatmap = alt.Chart(cells).mark_rect().encode(
+        x=alt.X('free_start:Q', bin='binned', title='Free Sulfur Dioxide (mg/L)'),
+        x2='free_end:Q',
+        y=alt.Y('total_start:Q', bin='binned', title='Total Sulfur Dioxide (mg/L)'),
+        y2='total_end:Q',
+        color=alt.Color('count:Q', scale=alt.Scale(type='log', scheme='blues'), title='Wines'),
+        tooltip=['count:Q']
+    )
+    fit = alt.Chart(line).mark_line(color='red', size=2).encode(
+        x='free_sulfur_dioxide:Q',
+        y='total_sulfur_dioxide:Q'
+    )
+    return (heatmap + fit).properties(
+        width=500,
+        height=300,
+        title='The ratio of free sulfur dioxide to total stays quite consistent'
+    )
+
+def regression_statistics(x, y, chunksize=1_000_000, statistics=None):
+    """Accumulates the sufficient statistics of a simple linear regression of y on x.
+
+    Parameters
+    ----------
+    x, y : numpy.ndarray
+        Paired observations
+    chunksize : int
+        Rows added at a time
+    statistics : dict, optional
+        Statistics of earlier data to add to (e.g. from previous chunks of a file)
+
+    Returns
+    -------
+    dict
+        n and the sums x, y, xx and xy, centered on the first chunk's means for numerical stability
+    """
+    statistics = dict(statistics) if statistics else None
+    for start in range(0, len(x), chunksize):
+        x_chunk, y_chunk = x[start:start + chunksize], y[start:start + chunksize]
+        if statistics is None:
+            statistics = {'n': 0, 'x0': x_chunk.mean(), 'y0': y_chunk.mean(),
+                          'x': 0.0, 'y': 0.0, 'xx': 0.0, 'xy': 0.0}
+        dx, dy = x_chunk - statistics['x0'], y_chunk - statistics['y0']
+        statistics['n'] += len(x_chunk)
+        statistics['x'] += dx.sum()
+        statistics['y'] += dy.sum()
+        statistics['xx'] += dx @ dx
+        statistics['xy'] += dx @ dy
+    return statistics
+
+def regression_line(statistics):
+    """Returns the least-squares (slope, intercept) from regression_statistics."""
+    n = statistics['n']
+    sxx = statistics['xx'] - statistics['x'] ** 2 / n
+    sxy = statistics['xy'] - statistics['x'] * statistics['y'] / n
+    slope = sxy / sxx if sxx > 0 else 0.0
+    intercept = statistics['y0'] + statistics['y'] / n - slope * (statistics['x0'] + statistics['x'] / n)
+    return slope, intercept
+
+def create_boxplots_by_color(df, max_outliers=20):
     """Creates box plots for numerical features grouped by wine color.
+
+    Quartiles, whiskers (the furthest values within 1.5 IQR of the box, as in
+    Vega-Lite box plots) and outliers are computed with pandas, so the chart
+    holds a few summary rows per feature instead of every row of df.
     
     Parameters
     ----------
     df : pandas.DataFrame
         Wine data with 'color' column
+    max_outliers : int
+        Most outliers drawn per feature and color; the ones furthest from the box are kept
         
     Returns
     -------
-    altair.Chart
+    altair.VConcatChart
         Grid of box plots
     """
     if 'color' not in df.columns:
@@ -125,46 +356,73 @@ def create_boxplots_by_color(df):
     # Get numerical columns except the target variable
     num_cols = df.select_dtypes(include=['float64', 'int64']).columns
     num_cols = [col for col in num_cols if col != 'quality']
+    stats, outliers = _box_stats(df, num_cols, 'color', max_outliers)
+    data = pd.concat([stats, outliers], ignore_index=True)
 
     # Create box plots
     plots = []
     for col in num_cols:
-        plot = alt.Chart(df).mark_boxplot().encode(
-            x=alt.X(col + ':Q', scale=alt.Scale(zero=False)),
-            y='color:N',
+        base = alt.Chart().transform_filter(alt.datum.feature == col).encode(
+            y=alt.Y('color:N', title='color'),
             color='color:N'
-        ).properties(
+        )
+        box = base.transform_filter('isValid(datum.q1)')
+        whiskers = box.mark_rule().encode(
+            x=alt.X('lower:Q', title=col, scale=alt.Scale(zero=False)), x2='upper:Q'
+        )
+        bars = box.mark_bar(size=14).encode(x='q1:Q', x2='q3:Q')
+        medians = box.mark_tick(color='white', size=14).encode(x='median:Q')
+        points = base.transform_filter('isValid(datum.outlier)').mark_point().encode(x='outlier:Q')
+        plots.append(alt.layer(whiskers, bars, medians, points).properties(
             title=col,
             width=250,
             height=80
-        )
-        plots.append(plot)
+        ))
 
-    return alt.vconcat(*[alt.hconcat(*plots[i:i + 2]) for i in range(0, len(plots), 2)]).properties(
+    return alt.vconcat(*[alt.hconcat(*plots[i:i + 2]) for i in range(0, len(plots), 2)], data=data).properties(
         title='Distribution of various quantities between the two types of wines'
     )
 
+def _box_stats(df, columns, group_column, max_outliers):
+    """Box plot summaries (q1, median, q3, whiskers) and capped outliers per column and group."""
+    stats, outliers = [], []
+    for col in columns:
+        for group, values in df.groupby(group_column, observed=True)[col]:
+            values = values.dropna()
+            if values.empty:
+                continue
+            q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+            low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+            inside = values[(values >= low) & (values <= high)]
+            stats.append({'feature': col, group_column: group, 'q1': q1, 'median': median, 'q3': q3,
+                          'lower': inside.min(), 'upper': inside.max()})
+            outside = values[(values < low) | (values > high)]
+            distance = np.maximum(low - outside, outside - high)
+            kept = outside[distance.sort_values(ascending=False, kind='stable').index[:max_outliers]]
+            outliers.append(pd.DataFrame({'feature': col, group_column: group, 'outlier': kept.to_numpy()}))
+    return pd.DataFrame(stats), pd.concat(outliers, ignore_index=True) if outliers else pd.DataFrame()
+
 def create_quality_distribution_bar(df):
     """Creates a bar chart showing wine quality score distribution.
     
     Parameters
     ----------
-    df : pandas.DataFrame
-        Wine data with 'quality' column
+    df : pandas.DataFrame or WineStatistics
+        Wine data, or statistics accumulated over it, with 'quality' column
         
     Returns
     -------
     altair.Chart
         Bar chart
     """
-    if 'quality' not in df.columns:
+    if 'quality' not in _columns(df):
         raise ValueError("Missing 'quality' column")
 
     # Calculate quality distribution
-    quality_counts = df['quality'].value_counts()
+    quality_counts = _class_counts(df, ['quality'])
     plot_df = pd.DataFrame({
         'quality': quality_counts.index,
-        'percentage': (quality_counts.values / len(df) * 100).round(1)
+        'percentage': (quality_counts.values / quality_counts.sum() * 100).round(1)
     }).sort_values('quality')
 
     # Create bar chart
@@ -176,4 +434,14 @@ def create_quality_distribution_bar(df):
         width=350,
         height=200,
         title='Wine Quality Distribution'
-    )
\ No newline at end of file
+    )
+
+def _columns(data):
+    """Columns of a DataFrame, or the class columns counted by a WineStatistics."""
+    return data.class_columns if isinstance(data, WineStatistics) else data.columns
+
+def _class_counts(data, columns):
+    """Number of rows per combination of values of columns, from a DataFrame or a WineStatistics."""
+    if isinstance(data, WineStatistics):
+        return data.class_counts(columns)
+    return data.groupby(columns).size()
@@ -0,0 +1,9 @@
+import hashlib
+
+def file_digest(path):
+    """Returns the SHA-256 hex digest of a file's contents"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
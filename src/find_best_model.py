@@ -1,8 +1,20 @@
+import tempfile
+import time
+from contextlib import nullcontext
 import sklearn, numpy
 import pandas as pd
-from sklearn.model_selection import RandomizedSearchCV
+from joblib import parallel_backend
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV, ParameterSampler, RandomizedSearchCV
+from sklearn.base import clone
+from src.fold_search import FoldTransformCache, RegularizationPathSearchCV
+from src.instrumentation import span
 
-def find_best_model(X_train, y_train, model, range, cv, n_iter, scoring_metric, seed=None):
+BACKENDS = ('loky', 'multiprocessing', 'threading')
+SEARCHES = ('random', 'halving', 'path')
+
+def find_best_model(X_train, y_train, model, range, cv, n_iter, scoring_metric, seed=None,
+                    n_jobs=None, backend='loky', search='random', preprocessing_cache=None, shared_folds=False):
     """Finds the best C parameter for Logistic Regression within a pipeline and return the pipeline
     
     Parameters
@@ -23,11 +35,32 @@ def find_best_model(X_train, y_train, model, range, cv, n_iter, scoring_metric,
         Metric to evaluate the model on when doing random search
     seed : int
         Number to determine random state of RandomizedSearchCV (for reproducible results)
+    n_jobs : int, optional
+        Number of candidate/fold fits to run in parallel (-1 uses all cores, None runs them one after another)
+    backend : str
+        joblib backend for the parallel fits: 'loky' or 'multiprocessing' (process pools) or 'threading'
+    search : str
+        'random' fits all n_iter candidates on the full training folds. 'halving' uses successive halving:
+        all n_iter candidates start on a small subsample and only the best third moves on to a
+        three times larger one, until the last round uses the full training folds. 'path' evaluates the same
+        n_iter values of C as 'random', in increasing order and warm-started from the previous C within each fold
+        (see RegularizationPathSearchCV); its score_curve() gives the CV score for each C
+    preprocessing_cache : FoldTransformCache, optional
+        Cache for the pipeline's preprocessing steps, so each fold is preprocessed once rather than once per
+        candidate. Its hits and misses attributes count cache use. An in-memory cache needs the 'threading'
+        backend or serial fits (n_jobs None or 1), since worker processes cannot share it. Not supported by 'path', which already
+        preprocesses each fold once
+    shared_folds : bool or str
+        With the 'path' search, write the preprocessed folds to memory-mapped files
+        (see memmap_folds), which worker processes read without receiving their own copies. True uses a
+        temporary directory removed after the search; a string is the directory to keep the files in
         
     Returns
     -------
-    sklearn.model_selection.RandomizedSearchCV
-        RandomizedSearchCV object after being tuned on C value of Logistic Regression and fitted on X_train, y_train
+    sklearn.model_selection.RandomizedSearchCV, sklearn.model_selection.HalvingRandomSearchCV or RegularizationPathSearchCV
+        Search object after being tuned on C value of Logistic Regression and fitted on X_train, y_train.
+        Its search_time_ attribute holds the wall time of the whole search in seconds (see search_timings
+        and search_summary)
     """
     if not isinstance(X_train, pd.DataFrame):
         raise TypeError("X_train must be a pandas data frame")
@@ -52,11 +85,140 @@ def find_best_model(X_train, y_train, model, range, cv, n_iter, scoring_metric,
     
     if not isinstance(seed, int):
         raise TypeError("seed must be an integer")
+    
+    if n_jobs is not None and not isinstance(n_jobs, int):
+        raise TypeError("n_jobs must be an integer or None")
+    
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}")
+    
+    if search not in SEARCHES:
+        raise ValueError(f"search must be one of {SEARCHES}")
+    
+    if shared_folds and search != 'path':
+        raise ValueError("shared_folds is only supported by the 'path' search")
+    
+    if preprocessing_cache is not None:
+        if not isinstance(preprocessing_cache, FoldTransformCache):
+            raise TypeError("preprocessing_cache must be a FoldTransformCache")
+        if search == 'path':
+            raise ValueError("preprocessing_cache is not supported by the 'path' search, which preprocesses each fold once")
+        if preprocessing_cache.location is None and backend != 'threading' and n_jobs not in (None, 1):
+            raise ValueError("An in-memory preprocessing_cache cannot be shared by worker processes; "
+                             "use backend='threading', n_jobs=1 or a disk cache")
+        model = clone(model).set_params(memory=preprocessing_cache.bind(X_train, y_train))
         
-    tuned_model = RandomizedSearchCV(model, param_distributions={'logisticregression__C': range},
-                                       cv=cv,
-                                       n_iter=n_iter,
-                                       scoring=scoring_metric,
-                                       random_state=seed)
-    tuned_model.fit(X_train, y_train)
+    if search == 'path':
+        # Same candidates RandomizedSearchCV would draw for this seed
+        Cs = [params['logisticregression__C'] for params in
+              ParameterSampler({'logisticregression__C': range}, n_iter, random_state=seed)]
+        tuned_model = RegularizationPathSearchCV(model, Cs, cv=cv, scoring=scoring_metric, n_jobs=n_jobs)
+    elif search == 'halving':
+        tuned_model = HalvingRandomSearchCV(model, param_distributions={'logisticregression__C': range},
+                                            n_candidates=n_iter,
+                                            min_resources='exhaust',
+                                            cv=cv,
+                                            scoring=scoring_metric,
+                                            random_state=seed,
+                                            n_jobs=n_jobs)
+    else:
+        tuned_model = RandomizedSearchCV(model, param_distributions={'logisticregression__C': range},
+                                           cv=cv,
+                                           n_iter=n_iter,
+                                           scoring=scoring_metric,
+                                           random_state=seed,
+                                           n_jobs=n_jobs)
+    start = time.perf_counter()
+    fold_dir = (tempfile.TemporaryDirectory(prefix='shared_folds_') if shared_folds is True
+                else nullcontext(shared_folds or None))
+    # parallel_backend defaults to every core; n_jobs=None means serial fits
+    backend_context = parallel_backend(backend, n_jobs=1 if n_jobs is None else n_jobs)
+    with span('search_fit', search=search, rows=len(X_train), n_iter=n_iter, cv=cv,
+              shared_folds=bool(shared_folds)), backend_context, fold_dir as directory:
+        if directory is not None:
+            tuned_model.set_params(fold_dir=directory)
+        tuned_model.fit(X_train, y_train)
+    if shared_folds is True:
+        # The temporary directory is gone; do not keep pointing at it
+        tuned_model.set_params(fold_dir=None)
+    tuned_model.search_time_ = time.perf_counter() - start
+    if preprocessing_cache is not None:
+        # Keep the cached fold matrices out of the fitted model (e.g. when it is pickled)
+        tuned_model.estimator.set_params(memory=None)
+        tuned_model.best_estimator_.set_params(memory=None)
     return tuned_model
+
+def search_timings(tuned_model):
+    """Collects per-candidate fit and score wall times from a fitted search
+
+    Parameters
+    ----------
+    tuned_model : sklearn.model_selection.RandomizedSearchCV, sklearn.model_selection.HalvingRandomSearchCV
+                  or RegularizationPathSearchCV
+        Search returned by find_best_model
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per candidate C, sorted by C, with the mean/std fit and score times of a single fold,
+        their totals over all folds, the mean test score and its rank.
+        Halving searches have one row per candidate and round, with the round (iter) and its
+        number of training samples (n_resources)
+    """
+    results = tuned_model.cv_results_
+    n_splits = tuned_model.n_splits_
+    timings = pd.DataFrame({
+        'C': numpy.asarray(results['param_logisticregression__C'], dtype=float),
+        'mean_fit_time': results['mean_fit_time'],
+        'std_fit_time': results['std_fit_time'],
+        'mean_score_time': results['mean_score_time'],
+        'std_score_time': results['std_score_time'],
+        'total_fit_time': results['mean_fit_time'] * n_splits,
+        'total_score_time': results['mean_score_time'] * n_splits,
+        'mean_test_score': results['mean_test_score'],
+        'rank_test_score': results['rank_test_score'],
+    })
+    if 'iter' in results:
+        timings['iter'] = results['iter']
+        timings['n_resources'] = results['n_resources']
+        return timings.sort_values(['C', 'iter']).reset_index(drop=True)
+    return timings.sort_values('C').reset_index(drop=True)
+
+def search_summary(tuned_model):
+    """Summarizes the cost of a fitted search
+
+    For a halving search, the cost of a full random search over the same candidates is estimated from
+    the fit and score times of its last round, which uses the full training folds, scaled by how much
+    wall time each second of fitting took in this search (i.e. assuming the same parallelism)
+
+    Parameters
+    ----------
+    tuned_model : sklearn.model_selection.RandomizedSearchCV, sklearn.model_selection.HalvingRandomSearchCV
+                  or RegularizationPathSearchCV
+        Search returned by find_best_model
+
+    Returns
+    -------
+    dict
+        n_fits (cross-validation fits performed), search_time (wall seconds), and the estimated
+        full_search_fits, full_search_time and time_saved of an equivalent full random search
+    """
+    timings = search_timings(tuned_model)
+    n_splits = tuned_model.n_splits_
+    n_fits = len(timings) * n_splits
+    search_time = tuned_model.search_time_
+
+    if 'iter' not in timings:
+        return {'n_fits': n_fits, 'search_time': search_time,
+                'full_search_fits': n_fits, 'full_search_time': search_time, 'time_saved': 0.0}
+
+    fit_and_score = timings['total_fit_time'] + timings['total_score_time']
+    wall_per_fit_second = search_time / fit_and_score.sum()
+    last_round = timings['iter'] == timings['iter'].max()
+    full_time_per_candidate = fit_and_score[last_round].mean()
+
+    full_search_fits = tuned_model.n_candidates_[0] * n_splits
+    full_search_time = tuned_model.n_candidates_[0] * full_time_per_candidate * wall_per_fit_second
+    return {'n_fits': n_fits, 'search_time': search_time,
+            'full_search_fits': full_search_fits, 'full_search_time': full_search_time,
+            'time_saved': full_search_time - search_time}
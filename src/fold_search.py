@@ -0,0 +1,361 @@
+import os
+import threading
+import time
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, clone
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import check_cv
+from sklearn.pipeline import Pipeline
+
+def split_pipeline(model):
+    """Splits a pipeline into its preprocessing steps and its final estimator
+
+    Parameters
+    ----------
+    model : sklearn.pipeline.Pipeline
+        Pipeline ending in the model being tuned (e.g. LogisticRegression)
+
+    Returns
+    -------
+    tuple
+        The preprocessing steps as a Pipeline (None if the pipeline only has the final estimator),
+        the name of the final step and the final estimator itself
+    """
+    name, estimator = model.steps[-1]
+    preprocessor = Pipeline(model.steps[:-1]) if len(model.steps) > 1 else None
+    return preprocessor, name, estimator
+
+def preprocess_folds(model, X, y, cv):
+    """Fits the preprocessing steps of a pipeline once per cross-validation fold
+
+    The folds are the same ones RandomizedSearchCV would use for the same cv and y
+
+    Parameters
+    ----------
+    model : sklearn.pipeline.Pipeline
+        Pipeline whose preprocessing steps are fitted on each training fold
+    X : pd.DataFrame
+        Training set feature values
+    y : pd.Series
+        Target variable values of the training set
+    cv : int
+        Number of folds
+
+    Returns
+    -------
+    list of tuple
+        (X_fold_train, y_fold_train, X_fold_test, y_fold_test) per fold, with X already transformed
+    """
+    preprocessor, _, _ = split_pipeline(model)
+    splitter = check_cv(cv, y, classifier=True)
+    folds = []
+    for train_idx, test_idx in splitter.split(X, y):
+        X_fold_train, X_fold_test = X.iloc[train_idx], X.iloc[test_idx]
+        if preprocessor is not None:
+            fold_preprocessor = clone(preprocessor)
+            X_fold_train = fold_preprocessor.fit_transform(X_fold_train, y.iloc[train_idx])
+            X_fold_test = fold_preprocessor.transform(X_fold_test)
+        folds.append((X_fold_train, y.iloc[train_idx], X_fold_test, y.iloc[test_idx]))
+    return folds
+
+def memmap_folds(model, X, y, cv, directory):
+    """Preprocesses each cross-validation fold once into memory-mapped NumPy files
+
+    Like preprocess_folds, but each fold's transformed rows are written to directory/fold_<k>.npy, training
+    rows first and test rows after them, and its targets to directory/fold_<k>_y.npy. The folds are returned as read-only memory-mapped slices, so only one fold is in memory while they are written, and
+    joblib passes them to worker processes by file name: every worker reads the same pages of the page
+    cache instead of receiving its own pickled copy.
+
+    Parameters
+    ----------
+    model : sklearn.pipeline.Pipeline
+        Pipeline whose preprocessing steps are fitted on each training fold
+    X : pd.DataFrame
+        Training set feature values
+    y : pd.Series
+        Target variable values of the training set (numeric, as the wine quality is)
+    cv : int
+        Number of folds
+    directory : str
+        Directory to write the fold files to; it is created if needed and existing fold files are replaced
+
+    Returns
+    -------
+    list of tuple
+        (X_fold_train, y_fold_train, X_fold_test, y_fold_test) per fold as numpy.memmap slices, with X
+        already transformed
+    """
+    y_values = np.asarray(y)
+    if y_values.dtype.hasobject:
+        raise TypeError("memmap_folds needs a numeric target")
+    os.makedirs(directory, exist_ok=True)
+    preprocessor, _, _ = split_pipeline(model)
+    folds = []
+    for k, (train_idx, test_idx) in enumerate(check_cv(cv, y, classifier=True).split(X, y)):
+        X_fold_train, X_fold_test = X.iloc[train_idx], X.iloc[test_idx]
+        if preprocessor is not None:
+            fold_preprocessor = clone(preprocessor)
+            X_fold_train = fold_preprocessor.fit_transform(X_fold_train, y.iloc[train_idx])
+            X_fold_test = fold_preprocessor.transform(X_fold_test)
+        X_fold_train, X_fold_test = (
+            Xt.toarray() if scipy.sparse.issparse(Xt) else np.asarray(Xt, dtype=np.float64)
+            for Xt in (X_fold_train, X_fold_test)
+        )
+        order = np.concatenate([train_idx, test_idx])
+
+        X_path, y_path = os.path.join(directory, f'fold_{k}.npy'), os.path.join(directory, f'fold_{k}_y.npy')
+        X_fold = np.lib.format.open_memmap(X_path, mode='w+', dtype=np.float64,
+                                           shape=(len(order), X_fold_train.shape[1]))
+        X_fold[:len(train_idx)], X_fold[len(train_idx):] = X_fold_train, X_fold_test
+        X_fold.flush()
+        np.save(y_path, y_values[order])
+        del X_fold, X_fold_train, X_fold_test
+
+        # Contiguous slices of the read-only maps, so fitting on them copies nothing
+        X_fold, y_fold = np.load(X_path, mmap_mode='r'), np.load(y_path, mmap_mode='r')
+        n_train = len(train_idx)
+        folds.append((X_fold[:n_train], y_fold[:n_train], X_fold[n_train:], y_fold[n_train:]))
+    return folds
+
+class FoldTransformCache:
+    """Caches fitted pipeline transformers and their transformed output per fold
+
+    Pass it as the memory of a sklearn Pipeline (find_best_model does this through its preprocessing_cache
+    argument). The preprocessing steps are then fitted and applied once per fold and parameter setting, instead
+    of once per candidate. The cache key is made of the unfitted transformer (its class and parameters), the
+    columns and the row index labels of the fold, and the key of the training set the cache is bound to (see
+    bind), so a lookup never hashes the fold's values. Arrays without an index are keyed on their contents.
+
+    The cache is shared, not copied, when sklearn clones the pipeline for each candidate. An in-memory cache
+    only works within one process, so use it serially or with the threading backend: worker processes would each
+    fill and discard their own copy. A disk cache is shared by worker processes, but hits and misses are only
+    counted in the calling process; len(cache) counts the stored folds either way.
+
+    Parameters
+    ----------
+    location : str, optional
+        Directory to keep transformed folds in. None keeps them in memory
+    """
+
+    def __init__(self, location=None):
+        self.location = location
+        self.hits = 0
+        self.misses = 0
+        self.data_key = None
+        self._store = {}
+        self._lock = threading.Lock()
+        if location is not None:
+            os.makedirs(location, exist_ok=True)
+
+    def bind(self, X, y):
+        """Ties the cache keys to a training set, so folds with the same index labels of other data never match
+
+        Hashes X and y once; find_best_model calls it before the search.
+        """
+        self.data_key = joblib.hash((X, y))
+        return self
+
+    def _key(self, name, transformer, X, y):
+        if hasattr(X, 'index') and hasattr(X, 'columns'):
+            rows = (list(X.columns), X.index.to_numpy())
+        else:
+            rows = (X, y)
+        # Cloned so a transformer fitted by an earlier call keys like its unfitted self
+        return joblib.hash((name, clone(transformer), self.data_key, rows))
+
+    def cache(self, func):
+        """Wraps a Pipeline fit-transform function so repeated calls are served from the cache (joblib.Memory interface)"""
+        def cached(transformer, X, y, *args, **kwargs):
+            key = self._key(func.__name__, transformer, X, y)
+            result = self._load(key)
+            with self._lock:
+                if result is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            if result is None:
+                result = func(transformer, X, y, *args, **kwargs)
+                self._save(key, result)
+            return result
+        return cached
+
+    def __len__(self):
+        if self.location is None:
+            return len(self._store)
+        return sum(filename.endswith('.pkl') for filename in os.listdir(self.location))
+
+    def _load(self, key):
+        if self.location is None:
+            return self._store.get(key)
+        path = os.path.join(self.location, f'{key}.pkl')
+        return joblib.load(path) if os.path.exists(path) else None
+
+    def _save(self, key, result):
+        if self.location is None:
+            self._store[key] = result
+            return
+        # Write then rename so a worker never reads a half-written file
+        path = os.path.join(self.location, f'{key}.pkl')
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        joblib.dump(result, tmp_path)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        """Removes every cached fold and resets the hit and miss counts"""
+        self._store.clear()
+        if self.location is not None:
+            for filename in os.listdir(self.location):
+                if filename.endswith('.pkl'):
+                    os.remove(os.path.join(self.location, filename))
+        self.hits = self.misses = 0
+
+    def __deepcopy__(self, memo):
+        # sklearn.clone deep-copies non-estimator parameters; every clone must share this cache
+        return self
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+def _fit_path(estimator, Cs, scorer, X_fold_train, y_fold_train, X_fold_test, y_fold_test):
+    """Fits estimator along increasing C on one fold, starting each fit from the previous coefficients"""
+    estimator = clone(estimator).set_params(warm_start=True)
+    scores, fit_times, score_times = [], [], []
+    for C in Cs:
+        start = time.perf_counter()
+        estimator.set_params(C=C).fit(X_fold_train, y_fold_train)
+        fit_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        scores.append(scorer(estimator, X_fold_test, y_fold_test))
+        score_times.append(time.perf_counter() - start)
+    return scores, fit_times, score_times
+
+class RegularizationPathSearchCV(BaseEstimator):
+    """Cross-validated search over C along a warm-started regularization path
+
+    Each fold is preprocessed once. The final estimator is then fitted for every C in increasing order,
+    starting from the coefficients of the previous C, so the whole path costs about as much as a few
+    cold fits. The best C is refit from scratch on the full training set.
+
+    Exposes the same attributes as RandomizedSearchCV that the analysis uses (cv_results_, best_index_,
+    best_params_, best_score_, best_estimator_, n_splits_) and predicts with the refit pipeline.
+
+    Parameters
+    ----------
+    estimator : sklearn.pipeline.Pipeline
+        Pipeline ending in an estimator with C and warm_start parameters (e.g. LogisticRegression)
+    Cs : array-like
+        Values of C to evaluate
+    cv : int
+        Number of folds in cross-validation
+    scoring : str
+        Metric to select the best C on
+    n_jobs : int, optional
+        Number of folds to run their paths in parallel
+    fold_dir : str, optional
+        Directory to memory-map the preprocessed folds in (see memmap_folds), so parallel workers share one
+        copy of them. None keeps the folds in memory
+    """
+
+    def __init__(self, estimator, Cs, cv, scoring, n_jobs=None, fold_dir=None):
+        self.estimator = estimator
+        self.Cs = Cs
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.fold_dir = fold_dir
+
+    def fit(self, X, y):
+        """Runs the path on every fold and refits the best C on X, y
+
+        Parameters
+        ----------
+        X : pd.DataFrame
+            Training set feature values
+        y : pd.Series
+            Target variable values of the training set
+
+        Returns
+        -------
+        RegularizationPathSearchCV
+            The fitted search
+        """
+        _, name, final_estimator = split_pipeline(self.estimator)
+        scorer = check_scoring(final_estimator, scoring=self.scoring)
+        Cs = np.asarray(self.Cs, dtype=float)
+        order = np.argsort(Cs, kind='stable')
+
+        if self.fold_dir is None:
+            folds = preprocess_folds(self.estimator, X, y, self.cv)
+        else:
+            folds = memmap_folds(self.estimator, X, y, self.cv, self.fold_dir)
+        paths = Parallel(n_jobs=self.n_jobs)(
+            delayed(_fit_path)(final_estimator, Cs[order], scorer, *fold) for fold in folds
+        )
+        # Release the fold maps so their files can be removed
+        n_folds = len(folds)
+        del folds
+
+        # Back from path order to candidate order, one column per fold
+        scores, fit_times, score_times = (np.empty((len(Cs), n_folds)) for _ in range(3))
+        for k, path in enumerate(paths):
+            scores[order, k], fit_times[order, k], score_times[order, k] = path
+
+        param = f'{name}__C'
+        mean_scores = scores.mean(axis=1)
+        ranks = pd.Series(mean_scores).rank(method='min', ascending=False).to_numpy(dtype=int)
+        self.cv_results_ = {
+            f'param_{param}': Cs,
+            'params': [{param: C} for C in Cs],
+            **{f'split{k}_test_score': scores[:, k] for k in range(n_folds)},
+            'mean_test_score': mean_scores,
+            'std_test_score': scores.std(axis=1),
+            'rank_test_score': ranks,
+            'mean_fit_time': fit_times.mean(axis=1),
+            'std_fit_time': fit_times.std(axis=1),
+            'mean_score_time': score_times.mean(axis=1),
+            'std_score_time': score_times.std(axis=1),
+        }
+        self.n_splits_ = n_folds
+        self.best_index_ = int(ranks.argmin())
+        self.best_params_ = self.cv_results_['params'][self.best_index_]
+        self.best_score_ = mean_scores[self.best_index_]
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+        self.classes_ = self.best_estimator_.classes_
+        return self
+
+    def score_curve(self):
+        """Returns the cross-validation score curve over C
+
+        Returns
+        -------
+        pd.DataFrame
+            C, mean_test_score and std_test_score, sorted by C
+        """
+        param = next(key for key in self.cv_results_ if key.startswith('param_'))
+        curve = pd.DataFrame({'C': self.cv_results_[param],
+                              'mean_test_score': self.cv_results_['mean_test_score'],
+                              'std_test_score': self.cv_results_['std_test_score']})
+        return curve.sort_values('C').reset_index(drop=True)
+
+    def predict(self, X):
+        """Predicts with the best pipeline refit on the full training set"""
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        """Predicts class probabilities with the best pipeline refit on the full training set"""
+        return self.best_estimator_.predict_proba(X)
+
+    def score(self, X, y):
+        """Scores the best pipeline on X, y with the search's scoring metric"""
+        return check_scoring(self.best_estimator_, scoring=self.scoring)(self.best_estimator_, X, y)
@@ -0,0 +1,166 @@
+import numpy as np
+from src.model_artifact import CompactModel, _artifact_arrays
+
+def compile_model(model):
+    """Compiles a fitted wine quality model into a FusedModel
+
+    The standard scaling is folded into the logistic regression weights and intercepts, and each one-hot
+    encoded column becomes a lookup table of the logits its categories add. Scoring is then one matrix
+    multiplication of the raw numeric features plus a table lookup per categorical column.
+
+    Parameters
+    ----------
+    model : sklearn.pipeline.Pipeline, fitted search object with best_estimator_ or CompactModel
+        Pipeline of a ColumnTransformer (OneHotEncoder and StandardScaler steps) and LogisticRegression,
+        e.g. the search returned by find_best_model, or a model loaded with load_artifact
+
+    Returns
+    -------
+    FusedModel
+        Model scoring plain NumPy arrays with the columns in feature_names_in_ order
+
+    Example
+    -------
+    >>> fused = compile_model(random_search)
+    >>> fused.predict(X_test.to_numpy())
+    """
+    if not isinstance(model, CompactModel):
+        model = CompactModel(*_artifact_arrays(model))
+
+    feature_names = list(model.feature_names_in_)
+    coef, intercept = model.coef_, model.intercept_
+    weights, bias = [], intercept.astype(np.float64)
+    numeric_idx, categorical = [], []
+    position = 0
+    for kind, columns, params in model.steps:
+        if kind == 'scaler':
+            mean, scale = params
+            block = coef[:, position:position + len(columns)] / scale
+            weights.append(block)
+            bias = bias - block @ mean
+            numeric_idx += [feature_names.index(column) for column in columns]
+            position += len(columns)
+            continue
+        categories, _, drop = params
+        for column, column_categories, drop_idx in zip(columns, categories, drop):
+            # Logits added by each category; the dropped category adds nothing
+            kept = [k for k in range(len(column_categories)) if k != drop_idx]
+            table = np.zeros((len(column_categories), coef.shape[0]))
+            table[kept] = coef[:, position:position + len(kept)].T
+            order = np.argsort(column_categories)
+            categorical.append((feature_names.index(column), column_categories[order], table[order]))
+            position += len(kept)
+
+    return FusedModel(np.vstack([w.T for w in weights]) if weights else np.zeros((0, coef.shape[0])),
+                      bias, numeric_idx, categorical, model.classes_, feature_names,
+                      model.metadata['multi_class'])
+
+class FusedModel:
+    """Logistic regression with its preprocessing folded into one affine map
+
+    Scores plain NumPy arrays, without pandas or sklearn. Built by compile_model.
+
+    Parameters
+    ----------
+    weights : numpy.ndarray
+        (n_numeric_features, n_classes) weights on the unscaled numeric features
+    bias : numpy.ndarray
+        (n_classes,) intercepts with the scaler means folded in
+    numeric_idx : list of int
+        Positions of the numeric features in an input row
+    categorical : list of tuple
+        (position, sorted categories, logits added per category) for each one-hot encoded column
+    classes : numpy.ndarray
+        Class labels, in logit order
+    feature_names : list of str
+        Column order expected in the input
+    multi_class : str
+        'multinomial' (softmax) or 'ovr' (normalized sigmoids)
+    """
+
+    def __init__(self, weights, bias, numeric_idx, categorical, classes, feature_names, multi_class):
+        self.weights = np.ascontiguousarray(weights)
+        self.bias = bias
+        self.numeric_idx = np.asarray(numeric_idx, dtype=np.intp)
+        self.categorical = categorical
+        self.classes_ = classes
+        self.feature_names_in_ = np.array(feature_names, dtype=object)
+        self.multi_class = multi_class
+
+    def decision_function(self, X):
+        """Returns the logistic regression scores (logits)
+
+        Parameters
+        ----------
+        X : numpy.ndarray
+            One row (1-D) or a 2-D array of rows, with the columns in feature_names_in_ order.
+            Mixed numeric and category columns come as an object array
+
+        Returns
+        -------
+        numpy.ndarray
+            (n_rows, n_classes) logits
+        """
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != len(self.feature_names_in_):
+            raise ValueError(f'X has {X.shape[1]} columns, expected {len(self.feature_names_in_)}')
+
+        return self.score_arrays(X[:, self.numeric_idx], *(X[:, position] for position, _, _ in self.categorical))
+
+    def score_arrays(self, numeric, *categorical):
+        """Returns the logits for features already split by kind, skipping the object array conversion
+
+        Parameters
+        ----------
+        numeric : numpy.ndarray
+            (n_rows, n_numeric) float array of the numeric features, in numeric_idx order
+        *categorical : numpy.ndarray
+            One array of category values per one-hot encoded column (e.g. the color of each row)
+
+        Returns
+        -------
+        numpy.ndarray
+            (n_rows, n_classes) logits
+        """
+        logits = np.asarray(numeric, dtype=np.float64) @ self.weights
+        logits += self.bias
+        for values, (position, categories, table) in zip(categorical, self.categorical):
+            values = np.asarray(values)
+            codes = np.full(len(values), -1)
+            for code, category in enumerate(categories):
+                codes[values == category] = code
+            if (codes < 0).any():
+                raise ValueError(f'Found unknown categories {sorted(set(values[codes < 0].astype(str)))} '
+                                 f'in column {self.feature_names_in_[position]}')
+            logits += table[codes]
+        return logits
+
+    def predict_proba(self, X):
+        """Predicts class probabilities, columns ordered like classes_"""
+        return self.proba_from_logits(self.decision_function(X))
+
+    def proba_from_logits(self, scores):
+        """Turns logits from decision_function or score_arrays into class probabilities"""
+        if self.multi_class == 'multinomial' and scores.shape[1] > 1:
+            scores -= scores.max(axis=1, keepdims=True)
+            np.exp(scores, out=scores)
+            return scores / scores.sum(axis=1, keepdims=True)
+        proba = 1 / (1 + np.exp(-scores))
+        if proba.shape[1] == 1:
+            return np.hstack([1 - proba, proba])
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        """Predicts the class of each row
+
+        The class with the largest logit has the largest probability, so no softmax is computed
+        """
+        return self.classes_from_logits(self.decision_function(X))
+
+    def classes_from_logits(self, scores):
+        """Turns logits from decision_function or score_arrays into class labels"""
+        if scores.shape[1] == 1:
+            return self.classes_[(scores[:, 0] > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
@@ -0,0 +1,184 @@
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+import pandas as pd
+
+SPANS_PATH_ENV = 'WINE_SPANS_PATH'
+TRACE_MEMORY_ENV = 'WINE_SPANS_TRACE_MEMORY'
+SCRIPT_ENV = 'WINE_SPANS_SCRIPT'
+
+_lock = threading.Lock()
+_local = threading.local()
+
+def configure(path, trace_memory=False, script=None):
+    """Turns span recording on for this process and the processes it starts
+
+    The settings are kept in environment variables (WINE_SPANS_PATH, WINE_SPANS_TRACE_MEMORY and
+    WINE_SPANS_SCRIPT), so worker processes started afterwards, e.g. chart renderers, record their
+    spans to the same file. Setting the variables before running a script has the same effect.
+
+    Parameters
+    ----------
+    path : str or None
+        JSON-lines file the spans are appended to; None turns recording off
+    trace_memory : bool
+        Trace Python allocations with tracemalloc to record each span's traced peak and top allocations.
+        This slows allocation-heavy code down noticeably
+    script : str, optional
+        Name recorded with every span, e.g. the script's name
+    """
+    if path is None:
+        for name in (SPANS_PATH_ENV, TRACE_MEMORY_ENV, SCRIPT_ENV):
+            os.environ.pop(name, None)
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    os.environ[SPANS_PATH_ENV] = path
+    os.environ[TRACE_MEMORY_ENV] = '1' if trace_memory else '0'
+    if script is not None:
+        os.environ[SCRIPT_ENV] = script
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+@contextmanager
+def span(name, top_allocations=5, **attributes):
+    """Records the wall time, CPU time and memory of a block of code as a named span
+
+    Does nothing unless recording was turned on with configure (or its environment variables).
+    Each span is written as one JSON line when the block exits, even if it raises, with:
+    span, parent (the enclosing span in the same thread), script, pid, start (Unix time), wall_s,
+    cpu_s (process CPU time, so including other threads), peak_rss_mb (the process's peak resident
+    set size so far), rss_growth_mb (how much the span raised that peak), error, the given attributes,
+    and with memory tracing on, traced_peak_mb and top_allocations (the source lines holding the most
+    traced memory at the end of the span).
+
+    Parameters
+    ----------
+    name : str
+        Span name, e.g. 'read' or 'render_chart'
+    top_allocations : int
+        Number of allocation sites recorded when tracing memory
+    **attributes
+        JSON-serialisable values recorded with the span, e.g. rows=len(data)
+
+    Yields
+    ------
+    dict
+        The attributes, which the block can add to (e.g. counts known only at the end)
+
+    Example
+    -------
+    >>> with span('validate', engine='numpy') as attrs:
+    ...     clean = validate_and_clean_data(raw_data, schema, engine='numpy')
+    ...     attrs['rows'] = len(clean)
+    """
+    path = os.environ.get(SPANS_PATH_ENV)
+    if not path:
+        yield attributes
+        return
+
+    trace = os.environ.get(TRACE_MEMORY_ENV) == '1'
+    stack = _local.__dict__.setdefault('stack', [])
+    if trace:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        # The enclosing span keeps the peak reached so far, since it is reset for this one
+        if stack:
+            stack[-1]['traced_peak'] = max(stack[-1]['traced_peak'], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    frame = {'traced_peak': 0}
+    parent = stack[-1]['name'] if stack else None
+    frame['name'] = name
+    stack.append(frame)
+
+    start, wall_start, cpu_start, rss_start = time.time(), time.perf_counter(), time.process_time(), _peak_rss_mb()
+    error = None
+    try:
+        yield attributes
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        record = {
+            'span': name,
+            'parent': parent,
+            'script': os.environ.get(SCRIPT_ENV),
+            'pid': os.getpid(),
+            'start': start,
+            'wall_s': time.perf_counter() - wall_start,
+            'cpu_s': time.process_time() - cpu_start,
+            'peak_rss_mb': _peak_rss_mb(),
+        }
+        record['rss_growth_mb'] = record['peak_rss_mb'] - rss_start
+        record['error'] = error
+        stack.pop()
+        if trace and tracemalloc.is_tracing():
+            peak = max(frame['traced_peak'], tracemalloc.get_traced_memory()[1])
+            record['traced_peak_mb'] = peak / 2**20
+            record['top_allocations'] = [
+                {'location': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+                 'size_mb': stat.size / 2**20, 'count': stat.count}
+                for stat in tracemalloc.take_snapshot().statistics('lineno')[:top_allocations]
+            ]
+            if stack:
+                stack[-1]['traced_peak'] = max(stack[-1]['traced_peak'], peak)
+        record.update(attributes)
+        line = json.dumps(record, default=str) + '\n'
+        with _lock, open(path, 'a') as f:
+            f.write(line)
+
+def instrumented(name=None, **attributes):
+    """Decorator recording every call of a function as a span (named after the function by default)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name or func.__name__, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def read_spans(path):
+    """Reads a JSON-lines span file into a DataFrame (one row per span)"""
+    with open(path) as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+def summarize_spans(spans, top=10, by='wall_s'):
+    """Slowest spans and per-name totals of a span file
+
+    Parameters
+    ----------
+    spans : str or pandas.DataFrame
+        Span file written by span, or its contents from read_spans
+    top : int
+        Number of rows of each table
+    by : str
+        Column to rank by: 'wall_s', 'cpu_s', 'rss_growth_mb' or 'traced_peak_mb'
+
+    Returns
+    -------
+    tuple of pandas.DataFrame
+        (the top slowest individual spans, and count, total, mean and max of `by` for each span name
+        with the largest peak RSS, sorted by total)
+    """
+    if isinstance(spans, str):
+        spans = read_spans(spans)
+    if spans.empty:
+        return spans, spans
+    if by not in spans.columns:
+        raise ValueError(f"Spans have no column {by!r}")
+    columns = [col for col in ['script', 'span', 'parent', 'wall_s', 'cpu_s', 'peak_rss_mb', 'rss_growth_mb',
+                               'traced_peak_mb'] if col in spans.columns]
+    slowest = spans.sort_values(by, ascending=False)[columns].head(top).reset_index(drop=True)
+    totals = spans.groupby(['script', 'span'], dropna=False).agg(
+        count=(by, 'size'), total=(by, 'sum'), mean=(by, 'mean'), max=(by, 'max'),
+        peak_rss_mb=('peak_rss_mb', 'max')
+    ).sort_values('total', ascending=False).head(top).reset_index()
+    return slowest, totals
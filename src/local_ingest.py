@@ -0,0 +1,141 @@
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from src.data_validation import define_schema
+from src.file_utils import file_digest
+from src.instrumentation import span
+
+MANIFEST_SUFFIX = '.sources.json'
+
+def normalize_column_name(name):
+    """Column name in the define_schema style, e.g. '"free sulfur dioxide"' -> 'free_sulfur_dioxide'"""
+    return re.sub(r'[^0-9a-z]+', '_', name.strip().strip('"').lower()).strip('_')
+
+def color_from_filename(path):
+    """Color of a per-color source file from its name, e.g. 'winequality-red.csv' -> 'red'"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    color = re.split(r'[-_ ]', stem)[-1].lower()
+    if not color or color == stem.lower():
+        raise ValueError(f"Cannot tell the color of {path} from its name; pass it explicitly")
+    return color
+
+def output_columns(schema=None):
+    """Column layout of wine_quality.csv: the features in schema order, then color, then quality"""
+    names = list((schema or define_schema()).columns)
+    return [name for name in names if name not in ('color', 'quality')] + ['color', 'quality']
+
+def _parse_source(path, color, columns):
+    """Parses one semicolon-separated source file and returns its rows as CSV text without a header
+    (runs in a worker process)"""
+    with span('parse_source', path=path, color=color) as attrs:
+        data = pd.read_csv(path, sep=';')
+        by_name = {name.lower(): name for name in columns}
+        renamed = {col: by_name.get(normalize_column_name(col)) for col in data.columns}
+        unknown = [col for col, name in renamed.items() if name is None]
+        if unknown:
+            raise ValueError(f"{path} has columns not in the schema: {unknown}")
+        data = data.rename(columns=renamed)
+        if 'color' in data.columns:
+            raise ValueError(f"{path} already has a color column")
+        missing = [name for name in columns if name not in data.columns and name != 'color']
+        if missing:
+            raise KeyError(f"{path} is missing columns: {missing}")
+        data['color'] = color
+        # Features as floats, so every source is written alike (e.g. 11.0, not 11)
+        features = [name for name in columns if name not in ('color', 'quality')]
+        data = data.astype({name: np.float64 for name in features})[columns]
+        attrs['rows'] = len(data)
+        return data.to_csv(header=False, index=False), len(data)
+
+def _manifest(sources):
+    return [{'path': os.path.abspath(path), 'color': color, 'sha256': file_digest(path)} for path, color in sources]
+
+def _read_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def ingest_local_sources(sources, output_path, max_workers=None, force=False, schema=None):
+    """Merges per-color wine source files into one CSV in the wine_quality.csv layout
+
+    Each source is a semicolon-separated file of one color without a color column, like the UCI
+    winequality-red.csv and winequality-white.csv. The sources are parsed in parallel worker processes;
+    their column names are normalized to the schema's names (e.g. "fixed acidity" -> fixed_acidity),
+    the color column is added and quality is put last. The output is written once, in source order.
+
+    The checksums of the sources and the output are kept in output_path + '.sources.json'. When the
+    sources, their colors and the output are unchanged since the last run, nothing is parsed or written.
+
+    Parameters
+    ----------
+    sources : dict or list
+        Source file to color, or a list of source files whose color is the last word of their name
+        (see color_from_filename)
+    output_path : str
+        CSV file to write; it is replaced only once every source is written
+    max_workers : int, optional
+        Number of worker processes; by default one per CPU, at most one per source. 1 parses in this process
+    force : bool
+        Merge the sources even if they are unchanged
+    schema : pandera.DataFrameSchema, optional
+        Schema whose column names the sources are normalized to (define_schema() by default)
+
+    Returns
+    -------
+    dict
+        'skipped' (whether the output was up to date), 'sources', 'rows' written and 'seconds' taken
+
+    Example
+    -------
+    >>> ingest_local_sources(['data/raw/winequality-red.csv', 'data/raw/winequality-white.csv'],
+    ...                      'data/raw/wine_quality.csv')
+    """
+    start = time.perf_counter()
+    if not isinstance(sources, dict):
+        sources = {path: color_from_filename(path) for path in sources}
+    if not sources:
+        raise ValueError("No source files given")
+    sources = list(sources.items())
+    columns = output_columns(schema)
+
+    manifest_path = output_path + MANIFEST_SUFFIX
+    manifest = {'sources': _manifest(sources), 'columns': columns}
+    previous = _read_manifest(manifest_path)
+    if (not force and previous is not None and os.path.exists(output_path)
+            and {k: previous.get(k) for k in manifest} == manifest
+            and previous.get('output_sha256') == file_digest(output_path)):
+        return {'skipped': True, 'sources': len(sources), 'rows': previous.get('rows'),
+                'seconds': time.perf_counter() - start}
+
+    n_workers = min(max_workers or os.cpu_count() or 1, len(sources))
+    args = ([path for path, _ in sources], [color for _, color in sources], [columns] * len(sources))
+    tmp_path = f'{output_path}.{os.getpid()}.tmp'
+    rows = 0
+    executor = ProcessPoolExecutor(n_workers) if n_workers > 1 else None
+    try:
+        # map yields in source order, so each source is written as soon as those before it are
+        parsed = executor.map(_parse_source, *args) if executor else map(_parse_source, *args)
+        with open(tmp_path, 'w') as out:
+            out.write(','.join(columns) + '\n')
+            for text, n in parsed:
+                out.write(text)
+                rows += n
+        os.replace(tmp_path, output_path)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    manifest.update(output_sha256=file_digest(output_path), rows=rows)
+    tmp_manifest = f'{manifest_path}.{os.getpid()}.tmp'
+    with open(tmp_manifest, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_manifest, manifest_path)
+    return {'skipped': False, 'sources': len(sources), 'rows': rows, 'seconds': time.perf_counter() - start}
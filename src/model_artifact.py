@@ -0,0 +1,197 @@
+import json
+import numpy as np
+
+ARTIFACT_FORMAT = 1
+
+def export_artifact(model, path):
+    """Saves only what inference needs from a fitted wine quality model as a versioned .npz file
+
+    The artifact holds the one-hot categories, scaler means and scales, logistic regression coefficients,
+    intercepts and class labels as plain arrays, plus JSON metadata describing the column layout.
+    It loads with NumPy alone (see load_artifact), without unpickling sklearn objects.
+
+    Parameters
+    ----------
+    model : sklearn.pipeline.Pipeline or fitted search object with best_estimator_
+        Pipeline of a ColumnTransformer (OneHotEncoder and StandardScaler steps) and LogisticRegression
+    path : str
+        File to write, conventionally ending in .npz
+
+    Returns
+    -------
+    None
+    """
+    arrays, metadata = _artifact_arrays(model)
+    arrays['metadata'] = np.array(json.dumps(metadata))
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+def _artifact_arrays(model):
+    """Extracts the arrays and metadata of an artifact from a fitted pipeline or search"""
+    import sklearn
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    pipeline = getattr(model, 'best_estimator_', model)
+    preprocessor, logreg = pipeline.steps[0][1], pipeline.steps[-1][1]
+    if len(pipeline.steps) != 2 or not isinstance(logreg, LogisticRegression):
+        raise ValueError('model must be a pipeline of a column transformer and LogisticRegression')
+
+    arrays = {}
+    layout = []
+    for i, (name, transformer, columns) in enumerate(preprocessor.transformers_):
+        if transformer == 'drop' or len(columns) == 0:
+            continue
+        columns = list(columns)
+        if isinstance(transformer, OneHotEncoder):
+            if transformer.handle_unknown != 'error':
+                raise ValueError('Only OneHotEncoder(handle_unknown="error") can be exported')
+            drop_idx = transformer.drop_idx_
+            drop = [-1 if drop_idx is None or drop_idx[j] is None else int(drop_idx[j]) for j in range(len(columns))]
+            for j, categories in enumerate(transformer.categories_):
+                arrays[f'onehot_{i}_{j}'] = np.asarray(categories).astype(str)
+            layout.append({'kind': 'onehot', 'columns': columns, 'drop': drop, 'key': i})
+        elif isinstance(transformer, StandardScaler):
+            arrays[f'mean_{i}'] = transformer.mean_ if transformer.with_mean else np.zeros(len(columns))
+            arrays[f'scale_{i}'] = transformer.scale_ if transformer.with_std else np.ones(len(columns))
+            layout.append({'kind': 'scaler', 'columns': columns, 'key': i})
+        else:
+            raise ValueError(f'Cannot export transformer {name} of type {type(transformer).__name__}')
+
+    multi_class = logreg.multi_class
+    if multi_class == 'auto':
+        multi_class = 'ovr' if logreg.solver == 'liblinear' or len(logreg.classes_) == 2 else 'multinomial'
+
+    arrays['coef'] = logreg.coef_
+    arrays['intercept'] = logreg.intercept_
+    arrays['classes'] = logreg.classes_
+    metadata = {
+        'format': ARTIFACT_FORMAT,
+        'sklearn_version': sklearn.__version__,
+        'feature_names_in': list(pipeline.feature_names_in_),
+        'layout': layout,
+        'multi_class': multi_class,
+    }
+    return arrays, metadata
+
+def load_artifact(path):
+    """Loads a model artifact written by export_artifact
+
+    Parameters
+    ----------
+    path : str
+        Path to the .npz artifact
+
+    Returns
+    -------
+    CompactModel
+        Model with predict and predict_proba
+    """
+    with np.load(path, allow_pickle=False) as artifact:
+        arrays = {key: artifact[key] for key in artifact.files}
+    metadata = json.loads(arrays.pop('metadata').item())
+    if metadata['format'] > ARTIFACT_FORMAT:
+        raise ValueError(f"Artifact format {metadata['format']} is newer than supported format {ARTIFACT_FORMAT}")
+    return CompactModel(arrays, metadata)
+
+class CompactModel:
+    """NumPy-only wine quality model loaded from an artifact
+
+    Reproduces the preprocessing and logistic regression of the exported pipeline.
+    Exposes classes_ and feature_names_in_ like the sklearn model, so it can be used by the same scorers.
+
+    Parameters
+    ----------
+    arrays : dict
+        Arrays from the artifact
+    metadata : dict
+        Column layout and model metadata from the artifact
+    """
+
+    def __init__(self, arrays, metadata):
+        self.metadata = metadata
+        self.coef_ = arrays['coef']
+        self.intercept_ = arrays['intercept']
+        self.classes_ = arrays['classes']
+        self.feature_names_in_ = np.array(metadata['feature_names_in'], dtype=object)
+        self.steps = []
+        for step in metadata['layout']:
+            key = step['key']
+            if step['kind'] == 'onehot':
+                categories = [arrays[f'onehot_{key}_{j}'] for j in range(len(step['columns']))]
+                orders = [np.argsort(column_categories) for column_categories in categories]
+                self.steps.append(('onehot', step['columns'], (categories, orders, step['drop'])))
+            else:
+                self.steps.append(('scaler', step['columns'], (arrays[f'mean_{key}'], arrays[f'scale_{key}'])))
+
+    def transform(self, X):
+        """Applies the exported preprocessing
+
+        Parameters
+        ----------
+        X : pd.DataFrame or dict of array-like
+            Wine samples with the training columns
+
+        Returns
+        -------
+        numpy.ndarray
+            Preprocessed feature matrix, columns in the order the pipeline produced them
+        """
+        blocks = []
+        for kind, columns, params in self.steps:
+            if kind == 'scaler':
+                mean, scale = params
+                values = np.column_stack([np.asarray(X[column], dtype=np.float64) for column in columns])
+                blocks.append((values - mean) / scale)
+                continue
+            categories, orders, drop = params
+            for column, column_categories, order, drop_idx in zip(columns, categories, orders, drop):
+                values = np.asarray(X[column]).astype(str)
+                positions = np.searchsorted(column_categories[order], values).clip(max=len(order) - 1)
+                codes = order[positions]
+                if not (column_categories[codes] == values).all():
+                    unknown = sorted(set(values[column_categories[codes] != values]))
+                    raise ValueError(f'Found unknown categories {unknown} in column {column}')
+                onehot = (codes[:, None] == np.arange(len(column_categories))).astype(np.float64)
+                blocks.append(np.delete(onehot, drop_idx, axis=1) if drop_idx >= 0 else onehot)
+        return np.hstack(blocks)
+
+    def decision_function(self, X):
+        """Returns the logistic regression scores (logits) for X"""
+        return self.transform(X) @ self.coef_.T + self.intercept_
+
+    def predict_proba(self, X):
+        """Predicts class probabilities, columns ordered like classes_"""
+        scores = self.decision_function(X)
+        if self.metadata['multi_class'] == 'multinomial' and scores.shape[1] > 1:
+            scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+            return scores / scores.sum(axis=1, keepdims=True)
+        proba = 1 / (1 + np.exp(-scores))
+        if proba.shape[1] == 1:
+            return np.hstack([1 - proba, proba])
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        """Predicts the class of each sample"""
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+def check_parity(compact_model, model, X):
+    """Compares the predictions of an artifact with the model it was exported from
+
+    Parameters
+    ----------
+    compact_model : CompactModel
+        Model loaded from the artifact
+    model : object
+        Original fitted model (search object or pipeline)
+    X : pd.DataFrame
+        Samples to compare predictions on
+
+    Returns
+    -------
+    dict
+        max_proba_diff (largest absolute probability difference) and prediction_mismatches (count)
+    """
+    proba_diff = np.abs(compact_model.predict_proba(X) - model.predict_proba(X))
+    mismatches = np.count_nonzero(compact_model.predict(X) != model.predict(X))
+    return {'max_proba_diff': float(proba_diff.max()), 'prediction_mismatches': int(mismatches)}
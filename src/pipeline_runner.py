@@ -0,0 +1,422 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from src.file_utils import file_digest
+
+CACHE_DIR = '.pipeline_cache'
+# Packages whose version can change what the stages write
+KEY_PACKAGES = ('numpy', 'pandas', 'pandera', 'scikit-learn', 'scipy', 'pyarrow', 'altair', 'vl-convert-python',
+                'matplotlib')
+_VERSIONS_CODE = f"""
+import json, platform
+from importlib import metadata
+versions = {{}}
+for name in {KEY_PACKAGES!r}:
+    try:
+        versions[name] = metadata.version(name)
+    except metadata.PackageNotFoundError:
+        versions[name] = None
+print(json.dumps({{'python': platform.python_version(), 'packages': versions}}))
+"""
+
+class Stage:
+    """One step of the analysis pipeline: a command with the files it reads and writes
+
+    Parameters
+    ----------
+    name : str
+        Stage name, e.g. 'split'
+    command : list of str
+        Command to run from the project root
+    inputs : list of str
+        Files the command reads. A stage depends on every stage that outputs one of its inputs
+    outputs : list of str
+        Files the command writes
+    params : dict, optional
+        Settings that change the outputs (seed, test_size, search settings, ...)
+    sources : list of str, optional
+        Code the stage runs. Defaults to the script in the command and the src/ modules it imports
+    runtime_args : list of str, optional
+        Arguments of the command that only change how it runs, not what it writes, e.g. '--n_jobs=4'.
+        They are left out of the stage's key
+    """
+
+    def __init__(self, name, command, inputs, outputs, params=None, sources=None, runtime_args=None):
+        self.name = name
+        self.command = list(command)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = dict(params or {})
+        self.sources = list(sources) if sources is not None else None
+        self.runtime_args = list(runtime_args or [])
+
+    def __repr__(self):
+        return f'Stage({self.name!r})'
+
+def source_files(script, root='.'):
+    """Finds a script and the src/ modules it imports, directly or through other src/ modules
+
+    Parameters
+    ----------
+    script : str
+        Path of the script, relative to root
+    root : str
+        Project root holding the src package
+
+    Returns
+    -------
+    list of str
+        Sorted paths relative to root
+    """
+    found, pending = set(), [script]
+    while pending:
+        path = pending.pop()
+        if path in found or not os.path.exists(os.path.join(root, path)):
+            continue
+        found.add(path)
+        with open(os.path.join(root, path)) as f:
+            code = f.read()
+        for module in re.findall(r'^\s*(?:from|import)\s+src\.(\w+)', code, flags=re.MULTILINE):
+            pending.append(os.path.join('src', f'{module}.py'))
+    return sorted(found)
+
+def stage_key(stage, root='.'):
+    """Hashes what a stage's outputs depend on: its command, params, input contents and source code
+
+    A Python interpreter running the command is keyed on its version and those of KEY_PACKAGES rather than
+    its path, and the stage's runtime_args are left out, so neither moving the environment nor changing
+    the number of parallel jobs reruns a stage.
+
+    Parameters
+    ----------
+    stage : Stage
+        Stage whose inputs all exist
+    root : str
+        Project root the stage's paths are relative to
+
+    Returns
+    -------
+    str
+        SHA-256 hex digest
+    """
+    sources = stage.sources if stage.sources is not None else _command_sources(stage.command, root)
+    command = [arg for arg in stage.command if arg not in stage.runtime_args]
+    environment = None
+    if command and _is_python(command[0]):
+        environment, command = interpreter_versions(command[0]), command[1:]
+    key = {
+        'command': command,
+        'environment': environment,
+        'params': stage.params,
+        'inputs': {path: file_digest(os.path.join(root, path)) for path in stage.inputs},
+        'sources': {path: file_digest(os.path.join(root, path)) for path in sources},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def _is_python(executable):
+    name = os.path.basename(executable)
+    return executable == sys.executable or bool(re.fullmatch(r'python[\d.]*(\.exe)?', name))
+
+@lru_cache(maxsize=None)
+def interpreter_versions(python):
+    """Returns the version of a Python interpreter and of the KEY_PACKAGES installed for it
+
+    Parameters
+    ----------
+    python : str
+        Path or name of the interpreter
+
+    Returns
+    -------
+    dict
+        'python': its version, 'packages': each package's version, None if it is not installed
+    """
+    process = subprocess.run([python, '-c', _VERSIONS_CODE], capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f'Could not get the package versions of {python}: {process.stderr.strip()}')
+    return json.loads(process.stdout)
+
+def _command_sources(command, root):
+    scripts = [arg for arg in command if arg.endswith('.py')]
+    return sorted({path for script in scripts for path in source_files(os.path.normpath(script), root)})
+
+def stage_dependencies(stages):
+    """Maps each stage name to the names of the stages producing its inputs
+
+    Raises ValueError when two stages write the same file or the stages form a cycle
+    """
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(f'{output} is written by both {producers[output]} and {stage.name}')
+            producers[output] = stage.name
+    dependencies = {stage.name: sorted({producers[path] for path in stage.inputs if path in producers})
+                    for stage in stages}
+
+    # Depth-first search for cycles
+    state = {}
+    def visit(name):
+        if state.get(name) == 'visiting':
+            raise ValueError(f'Stages form a cycle through {name}')
+        if state.get(name) != 'done':
+            state[name] = 'visiting'
+            for dependency in dependencies[name]:
+                visit(dependency)
+            state[name] = 'done'
+    for name in dependencies:
+        visit(name)
+    return dependencies
+
+class StageCache:
+    """Content-addressed store of stage outputs
+
+    After a stage runs, a copy of each output is stored under its SHA-256 in cache_dir/objects and the
+    stage's key is recorded with the digests of its outputs in cache_dir/stages/<name>/<key>.json.
+    A stage whose key has a record is up to date: outputs that are missing or were changed are restored
+    from the store instead of rerunning the stage, so switching back to earlier parameters is free too.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding the store
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _record_path(self, stage, key):
+        return os.path.join(self.cache_dir, 'stages', stage.name, f'{key}.json')
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, 'objects', digest[:2], digest)
+
+    def restore(self, stage, key, root='.'):
+        """Brings the outputs of stage up to date for key from the store
+
+        Returns
+        -------
+        bool
+            True if the stage has a record for key and all of its outputs are now in place
+        """
+        record_path = self._record_path(stage, key)
+        if not os.path.exists(record_path):
+            return False
+        with open(record_path) as f:
+            digests = json.load(f)['outputs']
+        if sorted(digests) != sorted(stage.outputs):
+            return False
+
+        for path, digest in digests.items():
+            target = os.path.join(root, path)
+            if os.path.exists(target) and file_digest(target) == digest:
+                continue
+            if not os.path.exists(self._object_path(digest)):
+                return False
+            os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+            _atomic_copy(self._object_path(digest), target)
+        return True
+
+    def store(self, stage, key, root='.'):
+        """Stores the outputs of a stage that just ran and records them under key"""
+        digests = {}
+        for path in stage.outputs:
+            source = os.path.join(root, path)
+            if not os.path.exists(source):
+                raise FileNotFoundError(f'Stage {stage.name} did not write {path}')
+            digest = file_digest(source)
+            if not os.path.exists(self._object_path(digest)):
+                os.makedirs(os.path.dirname(self._object_path(digest)), exist_ok=True)
+                # A copy, not a link: scripts overwrite their outputs in place
+                _atomic_copy(source, self._object_path(digest))
+            digests[path] = digest
+
+        record_path = self._record_path(stage, key)
+        os.makedirs(os.path.dirname(record_path), exist_ok=True)
+        with open(f'{record_path}.tmp', 'w') as f:
+            json.dump({'outputs': digests, 'command': stage.command, 'params': stage.params}, f, indent=2)
+        os.replace(f'{record_path}.tmp', record_path)
+
+def _atomic_copy(source, target):
+    tmp_path = f'{target}.{os.getpid()}.tmp'
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+def run_pipeline(stages, targets=None, root='.', cache_dir=None, max_workers=2, force=(), adopt=(),
+                 dry_run=False, log=print):
+    """Runs the stages needed for targets, skipping stages whose outputs are cached for their key
+
+    A stage starts as soon as every stage it depends on has finished, so independent stages (e.g. eda and
+    model after the split) run at the same time. Stage output is printed when the stage finishes.
+    When a stage fails, the stages depending on it are not run; the others still are.
+
+    Parameters
+    ----------
+    stages : list of Stage
+        All stages of the pipeline
+    targets : list of str, optional
+        Stages to bring up to date, along with everything they depend on. Defaults to all stages
+    root : str
+        Project root; commands run there and paths are relative to it
+    cache_dir : str, optional
+        Stage cache directory, by default root/.pipeline_cache
+    max_workers : int
+        Most stages running at once
+    force : collection of str
+        Stages to rerun even when they are cached
+    adopt : collection of str
+        Stages whose existing outputs are taken as up to date and cached without running them,
+        e.g. data that was downloaded before the cache existed
+    dry_run : bool
+        Only report which stages would run or be skipped
+    log : callable
+        Receives progress messages
+
+    Returns
+    -------
+    dict
+        Stage name to {'status': 'cached', 'ran', 'would_run', 'failed' or 'blocked', 'seconds': wall time}
+    """
+    by_name = {stage.name: stage for stage in stages}
+    dependencies = stage_dependencies(stages)
+    unknown = [name for name in list(targets or []) + list(force) + list(adopt) if name not in by_name]
+    if unknown:
+        raise ValueError(f'Unknown stages: {unknown}')
+
+    # Targets and everything upstream of them, in definition order
+    needed, pending = set(), list(targets or by_name)
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(dependencies[name])
+    order = [stage.name for stage in stages if stage.name in needed]
+
+    cache = StageCache(cache_dir or os.path.join(root, CACHE_DIR))
+    results = {}
+
+    def execute(stage):
+        start = time.perf_counter()
+        missing = [path for path in stage.inputs if not os.path.exists(os.path.join(root, path))]
+        if missing:
+            return {'status': 'failed', 'seconds': 0.0, 'output': f'Missing inputs: {missing}'}
+        key = stage_key(stage, root)
+        if stage.name not in force and cache.restore(stage, key, root):
+            return {'status': 'cached', 'seconds': time.perf_counter() - start, 'output': ''}
+        if stage.name in adopt and all(os.path.exists(os.path.join(root, path)) for path in stage.outputs):
+            if not dry_run:
+                cache.store(stage, key, root)
+            return {'status': 'cached', 'seconds': time.perf_counter() - start, 'output': ''}
+        if dry_run:
+            return {'status': 'would_run', 'seconds': 0.0, 'output': ''}
+
+        process = subprocess.run(stage.command, cwd=root, capture_output=True, text=True)
+        output = process.stdout + process.stderr
+        if process.returncode != 0:
+            return {'status': 'failed', 'seconds': time.perf_counter() - start,
+                    'output': f'{output}\nExited with code {process.returncode}'}
+        try:
+            cache.store(stage, key, root)
+        except FileNotFoundError as e:
+            return {'status': 'failed', 'seconds': time.perf_counter() - start, 'output': f'{output}\n{e}'}
+        return {'status': 'ran', 'seconds': time.perf_counter() - start, 'output': output}
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while len(results) < len(order):
+            for name in order:
+                if name in results or name in running.values():
+                    continue
+                upstream = [results.get(dependency, {}).get('status') for dependency in dependencies[name]]
+                if any(status in ('failed', 'blocked') for status in upstream):
+                    results[name] = {'status': 'blocked', 'seconds': 0.0}
+                    log(f'[{name}] blocked by a failed dependency')
+                elif all(status in ('cached', 'ran', 'would_run') for status in upstream):
+                    if dry_run and 'would_run' in upstream:
+                        # Upstream outputs would change, so this stage's key cannot be known yet
+                        results[name] = {'status': 'would_run', 'seconds': 0.0}
+                        log(f'[{name}] would run')
+                        continue
+                    log(f'[{name}] checking' if dry_run else f'[{name}] started')
+                    running[executor.submit(execute, by_name[name])] = name
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                result = future.result()
+                output = result.pop('output').rstrip()
+                if output:
+                    log('\n'.join(f'[{name}] {line}' for line in output.splitlines()))
+                results[name] = result
+                status = {'cached': 'up to date, skipped', 'ran': 'done', 'would_run': 'would run',
+                          'failed': 'FAILED'}[result['status']]
+                log(f"[{name}] {status} ({result['seconds']:.1f}s)")
+    return results
+
+def wine_pipeline(seed=522, test_size=0.2, n_jobs=-1, search='random', python=None, quarto='quarto'):
+    """Stages of the wine quality analysis, as run by the Makefile
+
+    Parameters
+    ----------
+    seed : int
+        Random seed for the train/test split and the model search
+    test_size : float
+        Proportion of the cleaned data used as the test set
+    n_jobs : int
+        Parallel fits in the model search
+    search : str
+        Search mode of find_best_model ('random', 'halving' or 'path')
+    python : str, optional
+        Python interpreter for the scripts, by default the one running this function
+    quarto : str
+        Quarto executable used to render the report
+
+    Returns
+    -------
+    list of Stage
+        download, validate, split, eda, model, report (HTML) and report_pdf
+    """
+    python = python or sys.executable
+    raw = 'data/raw/wine_quality.csv'
+    cleaned = 'data/processed/cleaned_wine_quality.csv'
+    training, test = 'data/processed/training_set.csv', 'data/processed/test_set.csv'
+    eda_plots = [f'results/figures/{name}.png' for name in
+                 ('dist_wine_scores', 'red_vs_white_all_features', 'total_vs_free_sulfur_dioxide',
+                  'feature_corrs', 'density_red_vs_white', 'dist_wine_scores_by_feature')]
+    model_plots = [f'results/figures/wine_quality_{quality}_coefficients.png' for quality in range(3, 10)]
+    model_outputs = ['results/models/tuned_model.pickle', 'results/models/tuned_model.npz',
+                     'results/tables/model_results.csv', 'results/tables/search_timings.csv'] + model_plots
+    report = 'reports/wine_quality_regressor_report.qmd'
+    report_inputs = [report, 'reports/references.bib', 'results/tables/model_results.csv'] + eda_plots + model_plots
+
+    return [
+        Stage('download', [python, 'scripts/data_download.py', '--id=186', '--raw_data_out=./data/raw'],
+              inputs=[], outputs=[raw], params={'id': 186}),
+        Stage('validate', [python, 'scripts/validate_raw_data.py', '--input_path', raw,
+                           '--processed_data_path', './data/processed'],
+              inputs=[raw], outputs=[cleaned]),
+        Stage('split', [python, 'scripts/read_data.py', cleaned, './data/processed',
+                        f'--seed={seed}', f'--test_size={test_size}'],
+              inputs=[cleaned], outputs=[training, test], params={'seed': seed, 'test_size': test_size}),
+        Stage('eda', [python, 'scripts/eda.py', training, './results/figures'],
+              inputs=[training], outputs=eda_plots),
+        Stage('model', [python, 'scripts/model_and_results.py', '--training_data', training, '--test_data', test,
+                        '--results_to', './results/tables/', '--plots_to', './results/figures/',
+                        '--model_to', './results/models/', f'--seed={seed}', f'--n_jobs={n_jobs}',
+                        f'--search={search}'],
+              inputs=[training, test], outputs=model_outputs,
+              params={'seed': seed, 'search': search}, runtime_args=[f'--n_jobs={n_jobs}']),
+        Stage('report', [quarto, 'render', report, '--to', 'html'],
+              inputs=report_inputs, outputs=['reports/wine_quality_regressor_report.html'], sources=[]),
+        Stage('report_pdf', [quarto, 'render', report, '--to', 'pdf'],
+              inputs=report_inputs, outputs=['reports/wine_quality_regressor_report.pdf'], sources=[]),
+    ]
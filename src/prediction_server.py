@@ -0,0 +1,379 @@
+import asyncio
+import json
+import math
+import numbers
+import pickle
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+from src.model_artifact import CompactModel, load_artifact
+
+def load_model(model_path):
+    """Loads a tuned wine quality model saved by model_and_results.py
+
+    Parameters
+    ----------
+    model_path : str
+        Path to the compact model artifact (results/models/tuned_model.npz, loaded with NumPy only)
+        or to the pickled search object (results/models/tuned_model.pickle)
+
+    Returns
+    -------
+    object
+        Fitted model with predict_proba, classes_ and feature_names_in_
+    """
+    if model_path.endswith('.npz'):
+        return load_artifact(model_path)
+    with open(model_path, 'rb') as f:
+        return pickle.load(f)
+
+def known_categories(model):
+    """Categories the model's one-hot encoders were fitted on, per input column
+
+    Parameters
+    ----------
+    model : object
+        Fitted search or Pipeline with a ColumnTransformer, or a CompactModel loaded from an artifact
+
+    Returns
+    -------
+    dict
+        Column name to the set of its known category strings; empty if the model encodes no columns
+    """
+    if isinstance(model, CompactModel):
+        return {column: {str(category) for category in categories}
+                for kind, columns, params in model.steps if kind == 'onehot'
+                for column, categories in zip(columns, params[0])}
+    pipeline = getattr(model, 'best_estimator_', model)
+    categories = {}
+    for _, step in getattr(pipeline, 'steps', []):
+        for _, transformer, columns in getattr(step, 'transformers_', []):
+            if hasattr(transformer, 'categories_') and not isinstance(columns, str):
+                for column, column_categories in zip(columns, transformer.categories_):
+                    categories[column] = {str(category) for category in column_categories}
+    return categories
+
+class ServerStats:
+    """Latency and throughput counters for the prediction server
+
+    Parameters
+    ----------
+    window : int
+        Number of most recent request latencies kept for the percentiles
+    """
+
+    def __init__(self, window=10000):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)
+
+    def record_batch(self, n_requests, n_rows):
+        self.batches += 1
+        self.requests += n_requests
+        self.rows += n_rows
+
+    def snapshot(self):
+        """Returns the counters as a JSON-serializable dict
+
+        Returns
+        -------
+        dict
+            Request, row, batch and error counts, mean batch size in rows, latency percentiles in
+            milliseconds (from a request being queued to its predictions being ready) and rows per second
+        """
+        uptime = time.perf_counter() - self.started
+        latencies_ms = np.array(self.latencies) * 1000
+        percentiles = np.percentile(latencies_ms, [50, 95, 99]) if len(latencies_ms) else [0.0] * 3
+        return {
+            'requests': self.requests,
+            'rows': self.rows,
+            'batches': self.batches,
+            'errors': self.errors,
+            'mean_batch_size': self.rows / self.batches if self.batches else 0.0,
+            'latency_ms_p50': float(percentiles[0]),
+            'latency_ms_p95': float(percentiles[1]),
+            'latency_ms_p99': float(percentiles[2]),
+            'latency_ms_max': float(latencies_ms.max()) if len(latencies_ms) else 0.0,
+            'uptime_s': uptime,
+            'rows_per_s': self.rows / uptime if uptime > 0 else 0.0,
+        }
+
+class MicroBatcher:
+    """Groups concurrent prediction requests into one vectorized predict_proba call
+
+    A batch is scored as soon as it holds max_batch_size rows or max_wait_ms after its first request
+    arrived, whichever comes first. Scoring runs in a worker thread so new requests keep being accepted.
+
+    Parameters
+    ----------
+    model : object
+        Fitted model with predict_proba and classes_
+    max_batch_size : int
+        Maximum number of rows per batch (a single larger request is scored on its own)
+    max_wait_ms : float
+        Longest time the first request of a batch waits for others to join it
+    columns : list of str, optional
+        Feature columns every row must have; defaults to the model's feature_names_in_
+    """
+
+    def __init__(self, model, max_batch_size=64, max_wait_ms=5.0, columns=None):
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        if max_wait_ms < 0:
+            raise ValueError('max_wait_ms cannot be negative')
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.columns = list(columns if columns is not None else model.feature_names_in_)
+        self.classes = np.asarray(model.classes_).tolist()
+        self.categories = known_categories(model)
+        self.stats = ServerStats()
+        self._queue = None
+        self._worker = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def validate(self, rows):
+        """Checks and converts rows before they are queued, so a bad row cannot fail the rows batched with it
+
+        Parameters
+        ----------
+        rows : list of dict
+            Wine samples keyed by the training column names
+
+        Returns
+        -------
+        list of dict
+            The rows with only the model's columns: encoded columns as known category strings
+            and every other column as a finite float
+
+        Raises
+        ------
+        ValueError
+            If a row is not an object, misses a column, has an unknown category or a non-numeric feature
+        """
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError('rows must be a list of objects')
+        clean_rows = []
+        for row in rows:
+            missing = [column for column in self.columns if column not in row]
+            if missing:
+                raise ValueError(f'Missing columns: {missing}')
+            clean = {}
+            for column in self.columns:
+                value = row[column]
+                if column in self.categories:
+                    if not isinstance(value, str) or value not in self.categories[column]:
+                        raise ValueError(f'Unknown {column} {value!r}; expected one of {sorted(self.categories[column])}')
+                    clean[column] = value
+                    continue
+                if isinstance(value, bool) or not isinstance(value, (numbers.Real, str)):
+                    raise ValueError(f'{column} must be a number, got {value!r}')
+                try:
+                    number = float(value)
+                except ValueError:
+                    raise ValueError(f'{column} must be a number, got {value!r}') from None
+                if not math.isfinite(number):
+                    raise ValueError(f'{column} must be finite, got {value!r}')
+                clean[column] = number
+            clean_rows.append(clean)
+        return clean_rows
+
+    async def predict(self, rows):
+        """Validates rows, queues them for scoring and waits for their predictions
+
+        Parameters
+        ----------
+        rows : list of dict
+            Wine samples keyed by the training column names
+
+        Returns
+        -------
+        tuple
+            Predicted classes (list) and class probabilities (list of lists, ordered like self.classes)
+        """
+        rows = self.validate(rows)
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((rows, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            n_rows = len(batch[0][0])
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while n_rows < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                n_rows += len(item[0])
+
+            rows = [row for item in batch for row in item[0]]
+            try:
+                proba = await loop.run_in_executor(None, self._score, rows)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._fail(batch[0][1], e)
+                    continue
+                # Score each request on its own, so only the ones that fail get the error
+                for item in batch:
+                    try:
+                        item_proba = await loop.run_in_executor(None, self._score, item[0])
+                    except Exception as item_error:
+                        self._fail(item[1], item_error)
+                        continue
+                    self._resolve([item], item_proba)
+                continue
+            self._resolve(batch, proba)
+
+    def _fail(self, future, error):
+        self.stats.errors += 1
+        if not future.done():
+            future.set_exception(error)
+
+    def _resolve(self, batch, proba):
+        """Sets each request's slice of the batch's probabilities as its result"""
+        self.stats.record_batch(len(batch), len(proba))
+        predictions = np.asarray(self.classes)[proba.argmax(axis=1)].tolist()
+        proba = proba.tolist()
+        done = time.perf_counter()
+        start = 0
+        for item_rows, future, queued in batch:
+            end = start + len(item_rows)
+            self.stats.latencies.append(done - queued)
+            if not future.done():
+                future.set_result((predictions[start:end], proba[start:end]))
+            start = end
+
+    def _score(self, rows):
+        return self.model.predict_proba(pd.DataFrame.from_records(rows, columns=self.columns))
+
+class PredictionServer:
+    """Local HTTP/1.1 scoring service for the tuned wine quality model, built on asyncio
+
+    Endpoints
+    ---------
+    POST /predict
+        Body: a JSON object for one wine, a list of them, or {"rows": [...]}.
+        Response: {"predictions": [...], "probabilities": [[...]], "classes": [...]}
+    GET /stats
+        Latency and throughput counters (see ServerStats.snapshot)
+    GET /health
+        {"status": "ok"}
+
+    Parameters
+    ----------
+    model : object
+        Fitted model with predict_proba, classes_ and feature_names_in_
+    host : str
+        Interface to listen on
+    port : int
+        Port to listen on (0 picks a free port, see the port attribute after start)
+    max_batch_size : int
+        Maximum rows per micro-batch
+    max_wait_ms : float
+        Longest wait for a micro-batch to fill
+    """
+
+    def __init__(self, model, host='127.0.0.1', port=8000, max_batch_size=64, max_wait_ms=5.0):
+        self.batcher = MicroBatcher(model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        await self.batcher.start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.batcher.stop()
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, value = line.decode('latin-1').split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = await self._route(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                response = json.dumps(payload).encode()
+                writer.write(
+                    f'HTTP/1.1 {status}\r\n'
+                    f'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(response)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1') + response
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        if path == '/health':
+            return '200 OK', {'status': 'ok'}
+        if path == '/stats':
+            return '200 OK', self.batcher.stats.snapshot()
+        if path != '/predict':
+            return '404 Not Found', {'error': f'Unknown path {path}'}
+        if method != 'POST':
+            return '405 Method Not Allowed', {'error': 'Use POST for /predict'}
+
+        try:
+            rows = json.loads(body)
+            if isinstance(rows, dict):
+                rows = rows['rows'] if 'rows' in rows else [rows]
+            predictions, probabilities = await self.batcher.predict(rows)
+        except (ValueError, KeyError) as e:
+            return '400 Bad Request', {'error': str(e)}
+        except Exception as e:
+            return '500 Internal Server Error', {'error': str(e)}
+        return '200 OK', {'predictions': predictions, 'probabilities': probabilities,
+                          'classes': self.batcher.classes}
@@ -2,10 +2,58 @@
 # Author: Paramveer Singh
 # 15 Decemeber 2024
 
+import json
 import os
+import warnings
 import pandas as pd
+from src.file_utils import file_digest
 
-def read_data(filepath: str) -> pd.DataFrame:
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
+CACHE_SUFFIX = '.parquet'
+CACHE_KEY = b'read_data_cache_key'
+
+
+def schema_dtypes(schema, usecols=None, float32=False) -> dict:
+    """
+    Builds the pandas dtypes to load the columns of a Pandera schema with
+
+    String columns become categoricals and float columns keep their width
+    unless float32 is set, in which case they are downcast to float32.
+
+    Parameters
+    ----------
+    schema : pandera.DataFrameSchema
+        Schema whose column definitions give the dtypes (e.g. define_schema())
+    usecols : list of str, optional
+        Only return dtypes for these columns
+    float32 : bool
+        Downcast float columns to float32
+
+    Returns
+    -------
+    dict
+        Mapping of column name to pandas dtype
+    """
+    dtypes = {}
+    for name, column in schema.columns.items():
+        if usecols is not None and name not in usecols:
+            continue
+        dtype = str(column.dtype)
+        if dtype in ('str', 'string', 'object'):
+            dtype = 'category'
+        elif float32 and dtype.startswith('float'):
+            dtype = 'float32'
+        dtypes[name] = dtype
+    return dtypes
+
+
+def read_data(filepath: str, chunksize: int = None, cache: bool = False,
+              schema=None, usecols: list = None, float32: bool = False) -> pd.DataFrame:
     """
     Reads and returns data as a pandas DataFrame from a CSV
     and throws errors when given a non-existent directory or incorrect filename
@@ -14,11 +62,27 @@ def read_data(filepath: str) -> pd.DataFrame:
     ----------
     filepath : str
         The path to the data file
-    
+    chunksize : int, optional
+        If given, return an iterator over DataFrames of this many rows
+        instead of loading the whole file at once
+    cache : bool
+        Keep a Parquet copy of the CSV next to it (filepath + '.parquet')
+        and load from that copy while the CSV is unchanged, skipping the
+        CSV parse. Needs pyarrow; ignored when chunksize is given
+    schema : pandera.DataFrameSchema, optional
+        Load with the dtypes of this schema's columns (see schema_dtypes)
+        instead of letting pandas infer them. The pyarrow CSV parser is used
+        when it is installed
+    usecols : list of str, optional
+        Only load these columns, returned in the given order
+    float32 : bool
+        With schema, downcast float columns to float32 to halve their memory
+
     Returns
     -------
     pd.DataFrame
-        The loaded in data from the file
+        The loaded in data from the file (or an iterator of chunks
+        when chunksize is given)
 
     Example
     -------
@@ -27,6 +91,112 @@ def read_data(filepath: str) -> pd.DataFrame:
     if not os.path.basename(filepath).endswith('.csv'):
         raise ValueError('Filename does not end with .csv')
 
-    data = pd.read_csv(filepath)
+    dtype = schema_dtypes(schema, usecols, float32) if schema is not None else None
+
+    if cache and chunksize is None:
+        data = _read_cached(filepath, usecols)
+        if dtype:
+            data = data.astype({name: t for name, t in dtype.items() if name in data.columns})
+        return data
+
+    # The pyarrow parser has no chunked mode
+    engine = CSV_ENGINE if schema is not None and chunksize is None else 'c'
+    data = pd.read_csv(filepath, chunksize=chunksize, usecols=usecols, dtype=dtype, engine=engine)
+
+    if usecols is not None and chunksize is None:
+        data = data[list(usecols)]
 
     return data
+
+
+def write_csv_chunk(data: pd.DataFrame, out, header: bool = True) -> None:
+    """
+    Appends a DataFrame to a CSV file opened in binary mode, so a large CSV
+    can be written one chunk at a time
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Rows to write, without their index
+    out : file object
+        Binary file to append the rows to, e.g. open(path, 'wb')
+    header : bool
+        Write the column names first; only for the first chunk of a file
+
+    Notes
+    -----
+    pyarrow's CSV writer is used when it is installed (see CSV_ENGINE),
+    otherwise DataFrame.to_csv.
+    """
+    if CSV_ENGINE == 'pyarrow':
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        pa_csv.write_csv(pa.Table.from_pandas(data, preserve_index=False), out,
+                         pa_csv.WriteOptions(include_header=header))
+    else:
+        data.to_csv(out, header=header, index=False)
+
+
+def _file_key(filepath, stat):
+    """Cache key of a CSV file: its size, modification time and SHA-256 of its contents."""
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_digest(filepath)}
+
+
+def _read_cached(filepath, usecols=None):
+    """
+    Load a CSV through its Parquet cache, rebuilding the cache when it is stale.
+    The cache always holds every column; usecols only limits what is returned.
+
+    The cache is trusted without hashing the CSV while size and mtime match.
+    If either changed, the CSV is hashed and the cache is still reused when the
+    contents are identical (e.g. the file was only touched or re-downloaded).
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        warnings.warn('pyarrow is not installed; reading the CSV without the Parquet cache')
+        data = pd.read_csv(filepath, usecols=usecols)
+        return data if usecols is None else data[list(usecols)]
+
+    stat = os.stat(filepath)
+    cache_path = filepath + CACHE_SUFFIX
+
+    cached_key = None
+    if os.path.exists(cache_path):
+        try:
+            cached_key = json.loads(pq.read_schema(cache_path).metadata[CACHE_KEY])
+        except (OSError, KeyError, TypeError, ValueError):
+            cached_key = None
+
+    if cached_key is not None:
+        if (cached_key['size'], cached_key['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            return pd.read_parquet(cache_path, columns=usecols)
+        key = _file_key(filepath, stat)
+        if key['sha256'] == cached_key['sha256']:
+            data = pd.read_parquet(cache_path)
+            _write_cache(data, cache_path, key)
+            return data if usecols is None else data[list(usecols)]
+    else:
+        key = _file_key(filepath, stat)
+
+    data = pd.read_csv(filepath)
+    _write_cache(data, cache_path, key)
+    return data if usecols is None else data[list(usecols)]
+
+
+def _write_cache(data, cache_path, key):
+    """Atomically write data to cache_path with key stored in the Parquet metadata."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(data)
+    table = table.replace_schema_metadata({**table.schema.metadata, CACHE_KEY: json.dumps(key).encode()})
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        # A read-only data folder should not stop the read itself
+        warnings.warn(f'Could not write Parquet cache {cache_path}: {e}')
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,228 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+from src.data_validation import CompiledSchema, define_schema
+from src.read_data import write_csv_chunk
+
+GROUP_COLUMNS = ['color', 'quality']
+
+class WineGenerator:
+    """Generator of synthetic wines fitted to real wine data with a Gaussian copula per color and quality
+
+    For each color and quality the generator keeps each feature's sorted values (its empirical quantile
+    function) and the correlation matrix of the features' normal scores. New rows draw correlated standard
+    normals, map them to uniforms and read each feature off its quantile function, so the marginals and the
+    rank correlations of each group follow the data. Correlations of small groups are shrunk towards those of
+    the whole color. Values are rounded to the number of decimals each column has in the data.
+
+    Use fit_generator to build one.
+    """
+
+    def __init__(self, columns, feature_columns, groups, weights, quantiles, cholesky, decimals):
+        self.columns = columns
+        self.feature_columns = feature_columns
+        self.groups = groups
+        self.weights = weights
+        self.quantiles = quantiles
+        self.cholesky = cholesky
+        self.decimals = decimals
+
+    def sample(self, n_rows, rng):
+        """Draws n_rows clean rows, shuffled across groups, as a DataFrame in the data's column order"""
+        counts = rng.multinomial(n_rows, self.weights)
+        features = np.empty((n_rows, len(self.feature_columns)))
+        group_idx = np.repeat(np.arange(len(self.groups)), counts)
+        start = 0
+        for g, count in enumerate(counts):
+            if count == 0:
+                continue
+            uniform = ndtr(rng.standard_normal((count, len(self.feature_columns))) @ self.cholesky[g].T)
+            block = features[start:start + count]
+            for j, values in enumerate(self.quantiles[g]):
+                # Interpolated empirical quantile function of the group's values
+                block[:, j] = np.interp(uniform[:, j] * (len(values) - 1), np.arange(len(values)), values)
+            start += count
+
+        order = rng.permutation(n_rows)
+        features, group_idx = features[order], group_idx[order]
+        data = pd.DataFrame({column: np.round(features[:, j], self.decimals[column])
+                             for j, column in enumerate(self.feature_columns)})
+        for k, column in enumerate(GROUP_COLUMNS):
+            data[column] = np.array([group[k] for group in self.groups])[group_idx]
+        return data[self.columns]
+
+    def generate(self, n_rows, chunksize=1_000_000, seed=None, out_of_range_rate=0.0, duplicate_rate=0.0,
+                 empty_rate=0.0):
+        """Yields n_rows synthetic rows as DataFrame chunks, with optional rows for the validator to reject
+
+        Parameters
+        ----------
+        n_rows : int
+            Total number of rows
+        chunksize : int
+            Rows per chunk (bounds memory use)
+        seed : int, optional
+            Seed of the random generator; the same seed and chunksize give the same rows
+        out_of_range_rate : float
+            Fraction of rows with one feature set to a negative value, out of range for every column
+        duplicate_rate : float
+            Fraction of rows replaced by a copy of another row of their chunk
+        empty_rate : float
+            Fraction of rows with every column missing
+
+        Yields
+        ------
+        pandas.DataFrame
+            Chunk of at most chunksize rows in the data's column layout
+        """
+        if not isinstance(n_rows, int) or n_rows < 0:
+            raise ValueError("n_rows must be a non-negative integer")
+        if not isinstance(chunksize, int) or chunksize <= 0:
+            raise ValueError("chunksize must be a positive integer")
+        rates = [out_of_range_rate, duplicate_rate, empty_rate]
+        if any(not 0 <= rate <= 1 for rate in rates) or sum(rates) > 1:
+            raise ValueError("Rates must be between 0 and 1 and add up to at most 1")
+
+        rng = np.random.default_rng(seed)
+        for start in range(0, n_rows, chunksize):
+            size = min(chunksize, n_rows - start)
+            data = self.sample(size, rng)
+            if not any(rates):
+                yield data
+                continue
+
+            # Each row gets at most one kind of problem
+            kind = rng.choice(4, size=size, p=[1 - sum(rates)] + rates)
+            out_of_range = np.flatnonzero(kind == 1)
+            if len(out_of_range):
+                column = rng.integers(0, len(self.feature_columns), len(out_of_range))
+                for j, name in enumerate(self.feature_columns):
+                    rows = out_of_range[column == j]
+                    data.loc[rows, name] = -(data.loc[rows, name].abs() + 1)
+            duplicates = np.flatnonzero(kind == 2)
+            if len(duplicates):
+                # Copies of rows that are not themselves altered, so they are exact duplicates
+                clean = np.flatnonzero(kind == 0)
+                if len(clean):
+                    source = rng.choice(clean, len(duplicates))
+                    for column in data.columns:
+                        values = data[column].to_numpy(copy=True)
+                        values[duplicates] = values[source]
+                        data[column] = values
+            empty = np.flatnonzero(kind == 3)
+            if len(empty):
+                data['quality'] = data['quality'].astype(np.float64)
+                data.iloc[empty] = np.nan
+            yield data
+
+def fit_generator(df, shrinkage=0.1, schema=None):
+    """Fits a WineGenerator to the wine data's rows that pass the schema's column rules
+
+    Rows breaking a rule or with missing values are left out, so generated rows only break the schema where
+    problems are injected (see WineGenerator.generate).
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Wine data with numeric feature columns, 'color' and 'quality', e.g. data/raw/wine_quality.csv
+    shrinkage : float
+        Least weight given to the color's correlation matrix over the group's own; groups with few rows
+        per feature are shrunk further, and groups with a single row use the color's correlations
+    schema : pandera.DataFrameSchema, optional
+        Schema whose column rules the rows fitted to must follow (see CompiledSchema); defaults to define_schema()
+
+    Returns
+    -------
+    WineGenerator
+        Generator reproducing the data's column layout, group frequencies, marginals and correlations
+
+    Example
+    -------
+    >>> generator = fit_generator(read_data('data/raw/wine_quality.csv'))
+    >>> next(generator.generate(1000, seed=522))
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("df must be a DataFrame")
+    missing = [col for col in GROUP_COLUMNS if col not in df.columns]
+    if missing:
+        raise KeyError(f"Missing columns: {missing}")
+    if not 0 <= shrinkage <= 1:
+        raise ValueError("shrinkage must be between 0 and 1")
+    keep, _ = CompiledSchema(define_schema() if schema is None else schema).check(df)
+    df = df[keep].dropna()
+    feature_columns = [col for col in df.select_dtypes('number').columns if col not in GROUP_COLUMNS]
+    k = len(feature_columns)
+
+    color_corr = {color: _normal_score_corr(group[feature_columns].to_numpy(dtype=np.float64))
+                  for color, group in df.groupby('color')}
+    groups, weights, quantiles, cholesky = [], [], [], []
+    for (color, quality), group in df.groupby(GROUP_COLUMNS):
+        values = group[feature_columns].to_numpy(dtype=np.float64)
+        weight = max(shrinkage, min(1.0, k / len(values)))
+        corr = color_corr[color] if len(values) < 2 else \
+            (1 - weight) * _normal_score_corr(values) + weight * color_corr[color]
+        groups.append((color, quality))
+        weights.append(len(values))
+        quantiles.append([np.sort(values[:, j]) for j in range(k)])
+        cholesky.append(np.linalg.cholesky(corr + 1e-9 * np.eye(k)))
+
+    decimals = {col: _decimals(df[col].to_numpy(dtype=np.float64)) for col in feature_columns}
+    return WineGenerator(list(df.columns), feature_columns, groups, np.array(weights) / sum(weights),
+                         quantiles, cholesky, decimals)
+
+def _normal_score_corr(values):
+    """Correlation of the normal scores (van der Waerden) of each column's ranks"""
+    n = len(values)
+    ranks = pd.DataFrame(values).rank().to_numpy()
+    scores = ndtri(ranks / (n + 1))
+    corr = np.corrcoef(scores, rowvar=False) if n > 1 else np.eye(values.shape[1])
+    # Constant columns have no correlation with anything
+    corr = np.nan_to_num(corr)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+def _decimals(values, max_decimals=6):
+    """Fewest decimals that represent every value of a column"""
+    for d in range(max_decimals + 1):
+        scaled = values * 10 ** d
+        if np.all(np.abs(scaled - np.round(scaled)) < 1e-6):
+            return d
+    return max_decimals
+
+def write_synthetic_csv(generator, output_path, n_rows, chunksize=1_000_000, seed=None, **rates):
+    """Streams synthetic rows to a CSV file, one chunk in memory at a time
+
+    Parameters
+    ----------
+    generator : WineGenerator
+        Fitted generator (see fit_generator)
+    output_path : str
+        CSV file to write; it is replaced only once every row is written
+    n_rows, chunksize, seed
+        As for WineGenerator.generate
+    **rates
+        out_of_range_rate, duplicate_rate and empty_rate, as for WineGenerator.generate
+
+    Returns
+    -------
+    dict
+        Number of rows written, seconds taken and rows per second
+    """
+    start = time.perf_counter()
+    tmp_path = f'{output_path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as out:
+            header = True
+            for chunk in generator.generate(n_rows, chunksize=chunksize, seed=seed, **rates):
+                write_csv_chunk(chunk, out, header)
+                header = False
+            if header:
+                out.write((','.join(generator.columns) + '\n').encode())
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    seconds = time.perf_counter() - start
+    return {'rows': n_rows, 'seconds': seconds, 'rows_per_s': n_rows / seconds if seconds else float('inf')}
@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+class WineStatistics:
+    """Summary statistics of wine data accumulated chunk by chunk in one pass
+
+    Tracks the row count, means, covariance matrix (as co-moments), minima and maxima of the numeric
+    columns and the number of rows per combination of the class columns (color and quality by default).
+    Chunks are combined with Chan et al.'s pairwise update, so statistics of separate chunks, files or
+    worker processes can be merged and give the same result as one pass over all the rows.
+
+    Rows with a missing value in any numeric column are left out of the moments but still counted
+    in the class counts.
+
+    Parameters
+    ----------
+    columns : list of str, optional
+        Numeric columns to summarise; by default the numeric columns of the first chunk
+    class_columns : tuple of str
+        Columns whose value combinations are counted; those missing from the data are ignored
+
+    Example
+    -------
+    >>> stats = WineStatistics.from_csv('data/processed/training_set.csv', chunksize=100_000)
+    >>> stats.correlation()
+    """
+
+    def __init__(self, columns=None, class_columns=('color', 'quality')):
+        self.columns = list(columns) if columns is not None else None
+        self.class_columns = list(class_columns)
+        self.n_rows = 0
+        self.count = 0
+        self._counts = {}
+        if self.columns is not None:
+            self._init_moments()
+
+    def _init_moments(self):
+        k = len(self.columns)
+        self.mean = np.zeros(k)
+        self.comoment = np.zeros((k, k))
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+
+    @classmethod
+    def from_csv(cls, path, chunksize=100_000, columns=None, class_columns=('color', 'quality')):
+        """Accumulates the statistics of a CSV file read chunksize rows at a time
+
+        Parameters
+        ----------
+        path : str
+            CSV file to read
+        chunksize : int
+            Number of rows held in memory at once
+        columns, class_columns
+            As for WineStatistics
+
+        Returns
+        -------
+        WineStatistics
+            Statistics of every row of the file
+        """
+        stats = cls(columns, class_columns)
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            stats.update(chunk)
+        return stats
+
+    def update(self, df):
+        """Adds the rows of a DataFrame chunk to the statistics and returns self"""
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError("df must be a DataFrame")
+        if self.columns is None:
+            self.class_columns = [col for col in self.class_columns if col in df.columns]
+            self.columns = df.select_dtypes(['number', 'boolean']).columns.tolist()
+            self._init_moments()
+        missing = [col for col in self.columns + self.class_columns if col not in df.columns]
+        if missing:
+            raise KeyError(f"Missing columns: {missing}")
+
+        self.n_rows += len(df)
+        if self.class_columns:
+            sizes = df.groupby(self.class_columns, dropna=False).size()
+            for key, size in zip(sizes.index, sizes.to_numpy()):
+                key = key if isinstance(key, tuple) else (key,)
+                self._counts[key] = self._counts.get(key, 0) + int(size)
+
+        values = df[self.columns].to_numpy(dtype=np.float64)
+        values = values[~np.isnan(values).any(axis=1)]
+        if len(values):
+            mean = values.mean(axis=0)
+            centered = values - mean
+            self._combine(len(values), mean, centered.T @ centered, values.min(axis=0), values.max(axis=0))
+        return self
+
+    def merge(self, other):
+        """Adds the statistics of another WineStatistics (e.g. from a parallel worker) and returns self"""
+        if not isinstance(other, WineStatistics):
+            raise TypeError("other must be a WineStatistics")
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.columns, self.class_columns = list(other.columns), list(other.class_columns)
+            self._init_moments()
+        if other.columns != self.columns or other.class_columns != self.class_columns:
+            raise ValueError("Cannot merge statistics of different columns")
+
+        self.n_rows += other.n_rows
+        for key, size in other._counts.items():
+            self._counts[key] = self._counts.get(key, 0) + size
+        if other.count:
+            self._combine(other.count, other.mean, other.comoment, other.min, other.max)
+        return self
+
+    def _combine(self, count, mean, comoment, minimum, maximum):
+        total = self.count + count
+        delta = mean - self.mean
+        self.comoment = self.comoment + comoment + np.outer(delta, delta) * (self.count * count / total)
+        self.mean = self.mean + delta * (count / total)
+        self.count = total
+        self.min = np.fmin(self.min, minimum)
+        self.max = np.fmax(self.max, maximum)
+
+    def covariance(self, ddof=1):
+        """Covariance matrix of the numeric columns as a DataFrame"""
+        if self.count <= ddof:
+            raise ValueError("Not enough rows for a covariance")
+        return pd.DataFrame(self.comoment / (self.count - ddof), index=self.columns, columns=self.columns)
+
+    def correlation(self):
+        """Pearson correlation matrix of the numeric columns as a DataFrame"""
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.comoment / np.outer(std, std)
+        np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def summary(self):
+        """Count, mean, std, min and max of each numeric column as a DataFrame (like DataFrame.describe)"""
+        std = np.sqrt(np.diag(self.comoment) / (self.count - 1)) if self.count > 1 else np.full(len(self.columns), np.nan)
+        return pd.DataFrame({'count': self.count, 'mean': self.mean, 'std': std, 'min': self.min, 'max': self.max},
+                            index=self.columns).T
+
+    def class_counts(self, columns=None, dropna=True):
+        """Number of rows per combination of values of some of the class columns
+
+        Parameters
+        ----------
+        columns : str or list of str, optional
+            Class columns to count by; all of them by default
+        dropna : bool
+            Leave out combinations with a missing value, like DataFrame.groupby
+
+        Returns
+        -------
+        pandas.Series
+            Counts indexed by the column values, sorted by index
+        """
+        columns = self.class_columns if columns is None else [columns] if isinstance(columns, str) else list(columns)
+        unknown = [col for col in columns if col not in self.class_columns]
+        if unknown:
+            raise KeyError(f"Not a class column: {unknown}")
+        if not self._counts:
+            return pd.Series(dtype='int64', name='count')
+        index = pd.MultiIndex.from_tuples(list(self._counts), names=self.class_columns)
+        counts = pd.Series(list(self._counts.values()), index=index, dtype='int64', name='count')
+        return counts.groupby(level=columns, dropna=dropna).sum().sort_index()
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import make_column_transformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src import batch_scoring, read_data
+from src.batch_scoring import score_csv
+
+# fit the analysis pipeline on the training set and score the test set
+train_df = pd.read_csv('data/processed/training_set.csv')
+test_df = pd.read_csv('data/processed/test_set.csv')
+X_train, y_train = (train_df.drop(columns='quality'), train_df['quality'])
+numeric_features = X_train.columns.drop('color').tolist()
+model = make_pipeline(
+    make_column_transformer(
+        (OneHotEncoder(drop='if_binary'), ['color']),
+        (StandardScaler(), numeric_features)
+    ),
+    LogisticRegression(multi_class='multinomial', solver='lbfgs', max_iter=2000)
+).fit(X_train, y_train)
+
+@pytest.mark.parametrize('csv_engine', ['pyarrow', 'c'])
+def test_score_csv_matches_predict(tmp_path, monkeypatch, csv_engine):
+    """Tests chunked scoring writes the input rows with the model's predictions and probabilities."""
+    monkeypatch.setattr(read_data, 'CSV_ENGINE', csv_engine)
+    output_path = str(tmp_path / 'scored.csv')
+    counts = score_csv(model, 'data/processed/test_set.csv', output_path, chunksize=150)
+    scored = pd.read_csv(output_path)
+    assert counts['rows_read'] == counts['rows_scored'] == len(test_df)
+    assert counts['rows_per_s'] > 0
+    assert list(scored.columns[:len(test_df.columns)]) == list(test_df.columns)
+    assert np.array_equal(scored['predicted_quality'], model.predict(test_df))
+    probabilities = scored[[f'probability_{label}' for label in model.classes_]].to_numpy()
+    assert probabilities == pytest.approx(model.predict_proba(test_df), abs=1e-12)
+
+def test_score_csv_invalid_rows(tmp_path):
+    """Tests rows breaking the schema stop scoring by default and are skipped and counted on request."""
+    input_path = str(tmp_path / 'wines.csv')
+    output_path = str(tmp_path / 'scored.csv')
+    wines = test_df.drop(columns='quality')[:100].copy()
+    wines.loc[[3, 70], 'alcohol'] = 99.0
+    wines.loc[50, 'color'] = 'rose'
+    wines.to_csv(input_path, index=False)
+
+    with pytest.raises(ValueError, match='1 rows break the schema, the first at data row 3'):
+        score_csv(model, input_path, output_path, chunksize=40)
+    assert not os.path.exists(output_path)
+    assert os.listdir(tmp_path) == ['wines.csv']
+
+    counts = score_csv(model, input_path, output_path, chunksize=40, on_invalid='skip')
+    assert counts['invalid_rows'] == 3
+    assert counts['failures'] == {'alcohol:in_range': 2, 'color:isin': 1}
+    assert len(pd.read_csv(output_path)) == counts['rows_scored'] == 97
+
+@pytest.mark.parametrize('csv_engine', ['pyarrow', 'c'])
+def test_score_csv_missing_features(tmp_path, monkeypatch, csv_engine):
+    """Tests rows with a missing feature, which the model cannot score, are invalid rather than scored."""
+    monkeypatch.setattr(read_data, 'CSV_ENGINE', csv_engine)
+    input_path = str(tmp_path / 'wines.csv')
+    output_path = str(tmp_path / 'scored.csv')
+    wines = test_df.drop(columns='quality')[:50].copy()
+    wines.loc[10, 'pH'] = np.nan
+    wines.loc[20, 'color'] = np.nan
+    wines.to_csv(input_path, index=False)
+
+    with pytest.raises(ValueError, match='2 rows break the schema, the first at data row 10'):
+        score_csv(model, input_path, output_path)
+
+    counts = score_csv(model, input_path, output_path, on_invalid='skip')
+    assert counts['invalid_rows'] == 2
+    assert counts['failures'] == {'pH:not_nullable': 1, 'color:not_nullable': 1}
+    scored = pd.read_csv(output_path)
+    assert len(scored) == counts['rows_scored'] == 48
+    assert np.array_equal(scored['predicted_quality'], model.predict(wines.dropna()))
+    assert not scored.isna().any().any()
+
+@pytest.mark.parametrize('csv_engine', ['pyarrow', 'c'])
+@pytest.mark.parametrize('empty_chunk', [True, False])
+def test_score_csv_header_only(tmp_path, monkeypatch, csv_engine, empty_chunk):
+    """Tests an input without rows gives an output with just the header, written as for a scored file.
+
+    pandas reads a header-only file as one empty chunk; the reader is also run without it, as if no chunk came."""
+    monkeypatch.setattr(read_data, 'CSV_ENGINE', csv_engine)
+    if not empty_chunk:
+        def nonempty_chunks(path, chunksize=None, **kwargs):
+            data = read_data.read_data(path, chunksize=chunksize, **kwargs)
+            return data if chunksize is None else (chunk for chunk in data if len(chunk))
+        monkeypatch.setattr(batch_scoring, 'read_data', nonempty_chunks)
+    input_path = str(tmp_path / 'wines.csv')
+    output_path = str(tmp_path / 'scored.csv')
+    test_df[:0].to_csv(input_path, index=False)
+    counts = score_csv(model, input_path, output_path)
+    assert counts['rows_read'] == counts['rows_scored'] == 0
+    with_rows_path = str(tmp_path / 'scored_rows.csv')
+    score_csv(model, 'data/processed/test_set.csv', with_rows_path)
+    with open(output_path) as f, open(with_rows_path) as with_rows:
+        assert f.read() == with_rows.readline()
+    scored = pd.read_csv(output_path)
+    assert scored.empty
+    assert list(scored.columns) == (list(test_df.columns) + ['predicted_quality']
+                                    + [f'probability_{label}' for label in model.classes_])
+
+    test_df.drop(columns='alcohol')[:0].to_csv(input_path, index=False)
+    with pytest.raises(ValueError, match='Missing columns'):
+        score_csv(model, input_path, output_path)
+
+def test_score_csv_errors(tmp_path):
+    """Tests bad arguments and missing feature columns raise ValueError."""
+    input_path = str(tmp_path / 'wines.csv')
+    test_df.drop(columns='alcohol').to_csv(input_path, index=False)
+    with pytest.raises(ValueError, match='Missing columns'):
+        score_csv(model, input_path, str(tmp_path / 'scored.csv'))
+    with pytest.raises(ValueError):
+        score_csv(model, input_path, str(tmp_path / 'scored.csv'), chunksize=0)
+    with pytest.raises(ValueError):
+        score_csv(model, input_path, str(tmp_path / 'scored.csv'), on_invalid='ignore')
@@ -0,0 +1,49 @@
+import pytest
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+from bench_suite import compare_results, scale_benchmarks
+from src.read_data import read_data
+
+def results(*rows):
+    """Builds a results file's contents from (benchmark, scale, seconds, peak_memory_mb) rows."""
+    return {'results': [{'benchmark': benchmark, 'scale': scale, 'seconds': seconds, 'peak_memory_mb': memory}
+                        for benchmark, scale, seconds, memory in rows]}
+
+def test_compare_results_flags_regressions_over_the_threshold():
+    """Tests slowdowns and memory growth above the threshold are regressions, unless the slowdown is tiny."""
+    baseline = results(('split', 1, 1.0, 100.0), ('predict', 1, 0.01, 10.0), ('validate_numpy', 1, 1.0, 100.0))
+    current = results(('split', 1, 1.5, 100.0), ('predict', 1, 0.02, 10.0), ('validate_numpy', 1, 1.0, 130.0))
+    rows = {row['benchmark']: row for row in compare_results(baseline, current, 1.25, 0.05)}
+    assert rows['split']['time_ratio'] == pytest.approx(1.5)
+    assert rows['split']['regression']
+    assert not rows['predict']['regression']
+    assert rows['validate_numpy']['memory_ratio'] == pytest.approx(1.3)
+    assert rows['validate_numpy']['regression']
+
+def test_compare_results_within_the_threshold():
+    """Tests changes up to the threshold, and speedups, are not regressions."""
+    baseline = results(('split', 1, 1.0, 100.0), ('split', 10, 10.0, 1000.0))
+    current = results(('split', 1, 1.2, 120.0), ('split', 10, 5.0, 900.0))
+    rows = compare_results(baseline, current, 1.25, 0.05)
+    assert len(rows) == 2
+    assert not any(row['regression'] or row['missing'] for row in rows)
+
+def test_compare_results_missing_benchmark():
+    """Tests a benchmark missing from the current run is listed as missing and one new to it is left out."""
+    baseline = results(('split', 1, 1.0, 100.0), ('read_data', 1, 1.0, 100.0))
+    current = results(('split', 1, 1.0, 100.0), ('predict', 1, 1.0, 100.0))
+    rows = {row['benchmark']: row for row in compare_results(baseline, current, 1.25, 0.05)}
+    assert set(rows) == {'split', 'read_data'}
+    assert rows['read_data']['missing'] and not rows['read_data']['regression']
+    assert rows['read_data']['time_ratio'] is None
+
+def test_scale_benchmarks_builds_only_what_is_selected(tmp_path):
+    """Tests running only read_data writes the scaled raw file and skips cleaning and splitting."""
+    raw_data = read_data('data/raw/wine_quality.csv').head(200)
+    benchmarks = dict(scale_benchmarks(raw_data, 1, str(tmp_path), 2, 10, ['read_data']))
+    assert list(benchmarks) == ['read_data']
+    assert os.listdir(tmp_path) == ['raw_1.csv']
+    assert len(benchmarks['read_data']()) == 200
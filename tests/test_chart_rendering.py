@@ -0,0 +1,61 @@
+import os
+import altair as alt
+import pandas as pd
+import pytest
+
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.chart_rendering import MANIFEST, chart_spec_hash, render_charts
+from src.eda_utils import create_quality_distribution_bar, create_wine_quality_proportion_plot
+
+@pytest.fixture
+def sample_wine_df():
+    """Creates a sample wine DataFrame for testing.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Sample wine data
+    """
+    return pd.DataFrame({
+        'quality': [5, 6, 7, 5, 6, 6],
+        'color': ['red', 'white', 'red', 'white', 'red', 'white']
+    })
+
+def test_chart_spec_hash(sample_wine_df):
+    """Tests the hash depends on the data, the chart definition and the resolution only."""
+    chart = create_quality_distribution_bar(sample_wine_df)
+    assert chart_spec_hash(chart) == chart_spec_hash(create_quality_distribution_bar(sample_wine_df))
+    assert chart_spec_hash(chart) != chart_spec_hash(chart, ppi=100)
+    assert chart_spec_hash(chart) != chart_spec_hash(chart.properties(width=100))
+    assert chart_spec_hash(chart) != chart_spec_hash(create_quality_distribution_bar(sample_wine_df[:4]))
+
+def test_render_charts_skips_unchanged(sample_wine_df, tmp_path):
+    """Tests only charts whose spec changed or whose file is missing are rendered again."""
+    charts = {'bar.png': create_quality_distribution_bar(sample_wine_df),
+              'props.png': create_wine_quality_proportion_plot(sample_wine_df)}
+    results = render_charts(charts, str(tmp_path), ppi=50, max_workers=1)
+    assert {name: result['status'] for name, result in results.items()} == {'bar.png': 'rendered', 'props.png': 'rendered'}
+    assert all(os.path.getsize(result['path']) > 0 and result['seconds'] > 0 for result in results.values())
+    assert os.path.exists(tmp_path / MANIFEST)
+
+    results = render_charts(charts, str(tmp_path), ppi=50, max_workers=1)
+    assert {result['status'] for result in results.values()} == {'cached'}
+
+    charts['bar.png'] = create_quality_distribution_bar(sample_wine_df[:4])
+    os.remove(tmp_path / 'props.png')
+    results = render_charts(charts, str(tmp_path), ppi=50, max_workers=1)
+    assert {result['status'] for result in results.values()} == {'rendered'}
+
+    results = render_charts(charts, str(tmp_path), ppi=50, max_workers=1, force=True)
+    assert {result['status'] for result in results.values()} == {'rendered'}
+
+def test_render_charts_in_worker_processes(sample_wine_df, tmp_path):
+    """Tests charts rendered by a process pool are saved and recorded like in-process renders."""
+    charts = {'bar.png': create_quality_distribution_bar(sample_wine_df),
+              'props.png': create_wine_quality_proportion_plot(sample_wine_df)}
+    results = render_charts(charts, str(tmp_path), ppi=50, max_workers=2)
+    assert list(results) == ['bar.png', 'props.png']
+    assert all(result['status'] == 'rendered' and os.path.exists(result['path']) for result in results.values())
+    assert not [name for name in os.listdir(tmp_path) if '.tmp' in name]
+    assert {result['status'] for result in render_charts(charts, str(tmp_path), ppi=50).values()} == {'cached'}
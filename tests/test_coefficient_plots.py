@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib.image import imread
+from sklearn.compose import make_column_transformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.coefficient_plots import (COMBINED_FILENAME, coefficient_filename, model_coefficients,
+                                   render_coefficient_plots)
+
+train_df = pd.read_csv('data/processed/training_set.csv')
+X_train, y_train = (train_df.drop(columns='quality'), train_df['quality'])
+numeric_features = X_train.columns.drop('color').tolist()
+model = make_pipeline(
+    make_column_transformer(
+        (OneHotEncoder(drop='if_binary'), ['color']),
+        (StandardScaler(), numeric_features)
+    ),
+    LogisticRegression(multi_class='multinomial', solver='lbfgs', max_iter=2000)
+).fit(X_train, y_train)
+
+def test_model_coefficients():
+    """Tests the feature names follow the preprocessor's output order, with the encoded color first."""
+    coefficients, class_labels, feature_names = model_coefficients(model)
+    assert coefficients.shape == (len(class_labels), len(numeric_features) + 1)
+    assert list(feature_names) == ['color_white'] + numeric_features
+    assert list(class_labels) == sorted(y_train.unique())
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_render_coefficient_plots(tmp_path, max_workers):
+    """Tests one plot is saved per class, whether rendered in this process or in workers."""
+    coefficients, class_labels, feature_names = model_coefficients(model)
+    results = render_coefficient_plots(coefficients, feature_names, class_labels, str(tmp_path), dpi=50,
+                                       max_workers=max_workers)
+    assert list(results) == [coefficient_filename(label) for label in class_labels]
+    for result in results.values():
+        assert result['seconds'] > 0
+        assert imread(result['path']).shape[:2] == (300, 500)
+    assert sorted(os.listdir(tmp_path)) == sorted(results)
+
+def test_render_combined_coefficient_plot(tmp_path):
+    """Tests the combined option saves a single small-multiples figure."""
+    coefficients, class_labels, feature_names = model_coefficients(model)
+    results = render_coefficient_plots(coefficients, feature_names, class_labels, str(tmp_path), dpi=50,
+                                       combined=True)
+    assert list(results) == [COMBINED_FILENAME]
+    assert os.listdir(tmp_path) == [COMBINED_FILENAME]
+    assert imread(results[COMBINED_FILENAME]['path']).shape[:2] == (350, 1000)
+
+    with pytest.raises(ValueError):
+        render_coefficient_plots(coefficients[:, 1:], feature_names, class_labels, str(tmp_path))
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.data_split import TEST_FILENAME, TRAIN_FILENAME, hash_fractions, hash_split_csv
+
+cleaned = pd.read_csv('data/processed/cleaned_wine_quality.csv')
+
+def split(data, tmp_path, name, **kwargs):
+    """Writes data to a CSV file, hash splits it and returns the training and test sets."""
+    input_path = tmp_path / f'{name}.csv'
+    data.to_csv(input_path, index=False)
+    counts = hash_split_csv(str(input_path), str(tmp_path / name), **kwargs)
+    train = pd.read_csv(tmp_path / name / TRAIN_FILENAME)
+    test = pd.read_csv(tmp_path / name / TEST_FILENAME)
+    assert counts == {'rows_read': len(data), 'train_rows': len(train), 'test_rows': len(test)}
+    return train, test
+
+def keys(data):
+    return set(data.astype(str).agg(','.join, axis=1))
+
+def test_hash_fractions():
+    """Tests the hash depends on the row's contents and the seed, not on its position or dtype."""
+    data = cleaned.head(500)
+    fractions = hash_fractions(data, 522)
+    assert ((fractions >= 0) & (fractions < 1)).all()
+    assert abs((fractions < 0.2).mean() - 0.2) < 0.05
+    shuffled = data.sample(frac=1, random_state=1)
+    np.testing.assert_array_equal(hash_fractions(shuffled, 522), fractions[shuffled.index])
+    np.testing.assert_array_equal(hash_fractions(data.astype({'quality': float}), 522), fractions)
+    assert not np.array_equal(hash_fractions(data, 523), fractions)
+
+def test_hash_split_csv_keeps_splits_as_data_grows(tmp_path):
+    """Tests rows keep their split when rows are added or reordered, whatever the chunk size."""
+    train, test = split(cleaned.head(3000), tmp_path, 'small', chunksize=128)
+    assert len(train) + len(test) == 3000
+    assert abs(len(test) / 3000 - 0.2) < 0.03
+    assert not keys(train) & keys(test)
+
+    grown = pd.concat([cleaned, cleaned.head(3000)]).sample(frac=1, random_state=2).drop_duplicates()
+    grown_train, grown_test = split(grown, tmp_path, 'grown', chunksize=1000)
+    assert keys(train) <= keys(grown_train)
+    assert keys(test) <= keys(grown_test)
+
+    other_train, _ = split(cleaned.head(3000), tmp_path, 'other_seed', seed=1)
+    assert keys(other_train) != keys(train)
+
+def test_hash_split_csv_stratified(tmp_path):
+    """Tests every quality class gets its share of test rows, also after rows are appended."""
+    train, test = split(cleaned.head(3000), tmp_path, 'small', stratify='quality', chunksize=256)
+    rows, test_rows = cleaned.head(3000)['quality'].value_counts(), test['quality'].value_counts()
+    assert (abs(test_rows.reindex(rows.index, fill_value=0) - 0.2 * rows) <= 1).all()
+
+    grown_train, grown_test = split(cleaned, tmp_path, 'grown', stratify='quality', chunksize=1000)
+    assert keys(train) <= keys(grown_train)
+    assert keys(test) <= keys(grown_test)
+
+    with pytest.raises(KeyError):
+        split(cleaned.head(10), tmp_path, 'no_column', stratify='vintage')
+    assert not os.listdir(tmp_path / 'no_column')
+
+def test_hash_split_csv_rejects_bad_test_size(tmp_path):
+    """Tests test_size must be strictly between 0 and 1."""
+    with pytest.raises(ValueError):
+        hash_split_csv('data/processed/cleaned_wine_quality.csv', str(tmp_path), test_size=1)
@@ -1,13 +1,20 @@
 import sys
 import os
+import numpy as np
 import pandas as pd
 import pandera as pa
 import pytest
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from src.data_validation import (
+    CompiledSchema,
     create_directory,
     define_schema, 
-    save_data)
+    row_hashes,
+    RowHashSet,
+    save_data,
+    validate_and_clean_data,
+    validate_and_clean_data_chunked,
+    validate_and_clean_data_incremental)
 
 
 def test_create_directory(tmp_path):
@@ -52,3 +59,153 @@ def test_save_data(tmp_path):
 
     with pytest.raises(ValueError):
         save_data(None, output_file)  # Pass invalid input to trigger a ValueError
+
+
+def test_row_hash_set_add_new():
+    """
+    Test that RowHashSet flags only hashes not seen in earlier or the same batch.
+    """
+    seen = RowHashSet()
+    first = seen.add_new(np.array([3, 1, 3], dtype=np.uint64))
+    second = seen.add_new(np.array([1, 2, 2], dtype=np.uint64))
+
+    assert first.tolist() == [True, True, False]
+    assert second.tolist() == [False, True, False]
+    assert len(seen) == 3
+
+    # new hashes are merged into the sorted set, before, between and after the known ones
+    seen.add_new(np.array([9, 0, 4, 2, 5], dtype=np.uint64))
+    assert seen.hashes.tolist() == [0, 1, 2, 3, 4, 5, 9]
+
+
+def test_validate_and_clean_data_chunked_matches_in_memory(tmp_path):
+    """
+    Test that chunked validation keeps the same rows as validating the whole file,
+    including duplicates that fall in different chunks and integer/float chunks.
+    """
+    raw = pd.read_csv("data/raw/wine_quality.csv").head(40)
+    raw.loc[3, "alcohol"] = 99.0  # out of range
+    raw.loc[5, "color"] = "rose"  # not an allowed color
+    raw = pd.concat([raw, raw.iloc[[0, 10, 10]]], ignore_index=True)  # duplicates in a later chunk
+    raw.loc[len(raw)] = np.nan  # empty row, makes its chunk parse quality as float
+    input_file = tmp_path / "raw.csv"
+    raw.to_csv(input_file, index=False)
+
+    output_file = tmp_path / "cleaned.csv"
+    counts = validate_and_clean_data_chunked(input_file, define_schema(), output_file, chunksize=7)
+
+    expected = validate_and_clean_data(pd.read_csv(input_file), define_schema()).reset_index(drop=True)
+    result = pd.read_csv(output_file)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert counts["rows_read"] == len(raw)
+    assert counts["rows_written"] == len(expected)
+    assert counts["invalid_rows"] + counts["duplicate_rows"] == len(raw) - len(expected)
+
+    numpy_file = tmp_path / "cleaned_numpy.csv"
+    validate_and_clean_data_chunked(input_file, define_schema(), numpy_file, chunksize=7, engine="numpy")
+    pd.testing.assert_frame_equal(pd.read_csv(numpy_file), result)
+
+    with pytest.raises(ValueError):
+        validate_and_clean_data_chunked(input_file, define_schema(), output_file, chunksize=0)
+
+
+def test_row_hash_set_save_and_load(tmp_path):
+    """
+    Test that a saved RowHashSet loads back with the same hashes.
+    """
+    seen = RowHashSet(np.array([5, 1, 3], dtype=np.uint64))
+    seen.save(tmp_path / "hashes.npy")
+    loaded = RowHashSet.load(tmp_path / "hashes.npy")
+    assert loaded.hashes.tolist() == [1, 3, 5]
+    assert loaded.add_new(np.array([3, 4], dtype=np.uint64)).tolist() == [False, True]
+
+
+def test_validate_and_clean_data_incremental_matches_full_run(tmp_path):
+    """
+    Test that validating a growing file run by run only reads the new rows, drops rows
+    duplicating earlier runs, and ends with the same output as validating the whole file.
+    """
+    raw = pd.read_csv("data/raw/wine_quality.csv").head(60)
+    raw.loc[3, "alcohol"] = 99.0  # out of range
+    raw = pd.concat([raw, raw.iloc[[0, 10]]], ignore_index=True)  # duplicates of earlier runs
+    lines = raw.to_csv(index=False).encode().splitlines(keepends=True)
+    input_file = tmp_path / "raw.csv"
+    output_file = tmp_path / "cleaned.csv"
+
+    runs = []
+    for end in [21, 41, 41, len(lines)]:
+        input_file.write_bytes(b"".join(lines[:end]))
+        runs.append(validate_and_clean_data_incremental(input_file, define_schema(), output_file, chunksize=7))
+    assert [run["mode"] for run in runs] == ["full", "incremental", "incremental", "incremental"]
+    assert [run["rows_read"] for run in runs] == [20, 20, 0, len(raw) - 40]
+    assert runs[0]["invalid_rows"] == 1 and runs[-1]["duplicate_rows"] >= 2
+    assert runs[-1]["bytes_read"] == len(b"".join(lines[41:]))
+
+    expected_file = tmp_path / "expected.csv"
+    validate_and_clean_data_chunked(input_file, define_schema(), expected_file, chunksize=7)
+    assert output_file.read_bytes() == expected_file.read_bytes()
+    assert runs[-1]["total_rows"] == len(pd.read_csv(output_file))
+
+
+def test_validate_and_clean_data_incremental_recovers(tmp_path):
+    """
+    Test that a half-written last line waits for the next run, rows appended by an
+    interrupted run are dropped, and a replaced input is validated again from the start.
+    """
+    lines = pd.read_csv("data/raw/wine_quality.csv").head(30).to_csv(index=False).encode().splitlines(keepends=True)
+    input_file = tmp_path / "raw.csv"
+    output_file = tmp_path / "cleaned.csv"
+    state_dir = tmp_path / "state"
+    run = lambda: validate_and_clean_data_incremental(input_file, define_schema(), output_file,
+                                                      state_dir=str(state_dir), engine="numpy")
+
+    input_file.write_bytes(b"".join(lines[:11]) + lines[11][:8])
+    assert run()["rows_read"] == 10
+    cleaned = output_file.read_bytes()
+
+    with open(output_file, "ab") as out:
+        out.write(b"written by an interrupted run\n")
+    input_file.write_bytes(b"".join(lines[:12]))
+    assert run()["rows_read"] == 1
+    assert output_file.read_bytes() == cleaned + lines[11]
+    assert sorted(os.listdir(state_dir)) == ["row_hashes.2.npy", "watermark.json"]
+
+    input_file.write_bytes(b"".join(lines[:1] + lines[20:]))
+    counts = run()
+    assert counts["mode"] == "full" and counts["rows_read"] == 11
+    expected_file = tmp_path / "expected.csv"
+    validate_and_clean_data_chunked(input_file, define_schema(), expected_file, chunksize=100, engine="numpy")
+    assert output_file.read_bytes() == expected_file.read_bytes()
+
+
+def test_row_hashes_ignore_int_float_parsing():
+    """
+    Test that a row hashes the same whether its numbers were parsed as int or float.
+    """
+    as_int = pd.DataFrame({"quality": [5, 6], "color": ["red", "white"]})
+    as_float = as_int.astype({"quality": "float64"})
+    assert (row_hashes(as_int) == row_hashes(as_float)).all()
+
+
+def test_compiled_schema_matches_pandera():
+    """
+    Test that the compiled NumPy validator keeps the same rows as Pandera
+    and counts each broken rule.
+    """
+    raw = pd.read_csv("data/raw/wine_quality.csv")
+    raw.loc[0, "color"] = None
+    raw.loc[1, "pH"] = np.nan  # nullable, so kept
+    raw.loc[2, "pH"] = -1.0
+
+    cleaned, failures = CompiledSchema(define_schema()).validate(raw)
+    expected = validate_and_clean_data(raw, define_schema())
+
+    pd.testing.assert_frame_equal(cleaned, expected)
+    pd.testing.assert_frame_equal(validate_and_clean_data(raw, define_schema(), engine="numpy"), expected)
+    assert failures["color:not_nullable"] == 1
+    assert failures["pH:in_range"] == 1
+    keep, _ = CompiledSchema(define_schema()).check(raw)
+    assert failures["duplicates"] == keep.sum() - len(expected)
+
+    with pytest.raises(ValueError):
+        validate_and_clean_data(raw, define_schema(), engine="spark")
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 import pandas as pd
 import altair as alt
@@ -10,7 +11,9 @@ from src.eda_utils import (
     create_sulfur_dioxide_scatter,
     create_correlation_matrix,
     create_boxplots_by_color,
-    create_quality_distribution_bar
+    create_quality_distribution_bar,
+    regression_line,
+    regression_statistics
 )
 
 @pytest.fixture
@@ -82,4 +85,71 @@ def test_create_quality_distribution_bar(sample_wine_df):
     
     with pytest.raises(ValueError):
         bad_df = sample_wine_df.drop('quality', axis=1)
-        create_quality_distribution_bar(bad_df)
\ No newline at end of file
+        create_quality_distribution_bar(bad_df)
+
+
+def spec_size(chart):
+    """Returns the length of a chart's compact Vega-Lite spec with its data inlined."""
+    with alt.data_transformers.enable('default', max_rows=None):
+        return len(chart.to_json(indent=None))
+
+@pytest.mark.parametrize('create_plot, limit', [
+    (create_quality_distribution_plot, 1_000_000),
+    (create_correlation_matrix, 50_000),
+    (create_boxplots_by_color, 150_000),
+])
+def test_chart_specs_do_not_grow_with_rows(create_plot, limit):
+    """Tests the aggregated charts stay under a spec size limit and do not grow with the number of rows."""
+    train_df = pd.read_csv('data/processed/training_set.csv')
+    larger_df = pd.concat([train_df] * 10, ignore_index=True)
+    small, large = spec_size(create_plot(train_df)), spec_size(create_plot(larger_df))
+    assert small < limit and large < limit
+    assert large < 1.2 * small
+
+def test_sulfur_dioxide_density(sample_wine_df):
+    """Tests the density mode bins the rows into a heatmap whose size does not depend on the row count."""
+    train_df = pd.read_csv('data/processed/training_set.csv')
+    plot = create_sulfur_dioxide_scatter(train_df, mode='density', bins=30)
+    assert isinstance(plot, alt.LayerChart)
+    heatmap, line = plot.layer
+    assert heatmap.data['count'].sum() == len(train_df) and len(heatmap.data) <= 30 * 30
+    larger = create_sulfur_dioxide_scatter(pd.concat([train_df] * 10, ignore_index=True), mode='density', bins=30)
+    assert spec_size(larger) < 1.05 * spec_size(plot)
+
+    slope, intercept = np.polyfit(train_df['free_sulfur_dioxide'], train_df['total_sulfur_dioxide'], 1)
+    assert line.data['total_sulfur_dioxide'].tolist() == pytest.approx(
+        (intercept + slope * line.data['free_sulfur_dioxide']).tolist())
+
+    with pytest.raises(KeyError):
+        create_sulfur_dioxide_scatter(sample_wine_df.drop(columns='free_sulfur_dioxide'), mode='density')
+    with pytest.raises(ValueError):
+        create_sulfur_dioxide_scatter(sample_wine_df, mode='hexbin')
+
+def test_regression_statistics_over_chunks():
+    """Tests the line fitted from statistics accumulated in chunks matches a direct fit."""
+    rng = np.random.default_rng(0)
+    x = rng.normal(1e6, 3, 1000)
+    y = 2.5 * x + rng.normal(0, 1, 1000)
+    statistics = regression_statistics(x[:300], y[:300], chunksize=64)
+    statistics = regression_statistics(x[300:], y[300:], chunksize=100, statistics=statistics)
+    assert statistics['n'] == 1000
+    assert regression_line(statistics) == pytest.approx(tuple(np.polyfit(x, y, 1)))
+
+def test_boxplot_summaries(sample_wine_df):
+    """Tests box plots hold quartiles and whiskers per feature and color rather than the rows."""
+    plot = create_boxplots_by_color(sample_wine_df)
+    data = plot.data.dropna(subset=['q1']).set_index(['feature', 'color'])
+    red = sample_wine_df[sample_wine_df['color'] == 'red']['fixed_acidity']
+    assert data.loc[('fixed_acidity', 'red'), 'median'] == red.median()
+    assert data.loc[('fixed_acidity', 'red'), 'q1'] == red.quantile(0.25)
+    assert 'quality' not in data.index.get_level_values('feature')
+
+def test_quality_distribution_densities(sample_wine_df):
+    """Tests each feature's density integrates to about one for every quality group."""
+    train_df = pd.read_csv('data/processed/training_set.csv')
+    data = create_quality_distribution_plot(train_df).data
+    assert data['density'].notna().all()
+    for (feature, quality), group in data.groupby(['feature', 'quality']):
+        if feature != 'quality' and (train_df['quality'] == quality).sum() > 20:
+            area = np.trapz(group['density'], group['value'])
+            assert 0.8 < area < 1.05
@@ -1,14 +1,17 @@
 import pandas as pd
+import joblib, joblib._parallel_backends
 import pytest, sklearn
 import scipy.stats as stats
 from sklearn.pipeline import make_pipeline
 from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import FunctionTransformer, StandardScaler
 from sklearn.model_selection import RandomizedSearchCV
 
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.find_best_model import find_best_model
+from src.find_best_model import find_best_model, search_summary, search_timings
+from src.fold_search import FoldTransformCache, RegularizationPathSearchCV
 
 # create sample training data
 train_df = pd.read_csv('data/processed/training_set.csv').drop(columns='color')[:10]
@@ -87,4 +90,111 @@ def test_find_best_model_success():
     """Tests successfully tuned pipeline has approximately the same C produced through RandomizedSearchCV using the same random seed."""
     tuned_model = find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 50, 'accuracy', 42)
     assert isinstance(tuned_model, sklearn.model_selection.RandomizedSearchCV)
-    assert tuned_model.best_params_['logisticregression__C'] == sample_best_C(sample_pipeline(), stats.uniform(0.001, 100), 3, 50, 'accuracy', 42)
\ No newline at end of file
+    assert tuned_model.best_params_['logisticregression__C'] == sample_best_C(sample_pipeline(), stats.uniform(0.001, 100), 3, 50, 'accuracy', 42)
+
+def test_n_jobs_incorrect_type():
+    """Raises error when n_jobs is not an integer or None."""
+    with pytest.raises(TypeError):
+        find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 50, 'accuracy', 42, n_jobs='2')
+
+def test_backend_incorrect_value():
+    """Raises error when backend is not a supported joblib backend."""
+    with pytest.raises(ValueError):
+        find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 50, 'accuracy', 42, backend='dask')
+
+def test_find_best_model_parallel_timings():
+    """Tests parallel search picks the same C as the serial search and reports per-candidate timings."""
+    tuned_model = find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 10, 'accuracy', 42,
+                                  n_jobs=2, backend='threading')
+    assert tuned_model.best_params_['logisticregression__C'] == sample_best_C(sample_pipeline(), stats.uniform(0.001, 100), 3, 10, 'accuracy', 42)
+    assert tuned_model.search_time_ > 0
+
+    timings = search_timings(tuned_model)
+    assert len(timings) == 10
+    assert timings['C'].is_monotonic_increasing
+    assert (timings['total_fit_time'] >= timings['mean_fit_time']).all()
+
+def test_find_best_model_serial_by_default(monkeypatch):
+    """Tests n_jobs=None runs every fit in this process, whatever the number of cores."""
+    monkeypatch.setattr(joblib._parallel_backends, 'cpu_count', lambda *args, **kwargs: 4)
+    recorded = []
+    def record_n_jobs(X):
+        recorded.append(joblib.effective_n_jobs(None))
+        return X
+    model = make_pipeline(FunctionTransformer(record_n_jobs), LogisticRegression(max_iter=2000))
+    find_best_model(X_train, y_train, model, stats.uniform(0.001, 100), 3, 2, 'accuracy', 42)
+    assert recorded and set(recorded) == {1}
+
+def test_search_incorrect_value():
+    """Raises error when search is not a supported search mode."""
+    with pytest.raises(ValueError):
+        find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 50, 'accuracy', 42, search='grid')
+
+def test_find_best_model_halving():
+    """Tests successive halving returns a fitted search whose last round uses the full training set."""
+    halving_df = pd.read_csv('data/processed/training_set.csv').drop(columns='color')[:600]
+    X_halving, y_halving = (halving_df.drop(columns='quality'), halving_df['quality'])
+
+    tuned_model = find_best_model(X_halving, y_halving, sample_pipeline(), stats.uniform(0.001, 100), 3, 9, 'accuracy', 42,
+                                  search='halving')
+    assert isinstance(tuned_model, sklearn.model_selection.HalvingRandomSearchCV)
+    assert tuned_model.n_resources_[-1] > 0.9 * len(X_halving)
+    assert len(tuned_model.predict(X_halving)) == len(X_halving)
+
+    summary = search_summary(tuned_model)
+    assert summary['n_fits'] == sum(tuned_model.n_candidates_) * 3
+    assert summary['full_search_fits'] == 9 * 3
+    assert summary['time_saved'] == pytest.approx(summary['full_search_time'] - summary['search_time'])
+    assert {'iter', 'n_resources'} <= set(search_timings(tuned_model).columns)
+
+def test_find_best_model_path():
+    """Tests path search evaluates the same candidates as the random search and reports its score curve."""
+    tuned_model = find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 10, 'accuracy', 42,
+                                  search='path')
+    random_search = find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 10, 'accuracy', 42)
+    assert isinstance(tuned_model, RegularizationPathSearchCV)
+    assert sorted(tuned_model.score_curve()['C']) == sorted(random_search.cv_results_['param_logisticregression__C'])
+    assert len(search_timings(tuned_model)) == 10
+
+def test_find_best_model_shared_folds(tmp_path):
+    """Tests the path search runs on memory-mapped folds and other searches reject them."""
+    tuned_model = find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 10, 'accuracy', 42,
+                                  search='path', shared_folds=True)
+    in_memory = find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 10, 'accuracy', 42,
+                                search='path')
+    assert tuned_model.fold_dir is None
+    assert tuned_model.best_params_ == in_memory.best_params_
+
+    kept = find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 10, 'accuracy', 42,
+                           search='path', shared_folds=str(tmp_path))
+    assert kept.fold_dir == str(tmp_path)
+    assert 'fold_0.npy' in os.listdir(tmp_path)
+
+    with pytest.raises(ValueError):
+        find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 10, 'accuracy', 42,
+                        shared_folds=True)
+
+def test_preprocessing_cache_incorrect_type():
+    """Raises error when preprocessing_cache is not a FoldTransformCache."""
+    with pytest.raises(TypeError):
+        find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 50, 'accuracy', 42,
+                        preprocessing_cache='memory')
+
+def test_find_best_model_preprocessing_cache():
+    """Tests the preprocessing cache is used during the search but not kept in the fitted model."""
+    cache = FoldTransformCache()
+    tuned_model = find_best_model(X_train, y_train, make_pipeline(StandardScaler(), LogisticRegression(max_iter=2000)),
+                                  stats.uniform(0.001, 100), 3, 5, 'accuracy', 42, backend='threading',
+                                  preprocessing_cache=cache)
+    assert cache.misses == 3 + 1
+    assert cache.hits == 3 * 5 - 3
+    assert tuned_model.best_estimator_.memory is None
+
+def test_preprocessing_cache_incorrect_use():
+    """Raises error when an in-memory cache would be copied to worker processes or is used with the path search."""
+    with pytest.raises(ValueError):
+        find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 5, 'accuracy', 42,
+                        n_jobs=2, preprocessing_cache=FoldTransformCache())
+    with pytest.raises(ValueError):
+        find_best_model(X_train, y_train, sample_pipeline(), stats.uniform(0.001, 100), 3, 5, 'accuracy', 42,
+                        search='path', backend='threading', preprocessing_cache=FoldTransformCache())
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import make_column_transformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.base import clone
+from sklearn.model_selection import GridSearchCV
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.fold_search import (FoldTransformCache, RegularizationPathSearchCV, memmap_folds, preprocess_folds,
+                             split_pipeline)
+
+# create sample training data
+train_df = pd.read_csv('data/processed/training_set.csv')[:300]
+X_train, y_train = (train_df.drop(columns='quality'), train_df['quality'])
+Cs = [10.0, 0.01, 1.0, 0.1]
+
+def sample_pipeline():
+    """Creates a sample pipeline with the analysis preprocessing and Logistic Regression for testing
+    
+    Returns
+    -------
+    sklearn.pipeline.Pipeline
+        Sample pipeline containing a column transformer and Logistic Regression
+    """
+    preprocessor = make_column_transformer(
+        (OneHotEncoder(drop='if_binary'), ['color']),
+        (StandardScaler(), X_train.columns.drop('color').tolist())
+    )
+    return make_pipeline(preprocessor, LogisticRegression(multi_class='multinomial', solver='lbfgs', max_iter=2000))
+
+def test_split_pipeline():
+    """Tests the final estimator is split from the preprocessing steps."""
+    preprocessor, name, estimator = split_pipeline(sample_pipeline())
+    assert name == 'logisticregression'
+    assert isinstance(estimator, LogisticRegression)
+    assert len(preprocessor.steps) == 1
+
+    preprocessor, _, _ = split_pipeline(make_pipeline(LogisticRegression()))
+    assert preprocessor is None
+
+def test_preprocess_folds():
+    """Tests each fold is transformed with preprocessing fitted on its own training part."""
+    folds = preprocess_folds(sample_pipeline(), X_train, y_train, 3)
+    assert len(folds) == 3
+    for X_fold_train, y_fold_train, X_fold_test, y_fold_test in folds:
+        assert X_fold_train.shape == (len(y_fold_train), X_train.shape[1])
+        assert X_fold_test.shape == (len(y_fold_test), X_train.shape[1])
+        assert np.allclose(X_fold_train[:, 1:].mean(axis=0), 0)
+
+def test_memmap_folds(tmp_path):
+    """Tests the memory-mapped folds hold the same rows as the in-memory ones, in read-only files."""
+    folds = memmap_folds(sample_pipeline(), X_train, y_train, 3, str(tmp_path))
+    for fold, expected in zip(folds, preprocess_folds(sample_pipeline(), X_train, y_train, 3)):
+        for array, expected_array in zip(fold, expected):
+            assert isinstance(array, np.memmap) and not array.flags.writeable
+            assert array.flags['C_CONTIGUOUS']
+            assert np.array_equal(array, np.asarray(expected_array))
+    assert sorted(os.listdir(tmp_path)) == ['fold_0.npy', 'fold_0_y.npy', 'fold_1.npy', 'fold_1_y.npy',
+                                            'fold_2.npy', 'fold_2_y.npy']
+
+def test_path_search_with_memmap_folds(tmp_path):
+    """Tests workers fitting on memory-mapped folds score the same as on in-memory folds."""
+    shared = RegularizationPathSearchCV(sample_pipeline(), Cs, cv=3, scoring='accuracy', n_jobs=2,
+                                        fold_dir=str(tmp_path)).fit(X_train, y_train)
+    in_memory = RegularizationPathSearchCV(sample_pipeline(), Cs, cv=3, scoring='accuracy').fit(X_train, y_train)
+    assert np.allclose(shared.cv_results_['mean_test_score'], in_memory.cv_results_['mean_test_score'])
+    assert shared.best_params_ == in_memory.best_params_
+    assert sorted(os.listdir(tmp_path)) == ['fold_0.npy', 'fold_0_y.npy', 'fold_1.npy', 'fold_1_y.npy',
+                                            'fold_2.npy', 'fold_2_y.npy']
+
+def test_path_search_matches_cold_fits():
+    """Tests warm-started path scores agree with fitting every C from scratch."""
+    path_search = RegularizationPathSearchCV(sample_pipeline(), Cs, cv=3, scoring='accuracy').fit(X_train, y_train)
+    grid_search = GridSearchCV(sample_pipeline(), {'logisticregression__C': Cs}, cv=3, scoring='accuracy').fit(X_train, y_train)
+
+    assert np.allclose(path_search.cv_results_['mean_test_score'], grid_search.cv_results_['mean_test_score'], atol=0.01)
+    assert path_search.best_params_ == grid_search.best_params_
+    assert path_search.n_splits_ == 3
+
+    curve = path_search.score_curve()
+    assert curve['C'].tolist() == sorted(Cs)
+    assert (path_search.predict(X_train) == path_search.best_estimator_.predict(X_train)).all()
+    assert path_search.score(X_train, y_train) == pytest.approx(path_search.best_estimator_.score(X_train, y_train))
+
+@pytest.mark.parametrize('on_disk', [False, True])
+def test_fold_transform_cache(tmp_path, on_disk):
+    """Tests each fold is preprocessed once per search and the results match an uncached search."""
+    cache = FoldTransformCache(str(tmp_path) if on_disk else None)
+    cached_model = clone(sample_pipeline()).set_params(memory=cache)
+
+    cached_search = GridSearchCV(cached_model, {'logisticregression__C': Cs}, cv=3, scoring='accuracy').fit(X_train, y_train)
+    plain_search = GridSearchCV(sample_pipeline(), {'logisticregression__C': Cs}, cv=3, scoring='accuracy').fit(X_train, y_train)
+
+    # one miss per fold plus the refit on the full training set, every other fit is a hit
+    assert cache.misses == 3 + 1
+    assert cache.hits == 3 * len(Cs) - 3
+    assert np.allclose(cached_search.cv_results_['mean_test_score'], plain_search.cv_results_['mean_test_score'])
+    if on_disk:
+        assert len([f for f in os.listdir(tmp_path) if f.endswith('.pkl')]) == 4
+
+    assert len(cache) == 4
+
+    cache.clear()
+    assert (cache.hits, cache.misses, len(cache)) == (0, 0, 0)
+
+def test_fold_transform_cache_keys_on_bound_data():
+    """Tests folds are keyed on their row labels within the bound training set, not on other data with the same labels."""
+    cache = FoldTransformCache().bind(X_train, y_train)
+    cached_model = clone(sample_pipeline()).set_params(memory=cache)
+    cached_model.fit(X_train, y_train)
+    cached_model.fit(X_train, y_train)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    shifted = X_train.assign(alcohol=X_train['alcohol'] + 1)
+    cache.bind(shifted, y_train)
+    cached_model.fit(shifted, y_train)
+    assert cache.misses == 2
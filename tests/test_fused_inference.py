@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import make_column_transformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.find_best_model import find_best_model
+from src.fused_inference import FusedModel, compile_model
+from src.model_artifact import export_artifact, load_artifact
+
+# tune the analysis pipeline on the training set and compare predictions on the test set
+train_df = pd.read_csv('data/processed/training_set.csv')
+test_df = pd.read_csv('data/processed/test_set.csv')
+X_train, y_train = (train_df.drop(columns='quality'), train_df['quality'])
+X_test = test_df.drop(columns='quality')
+numeric_features = X_train.columns.drop('color').tolist()
+model = make_pipeline(
+    make_column_transformer(
+        (OneHotEncoder(drop='if_binary'), ['color']),
+        (StandardScaler(), numeric_features)
+    ),
+    LogisticRegression(multi_class='multinomial', solver='lbfgs', max_iter=2000)
+)
+random_search = find_best_model(X_train, y_train, model, np.array([0.1, 1.0, 10.0]), 2, 3, 'accuracy', seed=522)
+
+def test_fused_model_parity():
+    """Tests the fused engine matches random_search on the test set given as a plain NumPy array."""
+    fused = compile_model(random_search)
+    assert isinstance(fused, FusedModel)
+    X = X_test[list(fused.feature_names_in_)].to_numpy()
+    assert np.array_equal(fused.predict(X), random_search.predict(X_test))
+    assert fused.predict_proba(X) == pytest.approx(random_search.predict_proba(X_test), abs=1e-12)
+    assert fused.predict(X[0]) == random_search.predict(X_test[:1])
+
+def test_fused_model_score_arrays():
+    """Tests scoring pre-split numeric and color arrays gives the same logits as the object array."""
+    fused = compile_model(random_search)
+    X = X_test[list(fused.feature_names_in_)].to_numpy()
+    logits = fused.score_arrays(X_test[numeric_features].to_numpy(), X_test['color'].to_numpy(dtype=str))
+    assert logits == pytest.approx(fused.decision_function(X))
+    assert np.array_equal(fused.classes_from_logits(logits), fused.predict(X))
+
+def test_fused_model_from_artifact(tmp_path):
+    """Tests compiling a loaded artifact gives the same engine as compiling the search."""
+    path = str(tmp_path / 'model.npz')
+    export_artifact(random_search, path)
+    X = X_test[list(random_search.feature_names_in_)].to_numpy()
+    assert compile_model(load_artifact(path)).predict_proba(X) == pytest.approx(
+        compile_model(random_search).predict_proba(X))
+
+def test_fused_model_errors():
+    """Tests unknown categories and wrong column counts raise ValueError."""
+    fused = compile_model(random_search)
+    X = X_test[list(fused.feature_names_in_)].to_numpy()
+    X_unknown = X[:3].copy()
+    X_unknown[:, list(fused.feature_names_in_).index('color')] = 'rose'
+    with pytest.raises(ValueError, match='unknown categories'):
+        fused.predict(X_unknown)
+    with pytest.raises(ValueError, match='columns'):
+        fused.predict(X[:, :-1])
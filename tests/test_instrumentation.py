@@ -0,0 +1,80 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.instrumentation import (SCRIPT_ENV, SPANS_PATH_ENV, TRACE_MEMORY_ENV, configure, instrumented,
+                                 read_spans, span, summarize_spans)
+
+@pytest.fixture
+def spans_path(tmp_path, monkeypatch):
+    """Turns span recording on for a test and restores the environment afterwards."""
+    for name in (SPANS_PATH_ENV, TRACE_MEMORY_ENV, SCRIPT_ENV):
+        monkeypatch.delenv(name, raising=False)
+    path = str(tmp_path / 'spans' / 'spans.jsonl')
+    configure(path, script='test')
+    return path
+
+def test_spans_record_time_and_nesting(spans_path):
+    """Tests nested spans are written with their parent, times, memory and attributes."""
+    with span('outer', rows=3) as attrs:
+        with span('inner'):
+            sum(range(100_000))
+        attrs['kept'] = 2
+    spans = read_spans(spans_path)
+    assert spans['span'].tolist() == ['inner', 'outer']
+    inner, outer = spans.iloc[0], spans.iloc[1]
+    assert inner['parent'] == 'outer' and outer['parent'] is None
+    assert outer['rows'] == 3 and outer['kept'] == 2 and outer['script'] == 'test'
+    assert 0 < inner['wall_s'] <= outer['wall_s']
+    assert outer['cpu_s'] > 0 and outer['peak_rss_mb'] > 0 and outer['rss_growth_mb'] >= 0
+    assert 'traced_peak_mb' not in spans.columns
+
+def test_failed_spans_are_recorded(spans_path):
+    """Tests a span is written with the exception's type when its block raises."""
+    @instrumented('divide')
+    def divide(a, b):
+        return a / b
+
+    assert divide(1, 2) == 0.5
+    with pytest.raises(ZeroDivisionError):
+        divide(1, 0)
+    assert read_spans(spans_path)['error'].tolist() == [None, 'ZeroDivisionError']
+
+def test_traced_memory(spans_path):
+    """Tests traced peaks cover nested spans and the top allocation sites point at the allocating line."""
+    configure(spans_path, trace_memory=True)
+    with span('outer'):
+        with span('allocate'):
+            kept = np.empty(2**20)
+            np.empty(2**21).fill(1)
+        kept.fill(1)
+    spans = read_spans(spans_path).set_index('span')
+    assert spans.loc['allocate', 'traced_peak_mb'] >= 24
+    assert spans.loc['outer', 'traced_peak_mb'] >= spans.loc['allocate', 'traced_peak_mb']
+    top = spans.loc['allocate', 'top_allocations'][0]
+    assert top['location'].startswith(__file__) and top['size_mb'] == pytest.approx(8, abs=0.1)
+
+def test_spans_are_not_recorded_unless_configured(spans_path):
+    """Tests spans do nothing once recording is turned off."""
+    configure(None)
+    assert SPANS_PATH_ENV not in os.environ
+    with span('ignored') as attrs:
+        attrs['rows'] = 1
+    assert not os.path.exists(spans_path)
+
+def test_summarize_spans(spans_path):
+    """Tests the summary ranks single spans and totals spans of the same name."""
+    for seconds in [0.0, 0.02, 0.01]:
+        with span('sleep'):
+            import time
+            time.sleep(seconds)
+    with span('other'):
+        pass
+    slowest, totals = summarize_spans(spans_path, top=2)
+    assert slowest['span'].tolist() == ['sleep', 'sleep']
+    assert slowest['wall_s'].iloc[0] >= 0.02
+    assert totals.iloc[0]['span'] == 'sleep' and totals.iloc[0]['count'] == 3
+    with pytest.raises(ValueError):
+        summarize_spans(spans_path, by='traced_peak_mb')
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.local_ingest import (MANIFEST_SUFFIX, color_from_filename, ingest_local_sources, normalize_column_name,
+                              output_columns)
+
+SOURCES = ['data/raw/winequality-red.csv', 'data/raw/winequality-white.csv']
+
+def test_normalize_column_name():
+    """Tests source column names map to the schema's style."""
+    assert normalize_column_name('"free sulfur dioxide"') == 'free_sulfur_dioxide'
+    assert normalize_column_name(' pH ') == 'ph'
+    assert color_from_filename('data/raw/winequality-red.csv') == 'red'
+    assert color_from_filename('wine_quality_white.csv') == 'white'
+    with pytest.raises(ValueError):
+        color_from_filename('wines.csv')
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_ingest_local_sources_matches_downloaded_data(tmp_path, max_workers):
+    """Tests merging the UCI red and white files gives the downloaded wine_quality.csv."""
+    output = str(tmp_path / 'wine_quality.csv')
+    counts = ingest_local_sources(SOURCES, output, max_workers=max_workers)
+    expected = pd.read_csv('data/raw/wine_quality.csv')
+    merged = pd.read_csv(output)
+    assert counts == {'skipped': False, 'sources': 2, 'rows': len(expected), 'seconds': counts['seconds']}
+    assert list(merged.columns) == list(expected.columns) == output_columns()
+    assert merged['color'].tolist() == expected['color'].tolist()
+    assert merged['quality'].tolist() == expected['quality'].tolist()
+    # The downloaded file rounds a few alcohol values to fewer digits
+    features = expected.columns.drop(['color', 'quality'])
+    np.testing.assert_allclose(merged[features], expected[features], rtol=1e-8)
+
+def test_ingest_local_sources_skips_unchanged_sources(tmp_path):
+    """Tests a second run does nothing until a source or the output changes, and column order is normalized."""
+    red = pd.read_csv(SOURCES[0], sep=';').head(5)
+    white = pd.read_csv(SOURCES[1], sep=';').head(3)
+    red_path, white_path = tmp_path / 'batch-red.csv', tmp_path / 'batch-white.csv'
+    red.to_csv(red_path, sep=';', index=False)
+    # Columns in another order and with other spellings
+    white = white[white.columns[::-1]].rename(columns={'pH': 'PH', 'fixed acidity': 'Fixed-Acidity'})
+    white.to_csv(white_path, sep=';', index=False)
+    output = str(tmp_path / 'merged.csv')
+
+    assert not ingest_local_sources([str(red_path), str(white_path)], output)['skipped']
+    first = open(output).read()
+    merged = pd.read_csv(output)
+    assert list(merged.columns) == output_columns()
+    assert merged['color'].tolist() == ['red'] * 5 + ['white'] * 3
+    assert os.path.exists(output + MANIFEST_SUFFIX)
+
+    counts = ingest_local_sources([str(red_path), str(white_path)], output)
+    assert counts['skipped'] and counts['rows'] == 8
+    assert not ingest_local_sources([str(red_path), str(white_path)], output, force=True)['skipped']
+    assert open(output).read() == first
+
+    with open(output, 'a') as f:
+        f.write('edited by hand\n')
+    assert not ingest_local_sources([str(red_path), str(white_path)], output)['skipped']
+    assert open(output).read() == first
+
+    red.head(2).to_csv(red_path, sep=';', index=False)
+    assert ingest_local_sources([str(red_path), str(white_path)], output)['rows'] == 5
+    assert not ingest_local_sources({str(red_path): 'white', str(white_path): 'white'}, output)['skipped']
+
+def test_ingest_local_sources_rejects_unknown_columns(tmp_path):
+    """Tests sources with columns outside the schema or without quality are rejected, leaving no output."""
+    source = tmp_path / 'extra-red.csv'
+    pd.read_csv(SOURCES[0], sep=';').head(2).assign(vintage=2009).to_csv(source, sep=';', index=False)
+    with pytest.raises(ValueError, match='vintage'):
+        ingest_local_sources([str(source)], str(tmp_path / 'out.csv'))
+    pd.read_csv(SOURCES[0], sep=';').head(2).drop(columns='quality').to_csv(source, sep=';', index=False)
+    with pytest.raises(KeyError, match='quality'):
+        ingest_local_sources([str(source)], str(tmp_path / 'out.csv'))
+    assert os.listdir(tmp_path) == ['extra-red.csv']
@@ -0,0 +1,86 @@
+import json
+import subprocess
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import make_column_transformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.model_artifact import ARTIFACT_FORMAT, CompactModel, check_parity, export_artifact, load_artifact
+
+# fit the analysis pipeline on the training set and compare on the test set
+train_df = pd.read_csv('data/processed/training_set.csv')
+test_df = pd.read_csv('data/processed/test_set.csv')
+X_train, y_train = (train_df.drop(columns='quality'), train_df['quality'])
+X_test = test_df.drop(columns='quality')
+numeric_features = X_train.columns.drop('color').tolist()
+model = make_pipeline(
+    make_column_transformer(
+        (OneHotEncoder(drop='if_binary'), ['color']),
+        (StandardScaler(), numeric_features)
+    ),
+    LogisticRegression(multi_class='multinomial', solver='lbfgs', max_iter=2000)
+).fit(X_train, y_train)
+
+def test_artifact_matches_pipeline(tmp_path):
+    """Tests the artifact predicts the same classes and probabilities as the pipeline it was exported from."""
+    path = str(tmp_path / 'model.npz')
+    export_artifact(model, path)
+    compact_model = load_artifact(path)
+    parity = check_parity(compact_model, model, X_test)
+    assert parity['prediction_mismatches'] == 0
+    assert parity['max_proba_diff'] < 1e-12
+    assert compact_model.transform(X_test) == pytest.approx(model[0].transform(X_test))
+    assert list(compact_model.feature_names_in_) == list(model.feature_names_in_)
+    assert list(compact_model.classes_) == list(model.classes_)
+
+def test_artifact_ovr_model(tmp_path):
+    """Tests one-vs-rest models are exported with their own probability normalization."""
+    ovr_model = make_pipeline(model[0], LogisticRegression(solver='liblinear')).fit(X_train, y_train)
+    path = str(tmp_path / 'ovr.npz')
+    export_artifact(ovr_model, path)
+    parity = check_parity(load_artifact(path), ovr_model, X_test)
+    assert parity['prediction_mismatches'] == 0
+    assert parity['max_proba_diff'] < 1e-12
+
+def test_artifact_unknown_category(tmp_path):
+    """Tests unknown categories raise like OneHotEncoder(handle_unknown='error')."""
+    path = str(tmp_path / 'model.npz')
+    export_artifact(model, path)
+    X_unknown = X_test[:5].assign(color='rose')
+    with pytest.raises(ValueError, match='unknown categories'):
+        load_artifact(path).predict(X_unknown)
+
+def test_artifact_format_check(tmp_path):
+    """Tests artifacts from a newer format are rejected and unsupported models are not exported."""
+    path = str(tmp_path / 'model.npz')
+    export_artifact(model, path)
+    with np.load(path) as artifact:
+        arrays = {key: artifact[key] for key in artifact.files}
+    metadata = json.loads(arrays['metadata'].item())
+    assert metadata['format'] == ARTIFACT_FORMAT
+    metadata['format'] = ARTIFACT_FORMAT + 1
+    arrays['metadata'] = np.array(json.dumps(metadata))
+    np.savez(path, **arrays)
+    with pytest.raises(ValueError, match='newer'):
+        load_artifact(path)
+
+    with pytest.raises(ValueError):
+        export_artifact(make_pipeline(StandardScaler(), StandardScaler(), LogisticRegression()), path)
+
+def test_artifact_loads_without_sklearn(tmp_path):
+    """Tests loading and predicting from an artifact does not import sklearn."""
+    path = str(tmp_path / 'model.npz')
+    export_artifact(model, path)
+    code = ("import sys; from src.model_artifact import load_artifact; import pandas as pd; "
+            f"m = load_artifact({path!r}); m.predict(pd.read_csv('data/processed/test_set.csv')); "
+            "print('sklearn' in sys.modules)")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.join(os.path.dirname(__file__), '..'))
+    assert result.stdout.strip() == 'False'
+    assert isinstance(load_artifact(path), CompactModel)
@@ -0,0 +1,139 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src import pipeline_runner
+from src.pipeline_runner import Stage, run_pipeline, source_files, stage_dependencies, stage_key, wine_pipeline
+
+# each stage copies its input to its output and appends a line to a run log, so reruns can be counted
+COPY = ("import sys, time; time.sleep(float(sys.argv[3])); "
+        "open(sys.argv[2], 'w').write(open(sys.argv[1]).read() + sys.argv[4]); "
+        "open('runs.log', 'a').write(sys.argv[4] + ' ' + str(time.time()) + '\\n')")
+
+def make_stages(sleep=0.0, suffix='b'):
+    """Builds a small diamond a -> (b, c) -> d of copy stages."""
+    copy = lambda name, source, target, tag: Stage(
+        name, [sys.executable, '-c', COPY, source, target, str(sleep), tag],
+        inputs=[source], outputs=[target], sources=[])
+    return [
+        copy('a', 'raw.txt', 'a.txt', 'a'),
+        copy('b', 'a.txt', 'b.txt', suffix),
+        copy('c', 'a.txt', 'c.txt', 'c'),
+        Stage('d', [sys.executable, '-c', "open('d.txt', 'w').write(open('b.txt').read() + open('c.txt').read())"],
+              inputs=['b.txt', 'c.txt'], outputs=['d.txt'], sources=[]),
+    ]
+
+def runs(root):
+    """Returns the tags of the copy stages that have run, in order."""
+    path = os.path.join(root, 'runs.log')
+    return [line.split()[0] for line in open(path)] if os.path.exists(path) else []
+
+def statuses(results):
+    return {name: result['status'] for name, result in results.items()}
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / 'raw.txt').write_text('wine')
+    return str(tmp_path)
+
+def test_stages_are_cached_by_content(root):
+    """Tests stages rerun only when the content of their inputs or their parameters change."""
+    log = lambda message: None
+    assert statuses(run_pipeline(make_stages(), root=root, log=log)) == dict.fromkeys('abcd', 'ran')
+    assert open(os.path.join(root, 'd.txt')).read() == 'wineabwineac'
+
+    # an unchanged rerun and a touched input are both skipped
+    os.utime(os.path.join(root, 'raw.txt'))
+    assert statuses(run_pipeline(make_stages(), root=root, log=log)) == dict.fromkeys('abcd', 'cached')
+    assert sorted(runs(root)) == ['a', 'b', 'c']
+
+    # a changed stage command reruns it and the stages downstream of it only
+    assert statuses(run_pipeline(make_stages(suffix='B'), root=root, log=log)) == \
+        {'a': 'cached', 'b': 'ran', 'c': 'cached', 'd': 'ran'}
+    assert open(os.path.join(root, 'd.txt')).read() == 'wineaBwineac'
+
+    # going back to the earlier command restores its outputs from the cache without running
+    assert statuses(run_pipeline(make_stages(), root=root, log=log)) == \
+        {'a': 'cached', 'b': 'cached', 'c': 'cached', 'd': 'cached'}
+    assert open(os.path.join(root, 'd.txt')).read() == 'wineabwineac'
+    assert sorted(runs(root)) == ['B', 'a', 'b', 'c']
+
+    # deleted outputs are restored, changed inputs rerun everything downstream
+    os.remove(os.path.join(root, 'c.txt'))
+    (open(os.path.join(root, 'raw.txt'), 'w')).write('grape')
+    assert statuses(run_pipeline(make_stages(), targets=['c'], root=root, log=log)) == \
+        {'a': 'ran', 'c': 'ran'}
+    assert open(os.path.join(root, 'c.txt')).read() == 'grapeac'
+
+def test_independent_stages_run_concurrently(root):
+    """Tests b and c, which only depend on a, run at the same time."""
+    run_pipeline(make_stages(sleep=0.5), root=root, max_workers=2, log=lambda message: None)
+    finished = {line.split()[0]: float(line.split()[1]) for line in open(os.path.join(root, 'runs.log'))}
+    assert abs(finished['b'] - finished['c']) < 0.4
+
+def test_failures_block_dependent_stages(root):
+    """Tests a failing stage blocks the stages depending on it but not the others."""
+    stages = make_stages()
+    stages[1] = Stage('b', [sys.executable, '-c', 'raise SystemExit(3)'], inputs=['a.txt'], outputs=['b.txt'],
+                      sources=[])
+    messages = []
+    results = run_pipeline(stages, root=root, log=messages.append)
+    assert statuses(results) == {'a': 'ran', 'b': 'failed', 'c': 'ran', 'd': 'blocked'}
+    assert any('Exited with code 3' in message for message in messages)
+
+def test_dry_run_force_and_adopt(root):
+    """Tests dry runs do not run anything, force reruns cached stages and adopt caches existing outputs."""
+    log = lambda message: None
+    assert statuses(run_pipeline(make_stages(), root=root, dry_run=True, log=log)) == dict.fromkeys('abcd', 'would_run')
+    assert runs(root) == []
+
+    (open(os.path.join(root, 'a.txt'), 'w')).write('adopted')
+    assert statuses(run_pipeline(make_stages(), targets=['a'], root=root, adopt=['a'], log=log)) == {'a': 'cached'}
+    assert runs(root) == []
+
+    run_pipeline(make_stages(), root=root, log=log)
+    assert statuses(run_pipeline(make_stages(), targets=['b'], root=root, force=['b'], log=log)) == \
+        {'a': 'cached', 'b': 'ran'}
+    assert sorted(runs(root)) == ['b', 'b', 'c']
+
+    with pytest.raises(ValueError):
+        run_pipeline(make_stages(), targets=['e'], root=root, log=log)
+
+def test_stage_dependencies():
+    """Tests the wine pipeline forms the expected DAG and bad graphs are rejected."""
+    dependencies = stage_dependencies(wine_pipeline())
+    assert dependencies['split'] == ['validate']
+    assert dependencies['eda'] == ['split'] and dependencies['model'] == ['split']
+    assert dependencies['report'] == ['eda', 'model']
+
+    cycle = [Stage('x', ['true'], inputs=['y.txt'], outputs=['x.txt']),
+             Stage('y', ['true'], inputs=['x.txt'], outputs=['y.txt'])]
+    with pytest.raises(ValueError, match='cycle'):
+        stage_dependencies(cycle)
+    with pytest.raises(ValueError, match='written by both'):
+        stage_dependencies([Stage('x', ['true'], [], ['x.txt']), Stage('y', ['true'], [], ['x.txt'])])
+
+def test_source_files():
+    """Tests a script's source includes the src modules it imports, directly and indirectly."""
+    root = os.path.join(os.path.dirname(__file__), '..')
+    sources = source_files('scripts/validate_raw_data.py', root)
+    assert sources == ['scripts/validate_raw_data.py', 'src/data_validation.py', 'src/file_utils.py',
+                       'src/instrumentation.py', 'src/read_data.py']
+
+def test_stage_key_ignores_interpreter_path_and_parallelism(tmp_path, monkeypatch):
+    """Tests the model stage keeps its key for another path to the same interpreter or another n_jobs."""
+    root = os.path.join(os.path.dirname(__file__), '..')
+    model = lambda **kwargs: {stage.name: stage for stage in wine_pipeline(**kwargs)}['model']
+    linked_python = tmp_path / 'python3'
+    linked_python.symlink_to(sys.executable)
+
+    key = stage_key(model(n_jobs=1), root)
+    assert stage_key(model(n_jobs=4, python=str(linked_python)), root) == key
+    assert stage_key(model(n_jobs=1, seed=1), root) != key
+
+    # other package versions change the key
+    versions = pipeline_runner.interpreter_versions(sys.executable)
+    monkeypatch.setattr(pipeline_runner, 'interpreter_versions',
+                        lambda python: {**versions, 'packages': {**versions['packages'], 'scikit-learn': '1.5.0'}})
+    assert stage_key(model(n_jobs=1), root) != key
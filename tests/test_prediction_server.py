@@ -0,0 +1,147 @@
+import asyncio
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.compose import make_column_transformer
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.prediction_server import MicroBatcher, PredictionServer, known_categories
+
+# create sample training data and a fitted model to serve
+train_df = pd.read_csv('data/processed/training_set.csv').drop(columns='color')[:200]
+X_train, y_train = (train_df.drop(columns='quality'), train_df['quality'])
+model = make_pipeline(StandardScaler(), LogisticRegression(max_iter=2000)).fit(X_train, y_train)
+rows = X_train.to_dict(orient='records')
+
+async def http_request(port, method, path, payload=None):
+    """Sends one HTTP request to the local server and returns the status code and decoded JSON body
+    
+    Returns
+    -------
+    tuple
+        Status code (int) and response body (dict)
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n'
+                 f'Connection: close\r\n\r\n'.encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(content)
+
+def test_micro_batcher_groups_concurrent_requests():
+    """Tests concurrent requests are scored in shared batches with the same results as predict."""
+    async def run():
+        batcher = MicroBatcher(model, max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        results = await asyncio.gather(*(batcher.predict([row]) for row in rows[:20]))
+        await batcher.stop()
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    predictions = [prediction[0] for prediction, _ in results]
+    assert predictions == model.predict(X_train[:20]).tolist()
+    assert np.allclose([proba[0] for _, proba in results], model.predict_proba(X_train[:20]))
+
+    stats = batcher.stats.snapshot()
+    assert stats['requests'] == 20 and stats['rows'] == 20
+    assert 3 <= stats['batches'] < 20
+    assert stats['latency_ms_max'] >= stats['latency_ms_p50'] > 0
+
+def test_micro_batcher_rejects_missing_columns():
+    """Tests rows without every training column are rejected before scoring."""
+    async def run():
+        batcher = MicroBatcher(model)
+        await batcher.start()
+        try:
+            await batcher.predict([{'pH': 3.2}])
+        finally:
+            await batcher.stop()
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+    with pytest.raises(ValueError):
+        MicroBatcher(model, max_batch_size=0)
+
+def test_micro_batcher_validates_rows():
+    """Tests rows are coerced to the model's columns and unknown colors or non-numbers are rejected."""
+    color_df = pd.read_csv('data/processed/training_set.csv')[:200]
+    X_color = color_df.drop(columns='quality')
+    color_model = make_pipeline(
+        make_column_transformer((OneHotEncoder(drop='if_binary'), ['color']),
+                                (StandardScaler(), X_color.columns.drop('color').tolist())),
+        LogisticRegression(max_iter=2000)
+    ).fit(X_color, color_df['quality'])
+    assert known_categories(color_model) == {'color': {'red', 'white'}}
+
+    batcher = MicroBatcher(color_model)
+    row = X_color.iloc[0].to_dict()
+    clean = batcher.validate([{**row, 'pH': '3.2', 'extra': 1}])[0]
+    assert clean['pH'] == 3.2 and 'extra' not in clean
+    for bad in [{'color': 'rose'}, {'color': 1}, {'pH': 'acidic'}, {'pH': None}, {'pH': True}, {'pH': float('nan')}]:
+        with pytest.raises(ValueError):
+            batcher.validate([{**row, **bad}])
+
+class FailingModel:
+    """Model that fails to score any batch containing a row with pH above 10."""
+    classes_ = model.classes_
+    feature_names_in_ = model.feature_names_in_
+
+    def predict_proba(self, X):
+        if (X['pH'] > 10).any():
+            raise ValueError('pH out of range')
+        return model.predict_proba(X)
+
+def test_bad_request_does_not_fail_its_batch():
+    """Tests a request sent with a bad one gets its predictions, and only the bad one gets the error."""
+    async def run():
+        server = PredictionServer(FailingModel(), port=0, max_wait_ms=50)
+        await server.start()
+        try:
+            return await asyncio.gather(
+                http_request(server.port, 'POST', '/predict', rows[0]),
+                http_request(server.port, 'POST', '/predict', {**rows[1], 'pH': 99.0}),
+                http_request(server.port, 'POST', '/predict', {**rows[2], 'pH': 'acidic'}),
+                http_request(server.port, 'POST', '/predict', rows[3]))
+        finally:
+            await server.stop()
+
+    good, failing, invalid, other_good = asyncio.run(run())
+    assert good[0] == 200 and good[1]['predictions'] == model.predict(X_train[:1]).tolist()
+    assert other_good[0] == 200 and other_good[1]['predictions'] == model.predict(X_train[3:4]).tolist()
+    assert failing[0] == 400 and 'pH out of range' in failing[1]['error']
+    assert invalid[0] == 400
+
+def test_prediction_server_endpoints():
+    """Tests the HTTP endpoints of the server on a free local port."""
+    async def run():
+        server = PredictionServer(model, port=0, max_wait_ms=1)
+        await server.start()
+        try:
+            return (await http_request(server.port, 'POST', '/predict', {'rows': rows[:3]}),
+                    await http_request(server.port, 'POST', '/predict', rows[0]),
+                    await http_request(server.port, 'POST', '/predict', {'rows': [{'pH': 3.0}]}),
+                    await http_request(server.port, 'GET', '/predict'),
+                    await http_request(server.port, 'GET', '/stats'),
+                    await http_request(server.port, 'GET', '/health'))
+        finally:
+            await server.stop()
+
+    batch, single, missing, wrong_method, stats, health = asyncio.run(run())
+    assert batch[0] == 200
+    assert batch[1]['predictions'] == model.predict(X_train[:3]).tolist()
+    assert batch[1]['classes'] == model.classes_.tolist()
+    assert single[0] == 200 and len(single[1]['probabilities']) == 1
+    assert missing[0] == 400
+    assert wrong_method[0] == 405
+    assert stats[0] == 200 and stats[1]['rows'] == 4
+    assert health == (200, {'status': 'ok'})
@@ -10,7 +10,9 @@ import os
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.read_data import read_data
+from src.data_validation import define_schema
+from src import read_data as read_data_module
+from src.read_data import read_data, schema_dtypes, write_csv_chunk
 
 import pandas as pd
 
@@ -46,4 +48,74 @@ def test_read_data_wrong_ext():
 
 def test_clean():
     os.remove(os.path.join(TEST_PATH, 'dummy.csv'))
-    os.removedirs(TEST_PATH)
\ No newline at end of file
+    os.removedirs(TEST_PATH)
+
+# Test that a cached read writes a Parquet copy and later reads skip the CSV parse
+def test_read_data_cache_hit(tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    csv_path = str(tmp_path / 'wine.csv')
+    expected = pd.DataFrame({'color': ['red', 'white'], 'quality': [5, 6], 'pH': [3.5, 3.2]})
+    expected.to_csv(csv_path, index=False)
+
+    pd.testing.assert_frame_equal(read_data(csv_path, cache=True), expected)
+    assert os.path.exists(csv_path + '.parquet')
+
+    def fail_read_csv(*args, **kwargs):
+        raise AssertionError('CSV was parsed despite a fresh cache')
+    monkeypatch.setattr(pd, 'read_csv', fail_read_csv)
+    pd.testing.assert_frame_equal(read_data(csv_path, cache=True), expected)
+
+    # Touching the file without changing its contents keeps the cache valid
+    os.utime(csv_path, ns=(0, 0))
+    pd.testing.assert_frame_equal(read_data(csv_path, cache=True), expected)
+
+# Test that changing the CSV invalidates its cache
+def test_read_data_cache_stale(tmp_path):
+    pytest.importorskip('pyarrow')
+    csv_path = str(tmp_path / 'wine.csv')
+    pd.DataFrame({'x': [1, 2]}).to_csv(csv_path, index=False)
+    read_data(csv_path, cache=True)
+
+    changed = pd.DataFrame({'x': [3, 4, 5]})
+    changed.to_csv(csv_path, index=False)
+    pd.testing.assert_frame_equal(read_data(csv_path, cache=True), changed)
+
+# Test that the cached path keeps the filename and missing-file errors
+def test_read_data_cache_errors(tmp_path):
+    with pytest.raises(ValueError):
+        read_data(str(tmp_path / 'dummy.txt'), cache=True)
+
+    with pytest.raises(FileNotFoundError):
+        read_data(str(tmp_path / 'missing' / 'dummy.csv'), cache=True)
+
+# Test that schema-typed loading pins dtypes, selects columns and downcasts floats
+@pytest.mark.parametrize('cache', [False, True])
+def test_read_data_typed(tmp_path, cache):
+    if cache:
+        pytest.importorskip('pyarrow')
+    csv_path = str(tmp_path / 'wine.csv')
+    pd.DataFrame({'pH': [3.5, 3.2], 'color': ['red', 'white'], 'quality': [5, 6]}).to_csv(csv_path, index=False)
+
+    typed = read_data(csv_path, cache=cache, schema=define_schema())
+    assert isinstance(typed['color'].dtype, pd.CategoricalDtype)
+    assert typed['quality'].dtype == 'float64'
+
+    small = read_data(csv_path, cache=cache, schema=define_schema(), usecols=['quality', 'pH'], float32=True)
+    assert list(small.columns) == ['quality', 'pH']
+    assert (small.dtypes == 'float32').all()
+
+def test_schema_dtypes():
+    dtypes = schema_dtypes(define_schema(), usecols=['color', 'alcohol'], float32=True)
+    assert dtypes == {'color': 'category', 'alcohol': 'float32'}
+
+# Test that chunks appended with either CSV writer read back as one file with a single header
+@pytest.mark.parametrize('csv_engine', ['pyarrow', 'c'])
+def test_write_csv_chunk(tmp_path, monkeypatch, csv_engine):
+    if csv_engine == 'pyarrow':
+        pytest.importorskip('pyarrow')
+    monkeypatch.setattr(read_data_module, 'CSV_ENGINE', csv_engine)
+    csv_path = str(tmp_path / 'chunks.csv')
+    with open(csv_path, 'wb') as out:
+        write_csv_chunk(dummy_data[:4], out)
+        write_csv_chunk(dummy_data[4:], out, header=False)
+    pd.testing.assert_frame_equal(read_data(csv_path), dummy_data)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.data_validation import CompiledSchema, define_schema
+from src.synthetic_data import fit_generator, write_synthetic_csv
+
+raw_df = pd.read_csv('data/raw/wine_quality.csv')
+generator = fit_generator(raw_df)
+# the rows the generator is fitted to: those passing the schema's column rules
+valid_df = raw_df[CompiledSchema(define_schema()).check(raw_df)[0]].dropna()
+
+def test_generated_rows_follow_the_data():
+    """Tests the synthetic rows keep the column layout, group shares, marginals and correlations of the valid data."""
+    chunks = list(generator.generate(200_000, chunksize=60_000, seed=522))
+    assert [len(chunk) for chunk in chunks] == [60_000, 60_000, 60_000, 20_000]
+    data = pd.concat(chunks, ignore_index=True)
+    assert list(data.columns) == list(raw_df.columns)
+    assert (data.dtypes == raw_df.dtypes).all()
+
+    shares = data.groupby(['color', 'quality']).size() / len(data)
+    expected = valid_df.groupby(['color', 'quality']).size() / len(valid_df)
+    assert shares.to_numpy() == pytest.approx(expected.to_numpy(), abs=0.003)
+
+    numeric = valid_df.select_dtypes('number').columns
+    assert (data[numeric].min() >= valid_df[numeric].min()).all()
+    assert (data[numeric].max() <= valid_df[numeric].max()).all()
+    assert data[numeric].median().to_numpy() == pytest.approx(valid_df[numeric].median().to_numpy(), rel=0.05)
+    for color in ['red', 'white']:
+        corr = data[data['color'] == color][numeric].corr('spearman')
+        expected_corr = valid_df[valid_df['color'] == color][numeric].corr('spearman')
+        assert np.abs(corr - expected_corr).max().max() < 0.1
+
+def test_generate_is_reproducible():
+    """Tests the same seed and chunk size give the same rows."""
+    first = pd.concat(generator.generate(1000, chunksize=300, seed=1))
+    assert first.equals(pd.concat(generator.generate(1000, chunksize=300, seed=1)))
+    assert not first.equals(pd.concat(generator.generate(1000, chunksize=300, seed=2)))
+
+def test_injected_problems_are_rejected():
+    """Tests out-of-range, duplicate and empty rows are injected at about the requested rates."""
+    data = pd.concat(generator.generate(50_000, chunksize=20_000, seed=522, out_of_range_rate=0.02,
+                                        duplicate_rate=0.03, empty_rate=0.01), ignore_index=True)
+    clean = pd.concat(generator.generate(50_000, chunksize=20_000, seed=522), ignore_index=True)
+    _, failures = CompiledSchema(define_schema()).validate(data)
+    _, clean_failures = CompiledSchema(define_schema()).validate(clean)
+    assert sum(clean_failures.values()) == 0
+    out_of_range = sum(failures[f'{col}:in_range'] for col in generator.feature_columns)
+    assert 0.015 < out_of_range / len(data) < 0.025
+    assert 0.025 < failures['duplicates'] / len(data) < 0.035
+    assert data.isna().all(axis=1).mean() == pytest.approx(0.01, abs=0.002)
+
+    with pytest.raises(ValueError):
+        next(generator.generate(10, duplicate_rate=0.6, empty_rate=0.6))
+
+def test_write_synthetic_csv(tmp_path):
+    """Tests the rows are streamed to a CSV that reads back with the data's columns."""
+    output_path = str(tmp_path / 'synthetic.csv')
+    counts = write_synthetic_csv(generator, output_path, 2500, chunksize=1000, seed=3)
+    data = pd.read_csv(output_path)
+    assert counts['rows'] == len(data) == 2500
+    assert list(data.columns) == list(raw_df.columns)
+    assert os.listdir(tmp_path) == ['synthetic.csv']
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.eda_utils import (
+    create_correlation_matrix,
+    create_quality_distribution_bar,
+    create_wine_quality_proportion_plot
+)
+from src.wine_statistics import WineStatistics
+
+train_df = pd.read_csv('data/processed/training_set.csv')
+numeric = train_df.select_dtypes('number')
+
+def test_chunked_statistics_match_pandas():
+    """Tests statistics accumulated over chunks match the ones pandas computes on the whole frame."""
+    stats = WineStatistics.from_csv('data/processed/training_set.csv', chunksize=333)
+    assert stats.columns == numeric.columns.tolist()
+    assert stats.n_rows == stats.count == len(train_df)
+    assert stats.mean == pytest.approx(numeric.mean().to_numpy())
+    np.testing.assert_allclose(stats.covariance(), numeric.cov(), rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(stats.correlation(), numeric.corr(), rtol=1e-10, atol=1e-12)
+    summary = stats.summary()
+    assert summary.loc['min'].tolist() == numeric.min().tolist()
+    assert summary.loc['max'].tolist() == numeric.max().tolist()
+    assert summary.loc['std'].to_numpy() == pytest.approx(numeric.std().to_numpy())
+    pd.testing.assert_series_equal(stats.class_counts(), train_df.groupby(['color', 'quality']).size(),
+                                   check_names=False)
+    pd.testing.assert_series_equal(stats.class_counts('quality'), train_df.groupby('quality').size(),
+                                   check_names=False)
+
+def test_merge_matches_one_pass():
+    """Tests merging statistics of separate parts gives the statistics of all the rows."""
+    parts = [WineStatistics().update(part) for part in (train_df[:100], train_df[100:1500], train_df[1500:1501], train_df[1501:])]
+    merged = WineStatistics()
+    for part in parts:
+        merged.merge(part)
+    whole = WineStatistics().update(train_df)
+    assert merged.count == whole.count
+    np.testing.assert_allclose(merged.comoment, whole.comoment, rtol=1e-10)
+    assert merged.class_counts().equals(whole.class_counts())
+
+    with pytest.raises(ValueError):
+        merged.merge(WineStatistics(columns=['alcohol']).update(train_df))
+
+def test_missing_values():
+    """Tests rows with a missing numeric value are counted per class but left out of the moments."""
+    df = train_df[:50].copy()
+    df.loc[3, 'alcohol'] = np.nan
+    stats = WineStatistics().update(df)
+    assert stats.n_rows == 50 and stats.count == 49
+    assert stats.class_counts().sum() == 50
+    assert stats.mean[stats.columns.index('alcohol')] == pytest.approx(df['alcohol'].mean())
+    with pytest.raises(KeyError):
+        stats.update(df.drop(columns='alcohol'))
+
+def test_charts_from_statistics():
+    """Tests the correlation, quality and proportion charts draw the same data from statistics as from rows."""
+    stats = WineStatistics.from_csv('data/processed/training_set.csv', chunksize=1000)
+    assert create_quality_distribution_bar(stats).data.equals(create_quality_distribution_bar(train_df).data)
+    from_stats = create_wine_quality_proportion_plot(stats).data
+    from_rows = create_wine_quality_proportion_plot(train_df).data
+    assert from_stats[['color', 'quality', 'count']].equals(from_rows[['color', 'quality', 'count']])
+    assert from_stats['proportion'].to_numpy() == pytest.approx(from_rows['proportion'].to_numpy())
+
+    corr = create_correlation_matrix(stats, corr_types=('pearson',)).data
+    expected = create_correlation_matrix(train_df, corr_types=('pearson',)).data
+    assert corr[['index', 'variable']].equals(expected[['index', 'variable']])
+    assert corr['value'].to_numpy() == pytest.approx(expected['value'].to_numpy())
+    with pytest.raises(ValueError):
+        create_correlation_matrix(stats)